@@ -13,6 +13,8 @@ if something goes wrong here, it's almost definitely my fault
 rather than a problem with the libftdi library.
 """
 
+from __future__ import annotations
+
 __VERSION__ = "0.23.0"
 __AUTHOR__ = "Ben Bass"
 
@@ -23,6 +25,7 @@ __all__ = [
     "BitBangDevice",
     "Bus",
     "FtdiError",
+    "FtdiTimeoutError",
     "ALL_OUTPUTS",
     "ALL_INPUTS",
     "BB_OUTPUT",
@@ -31,10 +34,9 @@ __all__ = [
     "USB_PID_LIST",
 ]
 
+import importlib
 import sys
 
-from pylibftdi import _base, bitbang, device, driver, serial_device, util
-
 if sys.version_info < (3, 7, 0):  # noqa
     import warnings
 
@@ -43,23 +45,98 @@ if sys.version_info < (3, 7, 0):  # noqa
 
 # Bring them in to package scope so we can treat pylibftdi
 # as a module if we want.
-FtdiError = _base.FtdiError
-LibraryMissingError = _base.LibraryMissingError
-Bus = util.Bus
-Driver = driver.Driver
-Device = device.Device
-SerialDevice = serial_device.SerialDevice
-BitBangDevice = bitbang.BitBangDevice
-USB_VID_LIST = driver.USB_VID_LIST
-USB_PID_LIST = driver.USB_PID_LIST
-
-ALL_OUTPUTS = bitbang.ALL_OUTPUTS
-ALL_INPUTS = bitbang.ALL_INPUTS
-BB_OUTPUT = bitbang.BB_OUTPUT
-BB_INPUT = bitbang.BB_INPUT
-FLUSH_BOTH = driver.FLUSH_BOTH
-FLUSH_INPUT = driver.FLUSH_INPUT
-FLUSH_OUTPUT = driver.FLUSH_OUTPUT
+#
+# These are loaded on first use (PEP 562) rather than at import time, so
+# `import pylibftdi` doesn't pay for ctypes and the device modules until
+# they're needed. Each maps to the submodule which defines it.
+_LAZY_ATTRS = {
+    "FtdiError": "_base",
+    "FtdiTimeoutError": "_base",
+    "LibraryMissingError": "_base",
+    "Bus": "util",
+    "Driver": "driver",
+    "Device": "device",
+    "SerialDevice": "serial_device",
+    "BitBangDevice": "bitbang",
+    "FifoStreamDevice": "fifo",
+    "USB_VID_LIST": "driver",
+    "USB_PID_LIST": "driver",
+    "ALL_OUTPUTS": "bitbang",
+    "ALL_INPUTS": "bitbang",
+    "BB_OUTPUT": "bitbang",
+    "BB_INPUT": "bitbang",
+    "FLUSH_BOTH": "driver",
+    "FLUSH_INPUT": "driver",
+    "FLUSH_OUTPUT": "driver",
+}
+
+# Submodules previously imported by this package, which remain available
+# as attributes after a plain `import pylibftdi`.
+_LAZY_SUBMODULES = {
+    "_base",
+    "bitbang",
+    "device",
+    "driver",
+    "fifo",
+    "serial_device",
+    "util",
+}
+
+# typing is comparatively slow to import, so typing.TYPE_CHECKING isn't
+# used; this is False at runtime, but type checkers follow the imports.
+_TYPE_CHECKING = False
+if _TYPE_CHECKING:
+    from pylibftdi import (  # noqa: F401
+        _base,
+        bitbang,
+        device,
+        driver,
+        fifo,
+        serial_device,
+        util,
+    )
+    from pylibftdi._base import (  # noqa: F401
+        FtdiError,
+        FtdiTimeoutError,
+        LibraryMissingError,
+    )
+    from pylibftdi.bitbang import (  # noqa: F401
+        ALL_INPUTS,
+        ALL_OUTPUTS,
+        BB_INPUT,
+        BB_OUTPUT,
+        BitBangDevice,
+    )
+    from pylibftdi.device import Device  # noqa: F401
+    from pylibftdi.driver import (  # noqa: F401
+        FLUSH_BOTH,
+        FLUSH_INPUT,
+        FLUSH_OUTPUT,
+        USB_PID_LIST,
+        USB_VID_LIST,
+        Driver,
+    )
+    from pylibftdi.fifo import FifoStreamDevice  # noqa: F401
+    from pylibftdi.serial_device import SerialDevice  # noqa: F401
+    from pylibftdi.util import Bus  # noqa: F401
+
+
+def __getattr__(name: str) -> object:
+    if name in _LAZY_ATTRS:
+        module = importlib.import_module(f"{__name__}.{_LAZY_ATTRS[name]}")
+        value = getattr(module, name)
+    elif name in _LAZY_SUBMODULES:
+        value = importlib.import_module(f"{__name__}.{name}")
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # cache it so __getattr__ isn't needed next time
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRS) | _LAZY_SUBMODULES)
+
 
 # Use these for interface_select on multiple-interface devices
 INTERFACE_ANY = 0
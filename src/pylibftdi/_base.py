@@ -11,7 +11,7 @@ pylibftdi: https://github.com/codedstructure/pylibftdi
 # This module contains things needed by at least one other
 # module so as to prevent circular imports.
 
-__ALL__ = ["FtdiError", "LibraryMissingError"]
+__ALL__ = ["FtdiError", "FtdiTimeoutError", "LibraryMissingError"]
 
 
 class FtdiError(Exception):
@@ -20,3 +20,7 @@ class FtdiError(Exception):
 
 class LibraryMissingError(FtdiError):
     pass
+
+
+class FtdiTimeoutError(FtdiError):
+    pass
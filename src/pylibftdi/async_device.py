@@ -0,0 +1,358 @@
+"""
+pylibftdi.async_device - asyncio interface to FTDI devices
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from pylibftdi._base import FtdiError
+from pylibftdi.bitbang import BitBangDevice
+from pylibftdi.device import Device
+from pylibftdi.serial_device import SerialDevice
+
+
+class _ReadFlowControl:
+    """
+    Minimal 'transport' given to the StreamReader, which calls
+    pause_reading() / resume_reading() (in the event loop thread) as
+    its buffer exceeds / drops below its limit.
+    """
+
+    def __init__(self, owner: AsyncDevice) -> None:
+        self._owner = owner
+
+    def pause_reading(self) -> None:
+        self._owner._read_paused = True
+
+    def resume_reading(self) -> None:
+        self._owner._read_paused = False
+        self._owner._wakeup.set()
+
+
+class AsyncDevice:
+    """
+    asyncio wrapper around a Device, providing StreamReader / StreamWriter
+    style methods (`await read()`, `await readexactly()`, `await
+    readuntil()`, `write()` + `await drain()`).
+
+    All libftdi calls for the device are made from a single dedicated I/O
+    thread, which continuously reads from the device into an
+    asyncio.StreamReader and services queued writes and other calls, so
+    any number of coroutines can use the device without a thread-pool
+    hop per operation.
+
+    >>> async with AsyncDevice(device_id='FTE00P4L') as dev:
+    ...     dev.write(b'status?\\n')
+    ...     await dev.drain()
+    ...     reply = await dev.readuntil(b'\\n')
+    """
+
+    # the Device class constructed from the given arguments
+    device_class: type[Device] = Device
+
+    # whether the I/O thread should continuously read from the device
+    auto_read = True
+
+    # size of each device read made by the I/O thread
+    read_size = 4096
+
+    # how long the I/O thread waits after a read returns no data
+    poll_interval = 0.001
+
+    def __init__(
+        self,
+        *args: Any,
+        device: Device | None = None,
+        limit: int = 1 << 16,
+        **kwargs: Any,
+    ) -> None:
+        """
+        AsyncDevice([device_id[, ...]], [device=...], [limit=...], ...)
+
+        :param device: an existing Device instance to use. If omitted, one
+            is created by calling `device_class` with any other arguments;
+            pass lazy_open=True to defer the (blocking) open to `await
+            open()`, which runs it in the I/O thread.
+        :param limit: buffer limit for the underlying StreamReader; reading
+            from the device is paused while more than twice this amount of
+            data is waiting to be consumed.
+        """
+        if device is None:
+            device = self.device_class(*args, **kwargs)
+        elif args or kwargs:
+            raise TypeError("device arguments given along with a device instance")
+        self.device = device
+        self.limit = limit
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._reader: asyncio.StreamReader | None = None
+        self._thread: threading.Thread | None = None
+        self._calls: queue.SimpleQueue[Any] = queue.SimpleQueue()
+        self._wakeup = threading.Event()
+        self._read_paused = False
+        self._pending_writes: list[asyncio.Future[Any]] = []
+
+    #
+    # I/O thread
+    #
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._reader = asyncio.StreamReader(limit=self.limit)
+        self._reader.set_transport(_ReadFlowControl(self))  # type: ignore
+        # anything already buffered by the device is delivered first
+        pending = bytes(self.device._rx_pending)
+        self.device._rx_pending.clear()
+        if pending:
+            self._reader.feed_data(pending)
+        self._thread = threading.Thread(
+            target=self._run, name="pylibftdi-async", daemon=True
+        )
+        self._thread.start()
+
+    def _post(self, fn: Callable[..., Any], *args: Any) -> None:
+        """
+        call `fn(*args)` in the event loop thread
+        """
+        assert self._loop is not None
+        try:
+            self._loop.call_soon_threadsafe(fn, *args)
+        except RuntimeError:
+            # event loop has been closed; nobody is waiting for the result
+            pass
+
+    @staticmethod
+    def _resolve(
+        future: asyncio.Future[Any], result: Any, exc: BaseException | None
+    ) -> None:
+        if future.cancelled():
+            return
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+    def _run(self) -> None:
+        assert self._reader is not None
+        reader = self._reader
+        calls = self._calls
+        reading = self.auto_read
+        while True:
+            self._wakeup.clear()
+            while True:
+                try:
+                    item = calls.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._post(reader.feed_eof)
+                    return
+                future, fn, args = item
+                try:
+                    result = fn(*args)
+                except BaseException as exc:
+                    self._post(self._resolve, future, None, exc)
+                else:
+                    self._post(self._resolve, future, result, None)
+
+            data = b""
+            if reading and not self._read_paused and not self.device.closed:
+                try:
+                    data = self.device._read_device(self.read_size)
+                except Exception as exc:
+                    # report to readers, and stop trying to read
+                    self._post(reader.set_exception, exc)
+                    reading = False
+            if data:
+                self._post(reader.feed_data, data)
+            else:
+                self._wakeup.wait(self.poll_interval if reading else None)
+
+    async def call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        call `fn(*args)` in the device I/O thread, returning its result.
+
+        Calls (including writes) are made in the order they are queued.
+        """
+        self._start()
+        assert self._loop is not None
+        future = self._loop.create_future()
+        self._calls.put((future, fn, args))
+        self._wakeup.set()
+        return await future
+
+    #
+    # Connection management
+    #
+
+    async def open(self) -> AsyncDevice:
+        """
+        start the I/O thread, opening the device (in that thread) if it
+        is not already open.
+        """
+        self._start()
+        if self.device.closed:
+            await self.call(self.device.open)
+        return self
+
+    async def close(self) -> None:
+        """
+        wait for pending writes, close the device, and stop the I/O thread
+        """
+        if self._thread is None:
+            self.device.close()
+            return
+        try:
+            await self.drain()
+        finally:
+            await self.call(self.device.close)
+            self._calls.put(None)
+            self._wakeup.set()
+            thread, self._thread = self._thread, None
+            assert self._loop is not None
+            await self._loop.run_in_executor(None, thread.join)
+
+    async def __aenter__(self) -> AsyncDevice:
+        return await self.open()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    #
+    # StreamReader-style methods
+    #
+
+    @property
+    def reader(self) -> asyncio.StreamReader:
+        self._start()
+        assert self._reader is not None
+        return self._reader
+
+    async def read(self, n: int = -1) -> bytes:
+        """
+        read up to `n` bytes, waiting until at least one is available.
+        If `n` is -1, read until the device is closed.
+        """
+        return await self.reader.read(n)
+
+    async def readexactly(self, n: int) -> bytes:
+        """
+        read exactly `n` bytes
+        """
+        return await self.reader.readexactly(n)
+
+    async def readuntil(self, separator: bytes = b"\n") -> bytes:
+        """
+        read data up to and including `separator`
+        """
+        return await self.reader.readuntil(separator)
+
+    async def readline(self) -> bytes:
+        """
+        read a line terminated by b'\\n'
+        """
+        return await self.reader.readline()
+
+    #
+    # StreamWriter-style methods
+    #
+
+    def _write_all(self, data: bytes) -> int:
+        """
+        write all of `data` (runs in the I/O thread)
+        """
+        view = memoryview(data)
+        written = 0
+        while written < len(view):
+            result = self.device.write(view[written:])
+            if result == 0:
+                raise FtdiError(f"write stalled after {written} bytes")
+            written += result
+        return written
+
+    def write(self, data: bytes | bytearray | memoryview) -> None:
+        """
+        queue `data` to be written to the device. Use `await drain()` to
+        wait for queued writes to complete (and see any errors).
+        """
+        self._start()
+        assert self._loop is not None
+        future = self._loop.create_future()
+        self._pending_writes.append(future)
+        self._calls.put((future, self._write_all, (bytes(data),)))
+        self._wakeup.set()
+
+    def writelines(self, lines: list[bytes]) -> None:
+        for line in lines:
+            self.write(line)
+
+    async def drain(self) -> None:
+        """
+        wait until all queued writes have been written to the device
+        """
+        pending, self._pending_writes = self._pending_writes, []
+        if pending:
+            await asyncio.gather(*pending)
+
+
+class AsyncBitBangDevice(AsyncDevice):
+    """
+    asyncio wrapper around a BitBangDevice. Pin operations run in the
+    device I/O thread, which does not continuously read from the device.
+    """
+
+    device_class = BitBangDevice
+    auto_read = False
+    device: BitBangDevice
+
+    async def read_pins(self) -> int:
+        return await self.call(self.device.read_pins)
+
+    async def get_port(self) -> int:
+        return await self.call(getattr, self.device, "port")
+
+    async def set_port(self, value: int) -> None:
+        await self.call(setattr, self.device, "port", value)
+
+    async def set_direction(self, value: int) -> None:
+        await self.call(setattr, self.device, "direction", value)
+
+
+class AsyncSerialDevice(AsyncDevice):
+    """
+    asyncio wrapper around a SerialDevice, adding coroutines for the
+    modem control and status lines.
+    """
+
+    device_class = SerialDevice
+    device: SerialDevice
+
+    async def modem_status(self) -> int:
+        return await self.call(getattr, self.device, "modem_status")
+
+    async def cts(self) -> int:
+        return await self.call(getattr, self.device, "cts")
+
+    async def dsr(self) -> int:
+        return await self.call(getattr, self.device, "dsr")
+
+    async def ri(self) -> int:
+        return await self.call(getattr, self.device, "ri")
+
+    async def set_dtr(self, value: int) -> None:
+        await self.call(setattr, self.device, "dtr", value)
+
+    async def set_rts(self, value: int) -> None:
+        await self.call(setattr, self.device, "rts", value)
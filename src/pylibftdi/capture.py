@@ -0,0 +1,226 @@
+"""
+pylibftdi.capture - continuous background capture from a Device
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+from pylibftdi._base import FtdiError
+
+if TYPE_CHECKING:
+    from pylibftdi.device import Device
+
+
+class RingBuffer:
+    """
+    A fixed-size, single-producer single-consumer byte ring buffer.
+
+    The producer only ever advances `_head` and the consumer only ever
+    advances `_tail`. Both are ever-increasing counters, and each is
+    updated only after the data it covers has been copied, so no lock
+    is needed between one producer and one consumer thread.
+
+    If the producer writes more data than there is free space for, the
+    excess is discarded and counted in `overruns`.
+    """
+
+    def __init__(self, size: int) -> None:
+        if size <= 0:
+            raise ValueError("ring buffer size must be positive")
+        self.size = size
+        self._buf = bytearray(size)
+        self._head = 0
+        self._tail = 0
+        # count of bytes discarded due to the buffer being full
+        self.overruns = 0
+
+    def __len__(self) -> int:
+        """
+        :return: number of bytes available to read
+        """
+        return self._head - self._tail
+
+    def write(self, data: Any) -> int:
+        """
+        append `data` to the buffer (producer side)
+
+        :return: number of bytes stored, which may be less than `len(data)`
+            if the buffer is full.
+        """
+        data = memoryview(data)
+        head = self._head
+        count = min(len(data), self.size - (head - self._tail))
+        if count < len(data):
+            self.overruns += len(data) - count
+        pos = head % self.size
+        first = min(count, self.size - pos)
+        self._buf[pos : pos + first] = data[:first]
+        if count > first:
+            self._buf[: count - first] = data[first:count]
+        self._head = head + count
+        return count
+
+    def readinto(self, buffer: Any) -> int:
+        """
+        move up to `len(buffer)` bytes into `buffer` (consumer side)
+
+        :return: number of bytes read
+        """
+        view = memoryview(buffer).cast("B")
+        tail = self._tail
+        count = min(len(view), self._head - tail)
+        pos = tail % self.size
+        first = min(count, self.size - pos)
+        view[:first] = self._buf[pos : pos + first]
+        if count > first:
+            view[first:count] = self._buf[: count - first]
+        self._tail = tail + count
+        return count
+
+    def read(self, size: int) -> bytes:
+        """
+        remove and return up to `size` bytes (consumer side)
+        """
+        buf = bytearray(min(size, len(self)))
+        self.readinto(buf)
+        return bytes(buf)
+
+
+class Capture:
+    """
+    Continuously reads from a Device in a background thread into a
+    RingBuffer, so that data keeps being drained from the device FIFO
+    regardless of what the consuming thread is doing.
+
+    ctypes releases the GIL during each ftdi_read_data call, so the
+    reader thread runs concurrently with Python code in other threads.
+
+    Normally created with Device.start_capture().
+    """
+
+    # interval to wait after a read returns no data, so a backend which
+    # returns immediately doesn't busy-loop. (libftdi itself normally
+    # waits for the latency timer when no data is available)
+    idle_interval = 0.001
+
+    def __init__(
+        self, device: Device, ring_size: int = 1 << 20, read_size: int | None = None
+    ) -> None:
+        """
+        :param device: an open Device to capture from
+        :param ring_size: size of the ring buffer in bytes
+        :param read_size: size of each device read; defaults to the Device
+            chunk_size if set, otherwise 4096.
+        """
+        self.device = device
+        self.ring = RingBuffer(ring_size)
+        if read_size is None:
+            read_size = device.chunk_size or 4096
+        self.read_size = read_size
+        # any exception raised in the reader thread; reported to consumers
+        self.error: BaseException | None = None
+        self._stop_event = threading.Event()
+        self._data_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="pylibftdi-capture", daemon=True
+        )
+
+    def start(self) -> Capture:
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        read = self.device._read
+        read_size = self.read_size
+        ring = self.ring
+        stopping = self._stop_event
+        try:
+            while not stopping.is_set():
+                data = read(read_size)
+                if data:
+                    ring.write(data)
+                    self._data_event.set()
+                else:
+                    stopping.wait(self.idle_interval)
+        except BaseException as exc:
+            self.error = exc
+        finally:
+            self._data_event.set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    @property
+    def available(self) -> int:
+        """
+        number of captured bytes waiting to be read
+        """
+        return len(self.ring)
+
+    @property
+    def overruns(self) -> int:
+        """
+        number of captured bytes dropped because the ring buffer was full
+        """
+        return self.ring.overruns
+
+    def _wait(self, timeout: float | None) -> None:
+        """
+        wait for data to be available, or the reader to stop
+        """
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+            while not len(self.ring) and self.running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._data_event.clear()
+                # re-check after clearing to avoid missing a wakeup
+                if len(self.ring):
+                    break
+                self._data_event.wait(remaining)
+        if not len(self.ring) and self.error is not None:
+            raise FtdiError(f"capture stopped: {self.error!r}") from self.error
+
+    def read(self, size: int, timeout: float | None = None) -> bytes:
+        """
+        read(size[, timeout]) -> up to `size` captured bytes
+
+        :param size: maximum number of bytes to return
+        :param timeout: if given, wait up to this many seconds for data
+            to become available if none is currently captured.
+        """
+        self._wait(timeout)
+        return self.ring.read(size)
+
+    def readinto(self, buffer: Any, timeout: float | None = None) -> int:
+        """
+        readinto(buffer[, timeout]) -> count of bytes read into `buffer`
+        """
+        self._wait(timeout)
+        return self.ring.readinto(buffer)
+
+    def stop(self) -> None:
+        """
+        stop the reader thread and wait for it to finish. Data already
+        captured remains available to read.
+        """
+        self._stop_event.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def __enter__(self) -> Capture:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.device.stop_capture()
@@ -11,32 +11,45 @@ pylibftdi: https://github.com/codedstructure/pylibftdi
 from __future__ import annotations
 
 import codecs
+import collections
 import functools
+import io
 import itertools
-import os
 import sys
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
 from ctypes import (
-    POINTER,
-    Structure,
+    Array,
     byref,
+    c_char,
     c_char_p,
+    c_ubyte,
+    c_uint,
     c_void_p,
     cast,
     create_string_buffer,
+    string_at,
 )
-from typing import no_type_check
+from typing import Any, no_type_check
 
-from pylibftdi._base import FtdiError
+from pylibftdi._base import FtdiError, FtdiTimeoutError
+from pylibftdi.capture import Capture
 from pylibftdi.driver import (
     BITMODE_RESET,
     FLUSH_BOTH,
     FLUSH_INPUT,
     FLUSH_OUTPUT,
     FTDI_ERROR_DEVICE_NOT_FOUND,
+    HIGH_SPEED_TYPES,
     USB_PID_LIST,
     USB_VID_LIST,
     Driver,
+    libusb_device_descriptor,
 )
+from pylibftdi.location_cache import LocationCache
+from pylibftdi.stats import DeviceStats
+from pylibftdi.transfer import Transfer
 
 ERR_HELP_NOT_FOUND_FAIL = """
 No device matching the given specification could be found.
@@ -92,14 +105,32 @@ driver has been installed from their website:
 )
 
 
-# The only part of the ftdi context we need at this point is
-# libusb_device_handle, so we don't encode the entire structure.
-# Note the structure for 0.x is different (no libusb_context
-# member), but we don't support auto_detach on 0.x which is
-# the only case this is used.
-class ftdi_context_partial(Structure):
-    # This is for libftdi 1.0+
-    _fields_ = [("libusb_context", c_void_p), ("libusb_device_handle", c_void_p)]
+# candidate libftdi chunk sizes for Device.tune_chunksize(), which should
+# be multiples of the USB max packet size (64 bytes for full-speed devices,
+# 512 bytes for high-speed devices).
+FULL_SPEED_CHUNKSIZES = (256, 512, 1024, 2048, 4096, 8192)
+HIGH_SPEED_CHUNKSIZES = (2048, 4096, 8192, 16384, 32768, 65536)
+
+
+class FtdiForwarder:
+    """
+    Forwards attribute access to functions in `fdll`, with the given
+    ftdi_context pointer bound as the first argument.
+
+    Bound functions are cached on first use, so instances should be
+    discarded whenever the underlying context changes.
+    """
+
+    def __init__(self, fdll: Any, ctx: Any) -> None:
+        self._fdll = fdll
+        self._ctx = ctx
+
+    @no_type_check
+    def __getattr__(self, key: str):
+        # only called when `key` isn't already cached in the instance dict
+        fn = functools.partial(getattr(self._fdll, key), self._ctx)
+        setattr(self, key, fn)
+        return fn
 
 
 class Device:
@@ -114,6 +145,44 @@ class Device:
     # to allow interruption
     chunk_size = 0
 
+    # delimiter used by readline() and friends; a str delimiter is
+    # encoded with the Device encoding.
+    delimiter: str | bytes = b"\n"
+
+    # the size of each device read used to fill the receive buffer
+    # when looking for a delimiter
+    read_block_size = 4096
+
+    # read policy, analogous to termios VMIN / VTIME. With the defaults
+    # read() returns whatever is available immediately. Otherwise read()
+    # waits until at least `read_min` bytes (or 1 byte if only timeouts
+    # are set) have arrived, giving up after `read_timeout` seconds
+    # overall or `read_interbyte_timeout` seconds without further data
+    # once some has arrived. None means no limit.
+    read_min = 0
+    read_timeout: float | None = None
+    read_interbyte_timeout: float | None = None
+
+    # adaptive_latency switches the latency timer between
+    # interactive_latency - after small writes, i.e. request/response
+    # traffic - and bulk_latency, after reads of at least
+    # bulk_threshold bytes or when streaming / capturing, which reduces
+    # the USB traffic needed for a given data rate.
+    adaptive_latency = False
+    interactive_latency = 1
+    bulk_latency = 16
+    bulk_threshold = 4096
+
+    # location_cache enables a persistent cache of the USB location each
+    # device_id was last opened at, which is tried before searching for a
+    # matching device. True uses the default cache file; a str gives the
+    # path of the cache file to use.
+    location_cache: bool | str = False
+
+    # collect_stats enables I/O statistics from when the device is
+    # created; see enable_stats().
+    collect_stats = False
+
     # auto_detach is a flag to call libusb_set_auto_detach_kernel_driver
     # when we open the device
     auto_detach = True
@@ -121,7 +190,7 @@ class Device:
     # defining softspace allows us to 'print' to this device
     softspace = 0
 
-    def __init__(
+    def __init__(  # noqa: PLR0912, PLR0915
         self,
         device_id: str | None = None,
         mode: str = "b",
@@ -132,9 +201,22 @@ class Device:
         auto_detach: bool | None = None,
         lazy_open: bool | None = None,
         chunk_size: int | None = None,
+        delimiter: str | bytes | None = None,
+        read_min: int | None = None,
+        read_timeout: float | None = None,
+        read_interbyte_timeout: float | None = None,
+        read_chunksize: int | None = None,
+        write_chunksize: int | None = None,
+        latency_timer: int | None = None,
+        adaptive_latency: bool | None = None,
         index: int | None = None,
         vid: int | None = None,
         pid: int | None = None,
+        bus: int | None = None,
+        address: int | None = None,
+        port_path: str | None = None,
+        location_cache: bool | str | None = None,
+        collect_stats: bool | None = None,
         driver: Driver | None = None,
     ) -> None:
         """
@@ -175,6 +257,33 @@ class Device:
         :param auto_detach: default True, whether to automatically re-attach
             the kernel driver on device close.
 
+        :param delimiter: the line delimiter (str or bytes) for readline(),
+            readlines() and iteration. Defaults to b'\\n'.
+
+        :param read_min: minimum number of bytes read() waits for
+            (bounded by the requested length). Defaults to 0, i.e. return
+            whatever is available without waiting.
+
+        :param read_timeout: maximum time in seconds read() waits overall.
+
+        :param read_interbyte_timeout: maximum time in seconds read() waits
+            for further data once some data has arrived.
+
+        :param read_chunksize: libftdi read chunk size - the size of each
+            USB read transfer - applied when the device is opened. If
+            omitted, the libftdi default (4KB) is used.
+
+        :param write_chunksize: libftdi write chunk size - the size of each
+            USB write transfer - applied when the device is opened. If
+            omitted, the libftdi default (4KB) is used.
+
+        :param latency_timer: the latency timer in milliseconds (1-255),
+            applied when the device is opened. Defaults to 16, the device
+            default, or `bulk_latency` with `adaptive_latency`.
+
+        :param adaptive_latency: if True, adjust the latency timer
+            according to the traffic; see `adaptive_latency`.
+
         :param index: optional index into list_devices() to open.
             Useful in the event that multiple devices of differing VID/PID
             are attached, where `device_index` is insufficient to select
@@ -185,6 +294,23 @@ class Device:
 
         :param pid: optional product ID to open. If omitted, the default USB_PID_LIST
             is used to search for devices.
+
+        :param bus: with `address`, open the device at this USB bus number
+            and device address, rather than searching for a device. No
+            VID / PID / device_id checks are made.
+
+        :param address: USB device address, used with `bus`.
+
+        :param port_path: open the device at this USB port path, e.g.
+            '1-2.3' (as used by Linux sysfs) for port 3 of a hub on port 2
+            of bus 1. Unlike the device address, this stays the same when
+            the device is reconnected to the same port.
+
+        :param location_cache: enable the persistent location cache; see
+            the `location_cache` attribute.
+
+        :param collect_stats: if True, collect I/O statistics; see
+            enable_stats().
         """
         self._opened = False
 
@@ -196,6 +322,22 @@ class Device:
             self.lazy_open = lazy_open
         if chunk_size is not None:
             self.chunk_size = chunk_size
+        if delimiter is not None:
+            self.delimiter = delimiter
+        if read_min is not None:
+            self.read_min = read_min
+        if read_timeout is not None:
+            self.read_timeout = read_timeout
+        if read_interbyte_timeout is not None:
+            self.read_interbyte_timeout = read_interbyte_timeout
+        if adaptive_latency is not None:
+            self.adaptive_latency = adaptive_latency
+        if location_cache is not None:
+            self.location_cache = location_cache
+        if collect_stats is not None:
+            self.collect_stats = collect_stats
+        if (bus is None) != (address is None):
+            raise ValueError("bus and address must be given together")
 
         self.driver = Driver() if driver is None else driver
         self.fdll = self.driver.fdll
@@ -226,6 +368,39 @@ class Device:
         self.list_index = index
         self.vid = vid
         self.pid = pid
+        self.bus = bus
+        self.address = address
+        self.port_path = port_path
+        # _rx_buf is a ctypes buffer reused by _read() to avoid allocating
+        # a new one on every call; it grows to the largest read requested.
+        self._rx_buf: Any = None
+        # _rx_pending holds data read from the device (e.g. by readline())
+        # but not yet returned to the caller.
+        self._rx_pending = bytearray()
+        # _read_transfer is the last submit_read() transfer; libftdi shares
+        # its read buffer state between read transfers, so only one may be
+        # in progress at a time.
+        self._read_transfer: Transfer | None = None
+        # _ftdi_fn caches the FtdiForwarder for the current context
+        self._ftdi_fn: FtdiForwarder | None = None
+        # _capture is the active background Capture, if any
+        self._capture: Capture | None = None
+        # libftdi chunk sizes applied on open(); None keeps the default
+        self._read_chunksize = read_chunksize
+        self._write_chunksize = write_chunksize
+        # the device latency timer in milliseconds; this bounds how long
+        # data may sit in the device before being sent, so is used as the
+        # longest sleep between polls while waiting for data.
+        if latency_timer is not None:
+            self._check_latency(latency_timer)
+        self._latency_timer = 16 if latency_timer is None else latency_timer
+        # an explicit latency_timer is the starting point for adaptive_latency
+        # rather than being replaced by bulk_latency on open.
+        self._latency_explicit = latency_timer is not None
+        # _stats holds I/O statistics, if enabled
+        self._stats: DeviceStats | None = None
+        if self.collect_stats:
+            self.enable_stats()
 
         # lazy_open tells us not to open immediately.
         if not self.lazy_open:
@@ -254,26 +429,21 @@ class Device:
                     "index provided not in range of list_devices() entries"
                 ) from None
 
-        # create context for this device
-        # Note I gave up on attempts to use ftdi_new/ftdi_free (just using
-        # ctx instead of byref(ctx) in first param of most ftdi_* functions) as
-        # (at least for 64-bit) they only worked if argtypes was declared
-        # (c_void_p for ctx), and that's too much like hard work to maintain.
-        # So I've reverted to using create_string_buffer for memory management,
-        # byref(ctx) to pass in the context instance, and ftdi_init() /
-        # ftdi_deinit() pair to manage the driver resources. It's very nice
-        # how layered the libftdi code is, with access to each layer.
-        self.ctx = create_string_buffer(1024)
-        res = self.fdll.ftdi_init(byref(self.ctx))
-        if res != 0:
-            msg = "%s (%d)" % (self.get_error_string(), res)
+        # create context for this device. The pointer returned by ftdi_new()
+        # is passed directly as the first parameter of most ftdi_* functions;
+        # this relies on the argtypes declared in Driver.fdll so it isn't
+        # truncated to an int on 64-bit platforms.
+        self.ctx = self.fdll.ftdi_new()
+        self._ftdi_fn = None
+        if not self.ctx:
             del self.ctx
-            raise FtdiError(msg)
+            raise FtdiError("could not allocate ftdi_context")
 
         if self.interface_select is not None:
-            res = self.fdll.ftdi_set_interface(byref(self.ctx), self.interface_select)
+            res = self.fdll.ftdi_set_interface(self.ctx, self.interface_select)
             if res != 0:
                 msg = "%s (%d)" % (self.get_error_string(), res)
+                self.fdll.ftdi_free(self.ctx)
                 del self.ctx
                 raise FtdiError(msg)
 
@@ -285,14 +455,13 @@ class Device:
         if res != 0:
             msg = self.handle_open_error(res)
             # free the context
-            self.fdll.ftdi_deinit(byref(self.ctx))
+            self.fdll.ftdi_free(self.ctx)
             del self.ctx
             raise FtdiError(msg)
 
         if self.auto_detach and self.driver.libftdi_version().major > 0:
             # This doesn't reliably work on libftdi 0.x, so we ignore it
-            ctx_p = cast(byref(self.ctx), POINTER(ftdi_context_partial)).contents
-            dev = ctx_p.libusb_device_handle
+            dev = self.ctx.contents.usb_dev
             if dev:
                 self.driver._libusb.libusb_set_auto_detach_kernel_driver(
                     c_void_p(dev), 1
@@ -306,9 +475,16 @@ class Device:
         self.ftdi_fn.ftdi_setflowctrl(0)
         self.baudrate = 9600
         # reset the latency timer to 16ms (device default, but kernel device
-        # drivers can set a different - e.g. 1ms - value)
-        self.ftdi_fn.ftdi_set_latency_timer(16)
+        # drivers can set a different - e.g. 1ms - value) unless otherwise
+        # requested.
+        if self.adaptive_latency and not self._latency_explicit:
+            self._latency_timer = self.bulk_latency
+        self.ftdi_fn.ftdi_set_latency_timer(self._latency_timer)
         self._opened = True
+        if self._read_chunksize is not None:
+            self.read_chunksize = self._read_chunksize
+        if self._write_chunksize is not None:
+            self.write_chunksize = self._write_chunksize
 
     def handle_open_error(self, errcode: int) -> str:
         """
@@ -336,12 +512,101 @@ class Device:
         :return: status of the open command (0 = success)
         :rtype: int
         """
-        # FTDI vendor/product ids required here.
-        res: int = -1
+        if self.port_path is not None:
+            return self._open_port_path(self.port_path)
+        if self.bus is not None:
+            return self.fdll.ftdi_usb_open_bus_addr(self.ctx, self.bus, self.address)
+
+        cache = None
+        if self.location_cache and self.device_id and self.device_index == 0:
+            path = None if self.location_cache is True else self.location_cache
+            cache = LocationCache(path)
+            if self._open_cached(cache, self.device_id):
+                return 0
+        res = self._open_search()
+        if res == 0 and cache is not None and self.device_id:
+            self._cache_location(cache, self.device_id)
+        return res
+
+    def _open_port_path(self, port_path: str) -> int:
+        """
+        open the device at the given USB port path
+
+        :return: status of the open command (0 = success)
+        """
+        driver = self.driver
+        with driver._usb_device_list(self.ctx.contents.usb_ctx) as devices:
+            for dev in devices:
+                if driver._usb_location(dev)[2] == port_path:
+                    res: int = self.fdll.ftdi_usb_open_dev(self.ctx, dev)
+                    return res
+        return FTDI_ERROR_DEVICE_NOT_FOUND
+
+    def _open_cached(self, cache: LocationCache, device_id: str) -> bool:
+        """
+        try to open `device_id` at its cached location, checking the
+        device found there has the expected serial number or description,
+        and matches the vid / pid filters as _open_search() would.
+
+        :return: True if the device was opened
+        """
+        location = cache.get(device_id)
+        if location is None or not hasattr(self.fdll, "ftdi_usb_get_strings2"):
+            return False
+        res = self.fdll.ftdi_usb_open_bus_addr(
+            self.ctx, location["bus"], location["address"]
+        )
+        if res != 0:
+            return False
+        libusb = self.driver._libusb
+        dev = libusb.libusb_get_device(self.ctx.contents.usb_dev)
+        vid_list, pid_list = self._usb_id_lists()
+        ids = libusb_device_descriptor()
+        res = libusb.libusb_get_device_descriptor(dev, byref(ids))
+        if res == 0 and ids.idVendor in vid_list and ids.idProduct in pid_list:
+            desc = create_string_buffer(128)
+            serial = create_string_buffer(128)
+            # with an open device, ftdi_usb_get_strings2 reads the strings
+            # without re-opening (and subsequently closing) it.
+            res = self.fdll.ftdi_usb_get_strings2(
+                self.ctx, dev, None, 0, desc, 127, serial, 127
+            )
+            encoded_id = device_id.encode("latin1")
+            if res == 0 and encoded_id in (serial.value, desc.value):
+                return True
+        self.fdll.ftdi_usb_close(self.ctx)
+        return False
+
+    def _cache_location(self, cache: LocationCache, device_id: str) -> None:
+        """
+        record the location of the open device in `cache`
+        """
+        driver = self.driver
+        dev = driver._libusb.libusb_get_device(self.ctx.contents.usb_dev)
+        if dev:
+            cache.set(device_id, *driver._usb_location(dev))
+
+    def _usb_id_lists(self) -> tuple[list[int], list[int]]:
+        """
+        :return: (vid_list, pid_list) - the USB vendor and product ids a
+            device being opened may have
+        """
         vid_list = [self.vid] if self.vid is not None else USB_VID_LIST
         pid_list = [self.pid] if self.pid is not None else USB_PID_LIST
+        return vid_list, pid_list
+
+    def _open_search(self) -> int:
+        """
+        open the device by searching the vid/pid lists for a device
+        matching device_id and device_index
+
+        :return: status of the open command (0 = success)
+        """
+        # FTDI vendor/product ids required here.
+        res: int = -1
+        vid_list, pid_list = self._usb_id_lists()
         for usb_vid, usb_pid in itertools.product(vid_list, pid_list):
-            open_args = [byref(self.ctx), usb_vid, usb_pid, 0, 0, self.device_index]
+            open_args = [self.ctx, usb_vid, usb_pid, None, None, self.device_index]
             if self.device_id is None:
                 res = self.fdll.ftdi_usb_open_desc_index(*tuple(open_args))
             else:
@@ -362,11 +627,16 @@ class Device:
 
     def close(self) -> None:
         """close our connection, free resources"""
+        self.stop_capture()
         if self._opened:
-            self.fdll.ftdi_usb_close(byref(self.ctx))
-            self.fdll.ftdi_deinit(byref(self.ctx))
+            self.fdll.ftdi_usb_close(self.ctx)
+            self.fdll.ftdi_free(self.ctx)
             del self.ctx
         self._opened = False
+        self._rx_buf = None
+        self._rx_pending.clear()
+        self._read_transfer = None
+        self._ftdi_fn = None
 
     @property
     def baudrate(self) -> int:
@@ -378,10 +648,229 @@ class Device:
 
     @baudrate.setter
     def baudrate(self, value: int) -> None:
-        result = self.fdll.ftdi_set_baudrate(byref(self.ctx), value)
+        result = self.fdll.ftdi_set_baudrate(self.ctx, value)
         if result == 0:
             self._baudrate = value
 
+    def _get_chunksize(self, fn_name: str) -> int:
+        chunksize = c_uint()
+        res = getattr(self.fdll, fn_name)(self.ctx, byref(chunksize))
+        if res != 0:
+            raise FtdiError("%s (%d)" % (self.get_error_string(), res))
+        return chunksize.value
+
+    def _set_chunksize(self, fn_name: str, value: int) -> None:
+        res = getattr(self.fdll, fn_name)(self.ctx, value)
+        if res != 0:
+            raise FtdiError("%s (%d)" % (self.get_error_string(), res))
+
+    @property
+    def read_chunksize(self) -> int | None:
+        """
+        get or set the libftdi read chunk size: the size of each USB read
+        transfer, including the two modem status bytes in each packet.
+
+        Unlike `chunk_size`, which just splits up reads in Python, this
+        determines how much data each USB transfer can carry. Set values
+        are retained and reapplied if the device is re-opened. While the
+        device is closed, returns the value to be applied on open(), or
+        None for the libftdi default.
+        """
+        if not self._opened:
+            return self._read_chunksize
+        return self._get_chunksize("ftdi_read_data_get_chunksize")
+
+    @read_chunksize.setter
+    def read_chunksize(self, value: int) -> None:
+        if self._opened:
+            self._set_chunksize("ftdi_read_data_set_chunksize", value)
+        self._read_chunksize = value
+
+    @property
+    def write_chunksize(self) -> int | None:
+        """
+        get or set the libftdi write chunk size: the size of each USB
+        write transfer. See `read_chunksize`.
+        """
+        if not self._opened:
+            return self._write_chunksize
+        return self._get_chunksize("ftdi_write_data_get_chunksize")
+
+    @write_chunksize.setter
+    def write_chunksize(self, value: int) -> None:
+        if self._opened:
+            self._set_chunksize("ftdi_write_data_set_chunksize", value)
+        self._write_chunksize = value
+
+    @staticmethod
+    def _check_latency(value: int) -> None:
+        if not 1 <= value <= 255:
+            raise ValueError("latency timer must be 1-255 ms")
+
+    @property
+    def latency_timer(self) -> int:
+        """
+        get or set the device latency timer in milliseconds (1-255).
+
+        The device sends partially filled USB packets when this timer
+        expires, so it bounds the delay before small amounts of received
+        data become available - e.g. the response to a request - at the
+        cost of more USB traffic when lower. Set values are retained and
+        reapplied if the device is re-opened; while the device is closed,
+        returns the value to be applied on open().
+        """
+        if not self._opened:
+            return self._latency_timer
+        latency = c_ubyte()
+        res = self.fdll.ftdi_get_latency_timer(self.ctx, byref(latency))
+        if res != 0:
+            raise FtdiError("%s (%d)" % (self.get_error_string(), res))
+        return latency.value
+
+    @latency_timer.setter
+    def latency_timer(self, value: int) -> None:
+        self._check_latency(value)
+        if self._opened:
+            res = self.fdll.ftdi_set_latency_timer(self.ctx, value)
+            if res != 0:
+                raise FtdiError("%s (%d)" % (self.get_error_string(), res))
+        self._latency_timer = value
+
+    def _adapt_latency(self, value: int) -> None:
+        """
+        in adaptive_latency mode, set the latency timer to `value` if it
+        isn't already
+        """
+        if self.adaptive_latency and value != self._latency_timer:
+            self.latency_timer = value
+
+    @property
+    def chip_type(self) -> int:
+        """
+        the FTDI chip type of the open device, as one of the
+        pylibftdi.driver TYPE_* values. Requires libftdi 1.x.
+        """
+        return int(self.ctx.contents.type)
+
+    @property
+    def high_speed(self) -> bool:
+        """
+        True if the open device is a USB 2.0 high-speed chip (FT2232H,
+        FT4232H or FT232H), which use 512 byte rather than 64 byte USB
+        packets. Requires libftdi 1.x.
+        """
+        return self.chip_type in HIGH_SPEED_TYPES
+
+    def tune_chunksize(
+        self,
+        peer: Device | None = None,
+        candidates: Iterable[int] | None = None,
+        test_size: int | None = None,
+    ) -> int:
+        """
+        tune_chunksize([peer[, candidates[, test_size]]]) -> chunk size
+
+        measure loopback throughput with each candidate chunk size, and
+        set the read and write chunk sizes to the fastest.
+
+        For each candidate, `test_size` bytes are written by `peer` while
+        being read back by this device, so the two must be connected
+        (e.g. TXD wired to RXD, or two interfaces of a multi-interface
+        device), and should have the same baudrate.
+
+        :param peer: the device to write from; defaults to this device,
+            i.e. a loopback on a single device.
+        :param candidates: chunk sizes to try. Defaults to
+            HIGH_SPEED_CHUNKSIZES for high-speed chips, otherwise
+            FULL_SPEED_CHUNKSIZES.
+        :param test_size: number of bytes transferred for each candidate.
+            Defaults to about a second's worth at the current baudrate, up
+            to 256KB; ValueError is raised if that is smaller than the
+            largest candidate, as the baudrate is then too low for the
+            chunk size to matter (and tuning would be very slow).
+        :return: the chosen chunk size, which has been applied to both
+            this device's read_chunksize and `peer.write_chunksize`.
+        """
+        if not self._opened:
+            raise FtdiError("tune_chunksize() on closed Device")
+        if peer is None:
+            peer = self
+        if candidates is None:
+            if self.high_speed:
+                candidates = HIGH_SPEED_CHUNKSIZES
+            else:
+                candidates = FULL_SPEED_CHUNKSIZES
+        candidates = tuple(candidates)
+        if not candidates:
+            raise ValueError("no candidate chunk sizes given")
+        if test_size is None:
+            # 10 bits per byte on the wire
+            test_size = min(self.baudrate // 10, 1 << 18)
+            if test_size < max(candidates):
+                raise ValueError(
+                    "baudrate %d is too low to tune chunk sizes" % self.baudrate
+                )
+
+        data = bytes(itertools.islice(itertools.cycle(range(256)), test_size))
+        best_size, best_rate = 0, -1.0
+        for size in candidates:
+            self.read_chunksize = size
+            peer.write_chunksize = size
+            self.flush_input()
+            rate = self._loopback_rate(peer, data)
+            if rate > best_rate:
+                best_size, best_rate = size, rate
+        self.read_chunksize = best_size
+        peer.write_chunksize = best_size
+        self.flush_input()
+        return best_size
+
+    def _loopback_rate(
+        self, peer: Device, data: bytes, idle_timeout: float = 1.0
+    ) -> float:
+        """
+        write `data` from `peer` in a background thread while reading it
+        back on this device.
+
+        :param idle_timeout: stop reading once no data has been received
+            for this many seconds, in case data has been lost.
+        :return: throughput in bytes per second of data both written
+            and received
+        :raises: any exception raised by `peer.write`
+        """
+        buf = bytearray(len(data))
+        view = memoryview(buf)
+        written: list[int] = []
+        errors: list[Exception] = []
+
+        def write() -> None:
+            try:
+                written.append(peer.write(data))
+            except Exception as exc:
+                errors.append(exc)
+
+        writer = threading.Thread(target=write, daemon=True)
+        total = 0
+        start = last_rx = time.perf_counter()
+        writer.start()
+        try:
+            while total < len(data):
+                rlen = self._readinto_device(view[total:])
+                now = time.perf_counter()
+                if rlen:
+                    total += rlen
+                    last_rx = now
+                elif errors or now - last_rx > idle_timeout:
+                    break
+            elapsed = last_rx - start
+        finally:
+            writer.join()
+        if errors:
+            raise errors[0]
+        # a short write shouldn't count bytes which weren't reported written
+        total = min(total, written[0])
+        return total / elapsed if elapsed > 0 else 0.0
+
     def _read(self, length: int) -> bytes:
         """
         actually do the low level reading
@@ -389,13 +878,31 @@ class Device:
         :return: bytes read from the device
         :rtype: bytes
         """
-        buf = create_string_buffer(length)
-        rlen = self.fdll.ftdi_read_data(byref(self.ctx), byref(buf), length)
+        buf = self._rx_buf
+        if buf is None or len(buf) < length:
+            buf = self._rx_buf = create_string_buffer(length)
+        rlen = self.fdll.ftdi_read_data(self.ctx, buf, length)
         if rlen < 0:
             raise FtdiError(self.get_error_string())
-        byte_data = buf.raw[:rlen]
+        # string_at copies just the rlen bytes we want (buf.raw would copy
+        # the entire buffer before slicing).
+        return string_at(buf, rlen)
 
-        return byte_data
+    def _readinto(self, buffer: memoryview) -> int:
+        """
+        actually do the low level reading into a writable buffer
+
+        :param buffer: writable unsigned byte memoryview to read into
+        :return: number of bytes read into the start of `buffer`
+        """
+        length = len(buffer)
+        if length == 0:
+            return 0
+        c_buf = (c_char * length).from_buffer(buffer)
+        rlen: int = self.fdll.ftdi_read_data(self.ctx, c_buf, length)
+        if rlen < 0:
+            raise FtdiError(self.get_error_string())
+        return rlen
 
     def read(self, length: int) -> str | bytes:
         """
@@ -408,78 +915,494 @@ class Device:
         """
         if not self._opened:
             raise FtdiError("read() on closed Device")
+        if self._capture is not None:
+            raise FtdiError("read() not available during capture")
+
+        need = self._read_need(length)
+        pending = self._rx_pending
+        if pending:
+            # serve any previously buffered data first
+            byte_data = bytes(pending[:length])
+            del pending[:length]
+        else:
+            byte_data = b""
+        if len(byte_data) < length:
+            if need:
+                byte_data = self._read_waiting(
+                    byte_data,
+                    length,
+                    need,
+                    self.read_timeout,
+                    self.read_interbyte_timeout,
+                )
+            else:
+                byte_data += self._read_device(length - len(byte_data))
+        if len(byte_data) >= self.bulk_threshold:
+            self._adapt_latency(self.bulk_latency)
+        return self._decode(byte_data)
+
+    def read_exactly(self, length: int, timeout: float | None = None) -> str | bytes:
+        """
+        read_exactly(length[, timeout]) -> bytes/string of `length` bytes.
+
+        read exactly `length` bytes from the FTDI device, waiting for
+        further data as required.
+
+        :param length: number of bytes to read
+        :param timeout: maximum time to wait in seconds; defaults to the
+            `read_timeout` attribute. If both are None, wait indefinitely.
+        :raises FtdiTimeoutError: if fewer than `length` bytes arrive
+            within the timeout. Any partial data is retained and returned
+            by subsequent reads.
+        :rtype: bytes if self.mode is 'b', else decode with self.encoding
+        """
+        if not self._opened:
+            raise FtdiError("read_exactly() on closed Device")
+        if self._capture is not None:
+            raise FtdiError("read_exactly() not available during capture")
+
+        if timeout is None:
+            timeout = self.read_timeout
+        pending = self._rx_pending
+        byte_data = bytes(pending[:length])
+        del pending[:length]
+        if len(byte_data) < length:
+            byte_data = self._read_waiting(byte_data, length, length, timeout, None)
+        if len(byte_data) < length:
+            pending[:0] = byte_data
+            raise FtdiTimeoutError(
+                "read_exactly() timed out with %d of %d bytes"
+                % (len(byte_data), length)
+            )
+        return self._decode(byte_data)
+
+    def _read_need(self, length: int) -> int:
+        """
+        :return: the number of bytes a read of `length` bytes should wait
+            for under the current read policy; 0 if it shouldn't wait.
+        """
+        if self.read_min:
+            return min(length, self.read_min)
+        if self.read_timeout is not None or self.read_interbyte_timeout is not None:
+            return min(length, 1)
+        return 0
+
+    def _read_waiting(
+        self,
+        byte_data: bytes,
+        length: int,
+        need: int,
+        timeout: float | None,
+        interbyte: float | None,
+    ) -> bytes:
+        """
+        extend `byte_data` with up to `length` bytes in total from the
+        device, waiting for at least `need` bytes as for _wait_for_data()
+        """
+        byte_buffer = bytearray(byte_data)
+
+        def attempt(max_len: int) -> int:
+            rx_bytes = self._read_device(max_len)
+            byte_buffer.extend(rx_bytes)
+            return len(rx_bytes)
+
+        self._wait_for_data(
+            attempt,
+            len(byte_buffer),
+            length,
+            need,
+            timeout=timeout,
+            interbyte=interbyte,
+        )
+        return bytes(byte_buffer)
 
-        # read the data
+    def _wait_for_data(
+        self,
+        attempt: Callable[[int], int],
+        total: int,
+        length: int,
+        need: int,
+        *,
+        timeout: float | None,
+        interbyte: float | None,
+    ) -> int:
+        """
+        repeatedly call `attempt(max_len)` - which reads up to `max_len`
+        bytes and returns the count actually read - until `need` bytes
+        are available or a timeout expires.
+
+        Rather than spinning on the USB bus, polls are spaced out with an
+        exponential backoff: the device only sends partial packets when
+        its latency timer expires, so the delay between polls starts at
+        an eighth of the latency timer period and doubles up to the full
+        period while no data arrives, resetting when it does.
+
+        :param total: number of bytes already available
+        :param length: maximum total number of bytes to read
+        :param need: minimum total number of bytes to wait for
+        :param timeout: overall time limit in seconds, or None
+        :param interbyte: time limit in seconds for further data to arrive
+            once some data has been read, or None
+        :return: new total number of bytes available
+        """
+        if total < length:
+            total += attempt(length - total)
+        if total >= need:
+            return total
+
+        now = time.monotonic()
+        deadline = None if timeout is None else now + timeout
+        last_rx = now if total else None
+        max_delay = self._latency_timer / 1000
+        delay = max_delay / 8
+        while total < need:
+            wait = delay
+            if deadline is not None:
+                wait = min(wait, deadline - now)
+            if interbyte is not None and last_rx is not None:
+                wait = min(wait, last_rx + interbyte - now)
+            if wait <= 0:
+                break
+            time.sleep(wait)
+            rlen = attempt(length - total)
+            now = time.monotonic()
+            if rlen:
+                total += rlen
+                last_rx = now
+                delay = max_delay / 8
+            else:
+                delay = min(delay * 2, max_delay)
+        return total
+
+    def _read_device(self, length: int) -> bytes:
+        """
+        read up to `length` bytes from the device, honouring chunk_size
+        """
         if self.chunk_size != 0:
             remaining = length
-            byte_data_list = []
+            byte_buffer = bytearray()
             while remaining > 0:
                 rx_bytes = self._read(min(remaining, self.chunk_size))
                 if not rx_bytes:
                     break
-                byte_data_list.append(rx_bytes)
+                byte_buffer += rx_bytes
                 remaining -= len(rx_bytes)
-            byte_data = b"".join(byte_data_list)
+            return bytes(byte_buffer)
         else:
-            byte_data = self._read(length)
+            return self._read(length)
+
+    def _decode(self, byte_data: bytes) -> str | bytes:
+        """
+        :return: `byte_data` as-is in binary mode, otherwise decoded
+        """
         if self.mode == "b":
             return byte_data
         else:
             return self.decoder.decode(byte_data)
 
-    def _write(self, byte_data: bytes) -> int:
+    def readinto(self, buffer: Any) -> int:
+        """
+        readinto(buffer) -> count of bytes actually read
+
+        read up to `len(buffer)` bytes from the FTDI device directly
+        into `buffer`, avoiding any intermediate copies.
+
+        :param buffer: any writable object supporting the buffer protocol,
+            e.g. a bytearray, memoryview, array.array or numpy array.
+            Data is always raw bytes, regardless of the Device mode.
+        :return: count of bytes read, which may be less than `len(buffer)`
+        """
+        if not self._opened:
+            raise FtdiError("readinto() on closed Device")
+        if self._capture is not None:
+            raise FtdiError("readinto() not available during capture")
+
+        view = memoryview(buffer).cast("B")
+        total = 0
+        pending = self._rx_pending
+        if pending:
+            # serve any previously buffered data first
+            total = min(len(view), len(pending))
+            view[:total] = pending[:total]
+            del pending[:total]
+        length = len(view)
+        need = self._read_need(length)
+        if need:
+
+            def attempt(max_len: int) -> int:
+                return self._readinto_device(view[length - max_len :])
+
+            total = self._wait_for_data(
+                attempt,
+                total,
+                length,
+                need,
+                timeout=self.read_timeout,
+                interbyte=self.read_interbyte_timeout,
+            )
+        elif total < length:
+            total += self._readinto_device(view[total:])
+        if total >= self.bulk_threshold:
+            self._adapt_latency(self.bulk_latency)
+        return total
+
+    def _readinto_device(self, view: memoryview) -> int:
+        """
+        read up to `len(view)` bytes from the device into `view`,
+        honouring chunk_size
+        """
+        if self.chunk_size != 0:
+            total = 0
+            remaining = len(view)
+            while remaining > 0:
+                length = min(remaining, self.chunk_size)
+                rlen = self._readinto(view[total : total + length])
+                if rlen == 0:
+                    break
+                total += rlen
+                remaining -= rlen
+            return total
+        else:
+            return self._readinto(view)
+
+    def start_capture(
+        self, ring_size: int = 1 << 20, read_size: int | None = None
+    ) -> Capture:
+        """
+        start_capture([ring_size[, read_size]]) -> Capture instance
+
+        start continuously reading from the device in a background thread,
+        storing data in a preallocated ring buffer of `ring_size` bytes.
+        Captured data is read using the returned Capture object; read()
+        etc. on the Device itself are unavailable until stop_capture().
+
+        :param ring_size: size of the ring buffer in bytes. If the consumer
+            doesn't keep up, data which doesn't fit is dropped and counted
+            in Capture.overruns.
+        :param read_size: size of each device read; defaults to chunk_size
+            if set, otherwise 4096 bytes.
+        """
+        if not self._opened:
+            raise FtdiError("start_capture() on closed Device")
+        if self._capture is not None:
+            raise FtdiError("capture already running")
+        self._adapt_latency(self.bulk_latency)
+        self._capture = Capture(self, ring_size, read_size).start()
+        return self._capture
+
+    def stop_capture(self) -> None:
+        """
+        stop a capture started with start_capture(), if any
+        """
+        capture, self._capture = self._capture, None
+        if capture is not None:
+            capture.stop()
+
+    def _write(self, byte_data: bytes | memoryview | Array[c_char]) -> int:
         """
         actually do the low level writing
 
         :param byte_data: data to be written
-        :type byte_data: bytes
+        :type byte_data: bytes, an unsigned byte memoryview, or a ctypes
+            char array
         :return: number of bytes written
         """
-        buf = create_string_buffer(byte_data)
-        written: int = self.fdll.ftdi_write_data(
-            byref(self.ctx), byref(buf), len(byte_data)
-        )
+        length = len(byte_data)
+        buf: Any
+        if isinstance(byte_data, (bytes, Array)):
+            # ctypes passes bytes objects (and arrays) as a pointer to
+            # their internal storage, so no copy is needed here.
+            buf = byte_data
+        elif byte_data.readonly or length == 0:
+            # ctypes can only share memory with (non-empty) writable buffers
+            buf = byte_data.tobytes()
+        else:
+            buf = (c_char * length).from_buffer(byte_data)
+        written: int = self.fdll.ftdi_write_data(self.ctx, buf, length)
         if written < 0:
             raise FtdiError(self.get_error_string())
         return written
 
-    def write(self, data: str | bytes) -> int:
+    def write(self, data: str | bytes | bytearray | memoryview) -> int:
         """
         write(data) -> count of bytes actually written
 
         write given `data` string to the FTDI device
 
         :param data: string to be written
-        :type data: string or bytes
+        :type data: string, bytes, or any object supporting the buffer
+            protocol (e.g. bytearray, memoryview, array.array, mmap).
+            The memory of writable buffers is passed directly to libftdi
+            without being copied.
         :return: count of bytes written, which may be less than `len(data)`
         """
         if not self._opened:
             raise FtdiError("write() on closed Device")
 
-        if not isinstance(data, bytes):
-            data = self.encoder.encode(data)
-
-        assert isinstance(data, bytes)
+        byte_data: bytes | memoryview
+        if isinstance(data, str):
+            byte_data = self.encoder.encode(data)
+        elif isinstance(data, bytes):
+            byte_data = data
+        else:
+            byte_data = memoryview(data).cast("B")
+        if len(byte_data) < self.bulk_threshold:
+            self._adapt_latency(self.interactive_latency)
 
         # actually write it
         if self.chunk_size != 0:
-            remaining = len(data)
-            written = 0
-            while remaining > 0:
-                start = written
-                length = min(remaining, self.chunk_size)
-                result = self._write(data[start : start + length])
-                if result == 0:
-                    # don't continue to try writing forever if nothing
-                    # is actually being written
-                    break
-                else:
-                    written += result
-                    remaining -= result
-        else:
-            written = self._write(data)
+            return self._write_chunked(byte_data)
+        return self._write(byte_data)
+
+    def _write_chunked(self, byte_data: bytes | memoryview) -> int:
+        """
+        write `byte_data` in pieces of at most chunk_size bytes
+
+        :return: number of bytes written
+        """
+        base = None
+        if isinstance(byte_data, bytes):
+            # slices of bytes would be copies, so chunks are passed as
+            # char arrays over the storage of the bytes object instead.
+            base = cast(c_char_p(byte_data), c_void_p).value
+        remaining = len(byte_data)
+        written = 0
+        while remaining > 0:
+            start = written
+            length = min(remaining, self.chunk_size)
+            chunk: bytes | memoryview | Array[c_char]
+            if base is not None:
+                chunk = (c_char * length).from_address(base + start)
+            else:
+                chunk = byte_data[start : start + length]
+            result = self._write(chunk)
+            if result == 0:
+                # don't continue to try writing forever if nothing
+                # is actually being written
+                break
+            written += result
+            remaining -= result
         return written
 
+    def submit_read(self, buffer: Any) -> Transfer:
+        """
+        submit_read(buffer) -> Transfer instance
+
+        start an asynchronous read (ftdi_read_data_submit) into the given
+        writable buffer, returning without waiting for it to complete.
+        Call wait() on the result to get the number of bytes read; the
+        transfer only completes once the whole buffer has been filled.
+
+        Only one read transfer may be in progress at a time: libftdi keeps
+        a single read buffer per context, from which it strips the modem
+        status bytes of each packet, so overlapping reads could reorder or
+        corrupt data. Write transfers have no such limit.
+
+        This bypasses any data buffered by readline() etc.
+        """
+        if not self._opened:
+            raise FtdiError("submit_read() on closed Device")
+        if self._read_transfer is not None and not self._read_transfer.done:
+            raise FtdiError("submit_read() with a read transfer in progress")
+        view = memoryview(buffer).cast("B")
+        c_buf = (c_char * len(view)).from_buffer(view)
+        handle = self.fdll.ftdi_read_data_submit(self.ctx, c_buf, len(view))
+        if not handle:
+            raise FtdiError(self.get_error_string())
+        self._read_transfer = Transfer(self, handle, c_buf)
+        return self._read_transfer
+
+    def submit_write(self, data: bytes | bytearray | memoryview) -> Transfer:
+        """
+        submit_write(data) -> Transfer instance
+
+        start an asynchronous write (ftdi_write_data_submit) of `data`,
+        returning without waiting for it to complete. Call wait() on the
+        result to get the number of bytes written.
+
+        :param data: bytes, or any object supporting the buffer protocol.
+            This must not be modified until the transfer has completed.
+        """
+        if not self._opened:
+            raise FtdiError("submit_write() on closed Device")
+        buf: Any
+        if isinstance(data, bytes):
+            buf = data
+        else:
+            view = memoryview(data).cast("B")
+            if view.readonly or not view:
+                buf = view.tobytes()
+            else:
+                buf = (c_char * len(view)).from_buffer(view)
+        handle = self.fdll.ftdi_write_data_submit(self.ctx, buf, len(buf))
+        if not handle:
+            raise FtdiError(self.get_error_string())
+        return Transfer(self, handle, buf)
+
+    def stream_write(
+        self, buffers: Iterable[bytes | bytearray | memoryview], depth: int = 4
+    ) -> int:
+        """
+        stream_write(buffers[, depth]) -> total count of bytes written
+
+        write each of the given buffers to the device, keeping up to
+        `depth` USB transfers in flight at once so the bus isn't left
+        idle between transfers.
+
+        :param buffers: an iterable of bytes or buffer-protocol objects;
+            each buffer must not be modified until it has been written.
+        :param depth: the maximum number of concurrent transfers
+        """
+        self._adapt_latency(self.bulk_latency)
+        in_flight: collections.deque[Transfer] = collections.deque()
+        total = 0
+        try:
+            for data in buffers:
+                if len(in_flight) >= depth:
+                    total += in_flight.popleft().wait()
+                in_flight.append(self.submit_write(data))
+            while in_flight:
+                total += in_flight.popleft().wait()
+        finally:
+            for transfer in in_flight:
+                transfer.cancel()
+        return total
+
+    def stream_read(self, size: int, count: int | None = None) -> Iterator[bytes]:
+        """
+        stream_read(size[, count]) -> iterator of bytes
+
+        continuously read from the device in blocks of `size` bytes. Each
+        block is only complete once `size` bytes have been received, and
+        the next block's transfer is submitted before it is yielded.
+
+        Unlike stream_write() there is no `depth`: only one read transfer
+        may be in progress at a time (see submit_read()).
+
+        :param size: size of each block
+        :param count: number of blocks to read; if omitted, read until the
+            iterator is closed.
+        """
+        self._adapt_latency(self.bulk_latency)
+        buf = bytearray(size)
+        transfer = None
+        submitted = 0
+        try:
+            if count is None or count > 0:
+                transfer = self.submit_read(buf)
+                submitted += 1
+            while transfer is not None:
+                data = bytes(buf[: transfer.wait()])
+                transfer = None
+                if count is None or submitted < count:
+                    # the buffer is reused for the next transfer
+                    transfer = self.submit_read(buf)
+                    submitted += 1
+                yield data
+        finally:
+            if transfer is not None:
+                transfer.cancel()
+
     def flush(self, flush_what: int = FLUSH_BOTH) -> None:
         """
         Instruct the FTDI device to flush its FIFO buffers
@@ -503,7 +1426,9 @@ class Device:
             raise ValueError(
                 f"Invalid value passed to {self.__class__.__name__}.flush()"
             )
-        res = fn(byref(self.ctx))
+        if flush_what != FLUSH_OUTPUT:
+            self._rx_pending.clear()
+        res = fn(self.ctx)
         if res != 0:
             msg = "%s (%d)" % (self.get_error_string(), res)
             raise FtdiError(msg)
@@ -520,20 +1445,72 @@ class Device:
         """
         self.flush(FLUSH_OUTPUT)
 
+    def enable_stats(self) -> DeviceStats:
+        """
+        enable_stats() -> DeviceStats
+
+        start collecting statistics of reads and writes on this device:
+        bytes and calls in each direction, empty reads, short writes,
+        errors and latency histograms. (Transfers made with submit_read /
+        stream_read etc. aren't included.)
+
+        This replaces _read / _readinto / _write on this instance with
+        wrappers which record each call, so devices without statistics
+        enabled are unaffected.
+
+        :return: the live DeviceStats, which continues to be updated;
+            see also stats().
+        """
+        if self._stats is None:
+            stats = DeviceStats()
+            for name, wrap in (
+                ("_read", stats.wrap_read),
+                ("_readinto", stats.wrap_readinto),
+                ("_write", stats.wrap_write),
+            ):
+                setattr(self, name, wrap(getattr(self, name)))
+            self._stats = stats
+        return self._stats
+
+    def disable_stats(self) -> None:
+        """
+        stop collecting statistics, removing the wrappers added by
+        enable_stats()
+        """
+        if self._stats is not None:
+            del self._read, self._readinto, self._write
+            self._stats = None
+
+    def stats(self, reset: bool = False) -> DeviceStats:
+        """
+        stats([reset]) -> DeviceStats
+
+        :param reset: if True, reset the statistics after taking the
+            snapshot, so the next call reports activity since this one.
+        :return: a snapshot of the statistics collected since they were
+            enabled (or last reset).
+        """
+        if self._stats is None:
+            raise FtdiError("statistics not enabled; use enable_stats()")
+        snapshot = self._stats.copy()
+        if reset:
+            self._stats.reset()
+        return snapshot
+
     def get_error_string(self) -> str:
         """
         :return: error string from libftdi driver
         """
-        return str(self.fdll.ftdi_get_error_string(byref(self.ctx)))
+        return str(self.fdll.ftdi_get_error_string(self.ctx))
 
     @property
-    def ftdi_fn(self):  # type: ignore
+    def ftdi_fn(self) -> FtdiForwarder:
         """
         this allows the vast majority of libftdi functions
         which are called with a pointer to a ftdi_context
         struct as the first parameter to be called here
         preventing the need to leak self.ctx into the user
-        code (and import byref from ctypes):
+        code:
 
         >>> with Device() as dev:
         ...     # set 8 bit data, 2 stop bits, no parity
@@ -541,15 +1518,13 @@ class Device:
         ...
         """
 
-        # note this class is constructed on each call, so this
-        # won't be particularly quick.  It does ensure that the
-        # fdll and ctx objects in the closure are up-to-date, though.
-        class FtdiForwarder:
-            @no_type_check
-            def __getattr__(innerself, key: str):
-                return functools.partial(getattr(self.fdll, key), byref(self.ctx))
-
-        return FtdiForwarder()
+        # the forwarder (and the functions it binds) is cached until the
+        # device is closed, as each open() creates a new context.
+        forwarder = self._ftdi_fn
+        if forwarder is None:
+            forwarder = FtdiForwarder(self.fdll, self.ctx)
+            self._ftdi_fn = forwarder
+        return forwarder
 
     def __enter__(self) -> Device:
         """
@@ -582,44 +1557,114 @@ class Device:
         """
         return not self._opened
 
-    def readline(self, size: int = 0) -> str:
+    def _fill_rx_buffer(self, deadline: float | None = None) -> int:
         """
-        readline() for file-like compatibility.
+        read a block of data from the device into the receive buffer
 
-        :param size: maximum amount of data to read looking for a line
-        :return: a line of text, or size bytes if no line-ending found
+        If a read policy is set, wait for data to arrive, up to the
+        time.monotonic() value `deadline` (if not None) or until the
+        interbyte timeout expires if the buffer already holds data.
+
+        :return: number of bytes added to the buffer
+        """
+        if self._read_need(1):
+            timeout = None
+            if deadline is not None:
+                timeout = max(0.0, deadline - time.monotonic())
+            interbyte = self.read_interbyte_timeout
+            if self._rx_pending and interbyte is not None:
+                timeout = interbyte if timeout is None else min(timeout, interbyte)
+            rx_bytes = self._read_waiting(b"", self.read_block_size, 1, timeout, None)
+        else:
+            rx_bytes = self._read_device(self.read_block_size)
+        self._rx_pending += rx_bytes
+        return len(rx_bytes)
 
-        This only works for mode='t' on Python3
+    def read_until(
+        self, delimiter: str | bytes | None = None, max_size: int | None = None
+    ) -> str | bytes:
+        """
+        read_until([delimiter[, max_size]]) -> bytes/string up to and
+        including `delimiter`
+
+        Data is read from the device in blocks of `read_block_size` bytes,
+        and any data beyond the delimiter is buffered for subsequent reads.
+
+        :param delimiter: str or bytes to search for; defaults to the
+            Device `delimiter` attribute. A str is encoded with the Device
+            encoding.
+        :param max_size: if given, return at most this many bytes even if
+            the delimiter has not been found
+        :return: data up to and including the delimiter, or all available
+            data (up to `max_size`) if no delimiter is found before the
+            device stops returning data. If a read policy is set, this
+            waits for further data up to `read_timeout` overall.
+        :rtype: bytes if self.mode is 'b', else decode with self.encoding
         """
-        lsl = len(os.linesep)
-        line_buffer: list[str] = []
+        if not self._opened:
+            raise FtdiError("read_until() on closed Device")
+        if self._capture is not None:
+            raise FtdiError("read_until() not available during capture")
+
+        if delimiter is None:
+            delimiter = self.delimiter
+        if isinstance(delimiter, str):
+            delimiter = delimiter.encode(self.encoding)
+        if not delimiter:
+            raise ValueError("delimiter must not be empty")
+
+        deadline = None
+        if self.read_timeout is not None:
+            deadline = time.monotonic() + self.read_timeout
+        pending = self._rx_pending
+        search_start = 0
         while True:
-            next_char = self.read(1)
-            if not isinstance(next_char, str):
-                raise TypeError(".readline() only works for mode='t'")
-            if not next_char or (0 < size < len(line_buffer)):
+            idx = pending.find(delimiter, search_start)
+            if idx >= 0:
+                end = idx + len(delimiter)
                 break
-            line_buffer.append(next_char)
-            if len(line_buffer) >= lsl and line_buffer[-lsl:] == list(os.linesep):
+            if max_size is not None and len(pending) >= max_size:
+                end = max_size
                 break
-        return "".join(line_buffer)
+            # the delimiter could straddle the end of the existing data
+            search_start = max(0, len(pending) - len(delimiter) + 1)
+            if not self._fill_rx_buffer(deadline):
+                end = len(pending)
+                break
+        if max_size is not None:
+            end = min(end, max_size)
+        byte_data = bytes(pending[:end])
+        del pending[:end]
+        return self._decode(byte_data)
 
-    def readlines(self, sizehint: int | None = None) -> list[str]:
+    def readline(self, size: int = 0) -> str | bytes:
         """
-        readlines() for file-like compatibility.
+        readline() for file-like compatibility.
+
+        :param size: maximum amount of data to read looking for a line
+        :return: a line of data, or size bytes if no delimiter found
+
+        The line delimiter is given by the `delimiter` attribute.
+        """
+        return self.read_until(self.delimiter, size if size > 0 else None)
+
+    def readlines(self, sizehint: int | None = None) -> list[str | bytes]:
         """
-        lines: list[str] = []
-        if sizehint is not None:
-            string_blob = self.read(sizehint)
-            if not isinstance(string_blob, str):
-                raise TypeError(".readlines() only works for mode='t'")
-            lines.extend(string_blob.splitlines())
+        readlines() for file-like compatibility.
 
+        :param sizehint: if given, stop reading lines once their total
+            length reaches this value
+        """
+        lines: list[str | bytes] = []
+        total = 0
         while True:
             line = self.readline()
             if not line:
                 break
             lines.append(line)
+            total += len(line)
+            if sizehint and total >= sizehint:
+                break
         return lines
 
     def writelines(self, lines: list[str | bytes]) -> None:
@@ -631,15 +1676,110 @@ class Device:
         for line in lines:
             self.write(line)
 
+    def makefile(
+        self,
+        mode: str = "rb",
+        buffering: int | None = None,
+        *,
+        encoding: str | None = None,
+        errors: str | None = None,
+        newline: str | None = None,
+    ) -> Any:
+        """
+        makefile([mode[, buffering[, OPTIONS ...]]]) -> file object
+
+        return a standard `io` file object for this device, in the same
+        way as socket.makefile(). This uses the io module's (C) buffering
+        and text decoding / newline handling on top of a `DeviceIO`
+        raw stream.
+
+        :param mode: a combination of 'r', 'w' and 'b'; defaults to 'rb'.
+            Without 'b', a TextIOWrapper is returned.
+        :param buffering: buffer size; 0 returns the unbuffered DeviceIO
+            (binary mode only), and None or a negative value uses
+            io.DEFAULT_BUFFER_SIZE.
+        :param encoding: text encoding; defaults to the Device encoding
+        :param errors: passed to io.TextIOWrapper
+        :param newline: passed to io.TextIOWrapper
+
+        Closing the returned file object does not close the Device.
+        """
+        if not set(mode) <= {"r", "w", "b"}:
+            raise ValueError(f"invalid mode {mode!r} (only r, w, b allowed)")
+        writing = "w" in mode
+        reading = "r" in mode or not writing
+        binary = "b" in mode
+        raw = DeviceIO(self, ("r" if reading else "") + ("w" if writing else ""))
+        if buffering is None or buffering < 0:
+            buffering = io.DEFAULT_BUFFER_SIZE
+        if buffering == 0:
+            if not binary:
+                raise ValueError("unbuffered streams must be binary")
+            return raw
+        buffer: io.BufferedIOBase
+        if reading and writing:
+            buffer = io.BufferedRWPair(raw, raw, buffering)
+        elif reading:
+            buffer = io.BufferedReader(raw, buffering)
+        else:
+            buffer = io.BufferedWriter(raw, buffering)
+        if binary:
+            return buffer
+        return io.TextIOWrapper(buffer, encoding or self.encoding, errors, newline)
+
     def __iter__(self) -> Device:
         return self
 
-    def __next__(self) -> str:
-        while True:
-            line = self.readline()
-            if line:
-                return line
-            else:
-                raise StopIteration
+    def __next__(self) -> str | bytes:
+        line = self.readline()
+        if line:
+            return line
+        else:
+            raise StopIteration
 
     next = __next__
+
+
+class DeviceIO(io.RawIOBase):
+    """
+    Raw I/O stream for a Device, allowing it to be wrapped with the
+    io module's buffered and text layers (io.BufferedReader,
+    io.BufferedRWPair, io.TextIOWrapper etc). See also Device.makefile().
+
+    As with Device.read(), a read returning no data means no data is
+    currently available, rather than end-of-file.
+    """
+
+    def __init__(self, device: Device, mode: str = "rw") -> None:
+        """
+        :param device: the Device to read from / write to
+        :param mode: 'r', 'w' or 'rw' to control readable() / writable()
+        """
+        super().__init__()
+        self._device = device
+        self._reading = "r" in mode
+        self._writing = "w" in mode
+
+    @property
+    def device(self) -> Device:
+        return self._device
+
+    def readable(self) -> bool:
+        return self._reading
+
+    def writable(self) -> bool:
+        return self._writing
+
+    def readinto(self, buffer: Any) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+        if not self._reading:
+            raise io.UnsupportedOperation("not readable")
+        return self._device.readinto(buffer)
+
+    def write(self, data: Any) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+        if not self._writing:
+            raise io.UnsupportedOperation("not writable")
+        return self._device.write(data)
@@ -10,17 +10,29 @@ pylibftdi: https://github.com/codedstructure/pylibftdi
 
 from __future__ import annotations
 
+import contextlib
 import itertools
+import threading
 from collections import namedtuple
+from collections.abc import Callable, Iterator
 
 # be disciplined so pyflakes can check us...
 from ctypes import (
+    CFUNCTYPE,
     POINTER,
     Structure,
     byref,
     c_char_p,
+    c_double,
     c_int,
+    c_long,
+    c_ssize_t,
+    c_ubyte,
+    c_uint,
+    c_uint8,
     c_uint16,
+    c_uint32,
+    c_uint64,
     c_void_p,
     cast,
     cdll,
@@ -30,6 +42,12 @@ from ctypes.util import find_library
 from typing import Any
 
 from pylibftdi._base import FtdiError, LibraryMissingError
+from pylibftdi.profiler import (
+    ProfiledLibrary,
+    Profiler,
+    default_profiler,
+    profile_requested,
+)
 
 
 class libusb_version_struct(Structure):
@@ -46,10 +64,70 @@ class libusb_version_struct(Structure):
 libusb_version = namedtuple("libusb_version", "major minor micro nano rc describe")
 
 
+class libusb_device_descriptor(Structure):
+    _fields_ = [
+        ("bLength", c_uint8),
+        ("bDescriptorType", c_uint8),
+        ("bcdUSB", c_uint16),
+        ("bDeviceClass", c_uint8),
+        ("bDeviceSubClass", c_uint8),
+        ("bDeviceProtocol", c_uint8),
+        ("bMaxPacketSize0", c_uint8),
+        ("idVendor", c_uint16),
+        ("idProduct", c_uint16),
+        ("bcdDevice", c_uint16),
+        ("iManufacturer", c_uint8),
+        ("iProduct", c_uint8),
+        ("iSerialNumber", c_uint8),
+        ("bNumConfigurations", c_uint8),
+    ]
+
+
+class libusb_config_descriptor(Structure):
+    # only the leading fields of the structure, which is always allocated
+    # by libusb, so this is all that is needed to read them.
+    _fields_ = [
+        ("bLength", c_uint8),
+        ("bDescriptorType", c_uint8),
+        ("wTotalLength", c_uint16),
+        ("bNumInterfaces", c_uint8),
+    ]
+
+
 class ftdi_device_list(Structure):
     _fields_ = [("next", c_void_p), ("dev", c_void_p)]
 
 
+class ftdi_context(Structure):
+    # This is the libftdi 1.x layout. The 0.x structure is different (no
+    # usb_ctx member, amongst other changes), so fields should only be
+    # accessed when libftdi_version().major > 0; pointers to it can still
+    # be passed around opaquely with either version.
+    _fields_ = [
+        ("usb_ctx", c_void_p),
+        ("usb_dev", c_void_p),
+        ("usb_read_timeout", c_int),
+        ("usb_write_timeout", c_int),
+        ("type", c_int),
+        ("baudrate", c_int),
+        ("bitbang_enabled", c_ubyte),
+        ("readbuffer", POINTER(c_ubyte)),
+        ("readbuffer_offset", c_uint),
+        ("readbuffer_remaining", c_uint),
+        ("readbuffer_chunksize", c_uint),
+        ("writebuffer_chunksize", c_uint),
+        ("max_packet_size", c_uint),
+        ("interface", c_int),
+        ("index", c_int),
+        ("in_ep", c_int),
+        ("out_ep", c_int),
+        ("bitbang_mode", c_ubyte),
+        ("eeprom", c_void_p),
+        ("error_str", c_char_p),
+        ("module_detach_mode", c_int),
+    ]
+
+
 class ftdi_version_info(Structure):
     _fields_ = [
         ("major", c_int),
@@ -65,6 +143,152 @@ libftdi_version = namedtuple(
 )
 
 
+class timeval(Structure):
+    _fields_ = [("tv_sec", c_long), ("tv_usec", c_long)]
+
+
+class size_and_time(Structure):
+    _fields_ = [("totalBytes", c_uint64), ("time", timeval)]
+
+
+class FTDIProgressInfo(Structure):
+    _fields_ = [
+        ("first", size_and_time),
+        ("prev", size_and_time),
+        ("current", size_and_time),
+        ("totalTime", c_double),
+        ("totalRate", c_double),
+        ("currentRate", c_double),
+    ]
+
+
+# int callback(libusb_context *ctx, libusb_device *device,
+#              libusb_hotplug_event event, void *user_data)
+LibusbHotplugCallback = CFUNCTYPE(c_int, c_void_p, c_void_p, c_int, c_void_p)
+
+# int callback(uint8_t *buffer, int length, FTDIProgressInfo *progress,
+#              void *userdata)
+FTDIStreamCallback = CFUNCTYPE(
+    c_int, POINTER(c_ubyte), c_int, POINTER(FTDIProgressInfo), c_void_p
+)
+
+_ctx_p = POINTER(ftdi_context)
+
+# (restype, argtypes) for the libftdi functions used by pylibftdi.
+# Declaring these avoids ctypes' implicit int conversions - which would
+# truncate pointers on 64-bit platforms - and lets context pointers from
+# ftdi_new() be passed directly. Functions missing from the loaded library
+# (e.g. on older libftdi versions) are skipped.
+FTDI_PROTOTYPES: dict[str, tuple[Any, tuple[Any, ...]]] = {
+    "ftdi_new": (_ctx_p, ()),
+    "ftdi_free": (None, (_ctx_p,)),
+    "ftdi_init": (c_int, (_ctx_p,)),
+    "ftdi_deinit": (None, (_ctx_p,)),
+    "ftdi_get_error_string": (c_char_p, (_ctx_p,)),
+    "ftdi_set_interface": (c_int, (_ctx_p, c_int)),
+    "ftdi_usb_find_all": (
+        c_int,
+        (_ctx_p, POINTER(POINTER(ftdi_device_list)), c_int, c_int),
+    ),
+    "ftdi_list_free": (None, (POINTER(POINTER(ftdi_device_list)),)),
+    "ftdi_usb_get_strings": (
+        c_int,
+        (_ctx_p, c_void_p, c_char_p, c_int, c_char_p, c_int, c_char_p, c_int),
+    ),
+    "ftdi_usb_get_strings2": (
+        c_int,
+        (_ctx_p, c_void_p, c_char_p, c_int, c_char_p, c_int, c_char_p, c_int),
+    ),
+    "ftdi_usb_open_desc_index": (
+        c_int,
+        (_ctx_p, c_int, c_int, c_char_p, c_char_p, c_uint),
+    ),
+    "ftdi_usb_open_dev": (c_int, (_ctx_p, c_void_p)),
+    "ftdi_usb_open_bus_addr": (c_int, (_ctx_p, c_uint8, c_uint8)),
+    "ftdi_usb_close": (c_int, (_ctx_p,)),
+    "ftdi_usb_purge_buffers": (c_int, (_ctx_p,)),
+    "ftdi_usb_purge_rx_buffer": (c_int, (_ctx_p,)),
+    "ftdi_usb_purge_tx_buffer": (c_int, (_ctx_p,)),
+    "ftdi_set_baudrate": (c_int, (_ctx_p, c_int)),
+    "ftdi_set_line_property": (c_int, (_ctx_p, c_int, c_int, c_int)),
+    "ftdi_setflowctrl": (c_int, (_ctx_p, c_int)),
+    "ftdi_set_bitmode": (c_int, (_ctx_p, c_ubyte, c_ubyte)),
+    "ftdi_disable_bitbang": (c_int, (_ctx_p,)),
+    "ftdi_read_pins": (c_int, (_ctx_p, POINTER(c_ubyte))),
+    "ftdi_set_latency_timer": (c_int, (_ctx_p, c_ubyte)),
+    "ftdi_get_latency_timer": (c_int, (_ctx_p, POINTER(c_ubyte))),
+    "ftdi_read_data": (c_int, (_ctx_p, c_void_p, c_int)),
+    "ftdi_write_data": (c_int, (_ctx_p, c_void_p, c_int)),
+    "ftdi_read_data_set_chunksize": (c_int, (_ctx_p, c_uint)),
+    "ftdi_read_data_get_chunksize": (c_int, (_ctx_p, POINTER(c_uint))),
+    "ftdi_write_data_set_chunksize": (c_int, (_ctx_p, c_uint)),
+    "ftdi_write_data_get_chunksize": (c_int, (_ctx_p, POINTER(c_uint))),
+    "ftdi_poll_modem_status": (c_int, (_ctx_p, POINTER(c_uint16))),
+    "ftdi_setdtr": (c_int, (_ctx_p, c_int)),
+    "ftdi_setrts": (c_int, (_ctx_p, c_int)),
+    "ftdi_setdtr_rts": (c_int, (_ctx_p, c_int, c_int)),
+    # the returned ftdi_transfer_control pointers are treated as opaque
+    "ftdi_read_data_submit": (c_void_p, (_ctx_p, c_void_p, c_int)),
+    "ftdi_write_data_submit": (c_void_p, (_ctx_p, c_void_p, c_int)),
+    "ftdi_transfer_data_done": (c_int, (c_void_p,)),
+    "ftdi_transfer_data_cancel": (None, (c_void_p, c_void_p)),
+    "ftdi_readstream": (c_int, (_ctx_p, FTDIStreamCallback, c_void_p, c_int, c_int)),
+}
+
+# (restype, argtypes) for the libusb functions used by pylibftdi, which
+# operate on libusb_device pointers from libftdi and libusb_get_device_list.
+LIBUSB_PROTOTYPES: dict[str, tuple[Any, tuple[Any, ...]]] = {
+    "libusb_set_auto_detach_kernel_driver": (c_int, (c_void_p, c_int)),
+    "libusb_get_device_list": (c_ssize_t, (c_void_p, POINTER(POINTER(c_void_p)))),
+    "libusb_free_device_list": (None, (POINTER(c_void_p), c_int)),
+    "libusb_get_device": (c_void_p, (c_void_p,)),
+    "libusb_get_bus_number": (c_uint8, (c_void_p,)),
+    "libusb_get_device_address": (c_uint8, (c_void_p,)),
+    "libusb_get_port_numbers": (c_int, (c_void_p, POINTER(c_uint8), c_int)),
+    "libusb_get_device_descriptor": (
+        c_int,
+        (c_void_p, POINTER(libusb_device_descriptor)),
+    ),
+    "libusb_get_config_descriptor": (
+        c_int,
+        (c_void_p, c_uint8, POINTER(POINTER(libusb_config_descriptor))),
+    ),
+    "libusb_free_config_descriptor": (None, (POINTER(libusb_config_descriptor),)),
+    "libusb_ref_device": (c_void_p, (c_void_p,)),
+    "libusb_unref_device": (None, (c_void_p,)),
+    "libusb_has_capability": (c_int, (c_uint32,)),
+    "libusb_hotplug_register_callback": (
+        c_int,
+        (
+            c_void_p,
+            c_int,
+            c_int,
+            c_int,
+            c_int,
+            c_int,
+            LibusbHotplugCallback,
+            c_void_p,
+            POINTER(c_int),
+        ),
+    ),
+    "libusb_hotplug_deregister_callback": (None, (c_void_p, c_int)),
+    "libusb_handle_events_timeout_completed": (
+        c_int,
+        (c_void_p, POINTER(timeval), POINTER(c_int)),
+    ),
+    "libusb_interrupt_event_handler": (None, (c_void_p,)),
+}
+
+# USB 3.0 allows up to 7 levels of hubs
+USB_MAX_PORT_DEPTH = 7
+
+# libusb hotplug constants
+LIBUSB_CAP_HAS_HOTPLUG = 0x0001
+LIBUSB_HOTPLUG_EVENT_DEVICE_ARRIVED = 0x01
+LIBUSB_HOTPLUG_EVENT_DEVICE_LEFT = 0x02
+LIBUSB_HOTPLUG_MATCH_ANY = -1
+
+
 # These constants determine what type of flush operation to perform
 FLUSH_BOTH = 1
 FLUSH_INPUT = 2
@@ -72,6 +296,24 @@ FLUSH_OUTPUT = 3
 # Device Modes
 BITMODE_RESET = 0x00
 BITMODE_BITBANG = 0x01
+BITMODE_MPSSE = 0x02
+BITMODE_SYNCBB = 0x04
+BITMODE_MCU = 0x08
+BITMODE_OPTO = 0x10
+BITMODE_CBUS = 0x20
+BITMODE_SYNCFF = 0x40
+BITMODE_FT1284 = 0x80
+# Chip types, as found in ftdi_context.type
+TYPE_AM = 0
+TYPE_BM = 1
+TYPE_2232C = 2
+TYPE_R = 3
+TYPE_2232H = 4
+TYPE_4232H = 5
+TYPE_232H = 6
+TYPE_230X = 7
+# USB 2.0 high-speed (480Mbps) chips; the others are full-speed (12Mbps)
+HIGH_SPEED_TYPES = (TYPE_2232H, TYPE_4232H, TYPE_232H)
 
 # Opening / searching for a device uses this list of IDs to search
 # by default. These can be extended directly after import if required.
@@ -82,6 +324,139 @@ USB_PID_LIST = [0x6001, 0x6010, 0x6011, 0x6014, 0x6015]
 FTDI_ERROR_DEVICE_NOT_FOUND = -3
 
 
+class _EnumerationContext:
+    """
+    The ftdi_context and libusb_device references used by
+    Driver.enumerate_devices(). These are kept until all the DeviceInfo
+    instances from an enumeration have been discarded, so string
+    descriptors can be fetched on demand.
+    """
+
+    def __init__(self, driver: Driver) -> None:
+        self.driver = driver
+        self.fdll = driver.fdll
+        self._devices: list[Any] = []
+        # the ftdi_context can only be used by one thread at a time
+        self._lock = threading.Lock()
+        self.ctx = self.fdll.ftdi_new()
+        if not self.ctx:
+            self.ctx = None
+            raise FtdiError("could not allocate ftdi_context")
+
+    def ref(self, dev: Any) -> Any:
+        """
+        take a reference to libusb_device `dev`, so it remains valid
+        after the device list is freed
+        """
+        self.driver._libusb.libusb_ref_device(dev)
+        self._devices.append(dev)
+        return dev
+
+    def unref(self, dev: Any) -> None:
+        """
+        release the reference to `dev` taken by ref(), unless already
+        released by close()
+        """
+        if dev in self._devices:
+            self._devices.remove(dev)
+            self.driver._libusb.libusb_unref_device(dev)
+
+    def get_strings(self, dev: Any) -> tuple[str, str, str]:
+        """
+        :return: (manufacturer, description, serial) strings of `dev`;
+            strings which can't be read are empty.
+        """
+        manuf = create_string_buffer(128)
+        desc = create_string_buffer(128)
+        serial = create_string_buffer(128)
+        if self.ctx is None:
+            raise FtdiError("device enumeration has been closed")
+        with self._lock:
+            res = self.fdll.ftdi_usb_get_strings(
+                self.ctx, dev, manuf, 127, desc, 127, serial, 127
+            )
+        # don't error on failure to get all the data
+        # error codes: -7: manuf, -8: desc, -9: serial
+        if res < 0 and res not in (-7, -8, -9):
+            err_msg = self.fdll.ftdi_get_error_string(self.ctx)
+            raise FtdiError("%s (%d)" % (err_msg, res))
+        return (
+            manuf.value.decode(errors="replace"),
+            desc.value.decode(errors="replace"),
+            serial.value.decode(errors="replace"),
+        )
+
+    def close(self) -> None:
+        if self.ctx is not None:
+            for dev in self._devices:
+                self.driver._libusb.libusb_unref_device(dev)
+            self._devices = []
+            self.fdll.ftdi_free(self.ctx)
+            self.ctx = None
+
+    def __del__(self) -> None:
+        self.close()
+
+
+class DeviceInfo:
+    """
+    Information about an attached device, as returned by
+    Driver.enumerate_devices().
+
+    The vid, pid, bus, address, port_path and num_interfaces attributes
+    are read during enumeration without accessing the device itself. The
+    manufacturer, description and serial string descriptors require
+    communicating with the device, so are only read when first used.
+    """
+
+    def __init__(
+        self,
+        context: _EnumerationContext,
+        dev: Any,
+        *,
+        vid: int,
+        pid: int,
+        location: tuple[int, int, str],
+        num_interfaces: int,
+    ) -> None:
+        self._context = context
+        self._dev = dev
+        self._strings: tuple[str, str, str] | None = None
+        self.vid = vid
+        self.pid = pid
+        self.bus, self.address, self.port_path = location
+        self.num_interfaces = num_interfaces
+
+    def __del__(self) -> None:
+        self._context.unref(self._dev)
+
+    def _get_strings(self) -> tuple[str, str, str]:
+        if self._strings is None:
+            self._strings = self._context.get_strings(self._dev)
+        return self._strings
+
+    @property
+    def manufacturer(self) -> str:
+        return self._get_strings()[0]
+
+    @property
+    def description(self) -> str:
+        return self._get_strings()[1]
+
+    @property
+    def serial(self) -> str:
+        return self._get_strings()[2]
+
+    def __repr__(self) -> str:
+        return "<DeviceInfo %04x:%04x bus %d address %d port %s>" % (
+            self.vid,
+            self.pid,
+            self.bus,
+            self.address,
+            self.port_path,
+        )
+
+
 class Driver:
     """
     This is where it all happens...
@@ -96,12 +471,30 @@ class Driver:
         "libusb": ["usb-1.0", "libusb-1.0"],
     }
 
-    def __init__(self, libftdi_search: str | list[str] | None = None) -> None:
+    # Libraries loaded by any Driver, keyed by (name, search list), so that
+    # finding, loading and setting up prototypes for each library happens
+    # once per process however many Driver instances there are.
+    _libraries: dict[tuple[str, tuple[str, ...]], Any] = {}
+    # libftdi_version() of each libftdi in _libraries, with the same keys
+    _libftdi_versions: dict[tuple[str, tuple[str, ...]], libftdi_version] = {}
+    _libraries_lock = threading.Lock()
+
+    def __init__(
+        self,
+        libftdi_search: str | list[str] | None = None,
+        profile: bool | Profiler | None = None,
+    ) -> None:
         """
         :param libftdi_search: force a particular version of libftdi to be used
             can specify either library name(s) or path(s)
         :type libftdi_search: string or a list of strings
+        :param profile: if True, time all calls made through fdll with
+            pylibftdi.profiler.default_profiler(); a Profiler instance may
+            be given instead. Defaults to enabled if the PYLIBFTDI_PROFILE
+            environment variable is set.
         """
+        # copied so that libftdi_search only applies to this instance
+        self._lib_search = dict(self._lib_search)
         if isinstance(libftdi_search, str):
             self._lib_search["libftdi"] = [libftdi_search]
         elif isinstance(libftdi_search, list):
@@ -115,6 +508,18 @@ class Driver:
         # Library handles.
         self._fdll: Any = None
         self._libusb_dll: Any = None
+        # key of self._fdll in Driver._libraries, if loaded from there
+        self._fdll_key: tuple[str, tuple[str, ...]] | None = None
+        self._libftdi_version: libftdi_version | None = None
+
+        if profile is None:
+            profile = profile_requested()
+        # Profiler timing calls through fdll, if any
+        self.profiler: Profiler | None
+        if isinstance(profile, Profiler):
+            self.profiler = profile
+        else:
+            self.profiler = default_profiler() if profile else None
 
     def _load_library(self, name: str, search_list: list[str] | None = None) -> Any:
         """
@@ -162,11 +567,37 @@ class Driver:
         primarily for diagnostic purposes.
         """
         if self._libusb_dll is None:
-            self._libusb_dll = self._load_library("libusb")
-            self._libusb_dll.libusb_get_version.restype = POINTER(libusb_version_struct)
-
+            key = self._library_key("libusb")
+            self._libusb_dll = self._shared_library(key, self._setup_libusb)
         return self._libusb_dll
 
+    def _library_key(self, name: str) -> tuple[str, tuple[str, ...]]:
+        return name, tuple(self._lib_search.get(name, []))
+
+    def _shared_library(
+        self, key: tuple[str, tuple[str, ...]], setup: Callable[[Any], None]
+    ) -> Any:
+        """
+        :return: the library with the given key from Driver._libraries,
+            loading it and calling `setup` with it if not already loaded.
+        """
+        with Driver._libraries_lock:
+            lib = Driver._libraries.get(key)
+            if lib is None:
+                lib = self._load_library(key[0])
+                setup(lib)
+                Driver._libraries[key] = lib
+        return lib
+
+    @staticmethod
+    def _setup_libusb(lib: Any) -> None:
+        lib.libusb_get_version.restype = POINTER(libusb_version_struct)
+        for name, (restype, argtypes) in LIBUSB_PROTOTYPES.items():
+            if hasattr(lib, name):
+                fn = getattr(lib, name)
+                fn.restype = restype
+                fn.argtypes = argtypes
+
     def libusb_version(self) -> libusb_version:
         """
         :return: namedtuple containing version info on libusb
@@ -181,6 +612,39 @@ class Driver:
             ver.describe.decode(),
         )
 
+    @contextlib.contextmanager
+    def _usb_device_list(self, usb_ctx: Any) -> Iterator[list[Any]]:
+        """
+        context manager providing a list of libusb_device pointers for
+        all attached USB devices, which are valid within the context.
+
+        :param usb_ctx: the libusb context, e.g. ftdi_context.usb_ctx
+        """
+        libusb = self._libusb
+        dev_list = POINTER(c_void_p)()
+        count = libusb.libusb_get_device_list(usb_ctx, byref(dev_list))
+        if count < 0:
+            raise FtdiError("libusb_get_device_list failed (%d)" % count)
+        try:
+            yield [dev_list[i] for i in range(count)]
+        finally:
+            libusb.libusb_free_device_list(dev_list, 1)
+
+    def _usb_location(self, dev: Any) -> tuple[int, int, str]:
+        """
+        :param dev: a libusb_device pointer
+        :return: (bus, address, port_path) of the device, where port_path
+            is of the form used by Linux sysfs, e.g. '1-2.3' for port 3 of
+            a hub on port 2 of bus 1.
+        """
+        libusb = self._libusb
+        bus = libusb.libusb_get_bus_number(dev)
+        address = libusb.libusb_get_device_address(dev)
+        ports = (c_uint8 * USB_MAX_PORT_DEPTH)()
+        count = libusb.libusb_get_port_numbers(dev, ports, USB_MAX_PORT_DEPTH)
+        port_path = "%d-%s" % (bus, ".".join(str(p) for p in ports[: max(count, 0)]))
+        return bus, address, port_path
+
     @property
     def fdll(self) -> Any:
         """
@@ -189,33 +653,30 @@ class Driver:
         This is the main interface to FTDI functionality.
         """
         if self._fdll is None:
-            self._fdll = self._load_library("libftdi")
-            # most args/return types are fine with the implicit
-            # int/void* which ctypes uses, but some need setting here
-            self._fdll.ftdi_get_error_string.restype = c_char_p
-            self._fdll.ftdi_usb_get_strings.argtypes = (
-                c_void_p,
-                c_void_p,
-                c_char_p,
-                c_int,
-                c_char_p,
-                c_int,
-                c_char_p,
-                c_int,
-            )
-            # library versions <1.0 don't provide ftdi_get_library_version, so
-            # we need to check for it before setting the restype.
-            if hasattr(self._fdll, "ftdi_get_library_version"):
-                self._fdll.ftdi_get_library_version.restype = ftdi_version_info
+            key = self._library_key("libftdi")
+            fdll = self._shared_library(key, self._setup_libftdi)
+            if self.profiler is not None:
+                fdll = ProfiledLibrary(fdll, self.profiler)
+            self._fdll = fdll
+            self._fdll_key = key
         return self._fdll
 
-    def libftdi_version(self) -> libftdi_version:
-        """
-        :return: the version of the underlying library being used
-        :rtype: tuple (major, minor, micro, version_string, snapshot_string)
-        """
-        if hasattr(self.fdll, "ftdi_get_library_version"):
-            version = self.fdll.ftdi_get_library_version()
+    @staticmethod
+    def _setup_libftdi(lib: Any) -> None:
+        for name, (restype, argtypes) in FTDI_PROTOTYPES.items():
+            if hasattr(lib, name):
+                fn = getattr(lib, name)
+                fn.restype = restype
+                fn.argtypes = argtypes
+        # library versions <1.0 don't provide ftdi_get_library_version, so
+        # we need to check for it before setting the restype.
+        if hasattr(lib, "ftdi_get_library_version"):
+            lib.ftdi_get_library_version.restype = ftdi_version_info
+
+    @staticmethod
+    def _read_libftdi_version(fdll: Any) -> libftdi_version:
+        if hasattr(fdll, "ftdi_get_library_version"):
+            version = fdll.ftdi_get_library_version()
             return libftdi_version(
                 version.major,
                 version.minor,
@@ -229,6 +690,102 @@ class Driver:
                 0, 0, 0, "< 1.0 - no ftdi_get_library_version()", "unknown"
             )
 
+    def libftdi_version(self) -> libftdi_version:
+        """
+        :return: the version of the underlying library being used
+        :rtype: tuple (major, minor, micro, version_string, snapshot_string)
+
+        This is determined once per library and cached.
+        """
+        if self._libftdi_version is None:
+            fdll = self.fdll
+            key = self._fdll_key
+            version = Driver._libftdi_versions.get(key) if key else None
+            if version is None:
+                version = self._read_libftdi_version(fdll)
+                if key:
+                    Driver._libftdi_versions[key] = version
+            self._libftdi_version = version
+        return self._libftdi_version
+
+    def _num_interfaces(self, dev: Any) -> int:
+        """
+        :return: number of interfaces in the first configuration of
+            libusb_device `dev`, or 0 if this can't be determined.
+        """
+        libusb = self._libusb
+        config = POINTER(libusb_config_descriptor)()
+        if libusb.libusb_get_config_descriptor(dev, 0, byref(config)) != 0:
+            return 0
+        try:
+            return int(config.contents.bNumInterfaces)
+        finally:
+            libusb.libusb_free_config_descriptor(config)
+
+    def enumerate_devices(
+        self, vid_list: list[int] | None = None, pid_list: list[int] | None = None
+    ) -> list[DeviceInfo]:
+        """
+        :return: a DeviceInfo for each attached device matching the given
+            vendor and product IDs.
+
+        Unlike list_devices(), this scans the USB bus once regardless of
+        the number of IDs, and doesn't communicate with any device until
+        its string descriptors (e.g. serial number) are used.
+
+        :param vid_list: vendor IDs to match; defaults to USB_VID_LIST
+        :param pid_list: product IDs to match; defaults to USB_PID_LIST
+
+        Requires libftdi 1.x.
+        """
+        context = _EnumerationContext(self)
+        try:
+            return self._enumerate(context, vid_list, pid_list)
+        except BaseException:
+            context.close()
+            raise
+
+    def _enumerate(
+        self,
+        context: _EnumerationContext,
+        vid_list: list[int] | None = None,
+        pid_list: list[int] | None = None,
+        known: dict[tuple[int, int], DeviceInfo] | None = None,
+    ) -> list[DeviceInfo]:
+        """
+        implementation of enumerate_devices() using an existing context.
+
+        :param known: DeviceInfo instances from a previous enumeration with
+            the same context, keyed by (bus, address). These are returned
+            in place of new instances for devices which are still present,
+            retaining any strings already read.
+        """
+        vids = set(USB_VID_LIST if vid_list is None else vid_list)
+        pids = set(USB_PID_LIST if pid_list is None else pid_list)
+        libusb = self._libusb
+        devices = []
+        desc = libusb_device_descriptor()
+        with self._usb_device_list(context.ctx.contents.usb_ctx) as usb_devices:
+            for dev in usb_devices:
+                if libusb.libusb_get_device_descriptor(dev, byref(desc)) != 0:
+                    continue
+                if desc.idVendor not in vids or desc.idProduct not in pids:
+                    continue
+                location = self._usb_location(dev)
+                info = None if known is None else known.get(location[:2])
+                ids = (desc.idVendor, desc.idProduct)
+                if info is None or (info.vid, info.pid) != ids:
+                    info = DeviceInfo(
+                        context,
+                        context.ref(dev),
+                        vid=desc.idVendor,
+                        pid=desc.idProduct,
+                        location=location,
+                        num_interfaces=self._num_interfaces(dev),
+                    )
+                devices.append(info)
+        return devices
+
     def list_devices(self) -> list[tuple[str, str, str]]:
         """
         :return: (manufacturer, description, serial#) for each attached
@@ -239,7 +796,9 @@ class Driver:
 
         :rtype: a list of string triples
 
-        the serial number can be used to open specific devices
+        the serial number can be used to open specific devices.
+        See also enumerate_devices(), which avoids repeated bus scans and
+        only reads string descriptors when required.
         """
         # ftdi_usb_find_all sets dev_list_ptr to a linked list
         # (*next/*usb_device) of usb_devices, each of which can
@@ -254,10 +813,9 @@ class Driver:
         dev_list_ptr = devlistptrtype()
 
         # create context for doing the enumeration
-        ctx = create_string_buffer(1024)
-        if self.fdll.ftdi_init(byref(ctx)) != 0:
-            msg = self.fdll.ftdi_get_error_string(byref(ctx))
-            raise FtdiError(msg)
+        ctx = self.fdll.ftdi_new()
+        if not ctx:
+            raise FtdiError("could not allocate ftdi_context")
 
         def _s(s: bytes) -> str:
             """c_char_p -> str helper"""
@@ -266,10 +824,10 @@ class Driver:
         try:
             for usb_vid, usb_pid in itertools.product(USB_VID_LIST, USB_PID_LIST):
                 res = self.fdll.ftdi_usb_find_all(
-                    byref(ctx), byref(dev_list_ptr), usb_vid, usb_pid
+                    ctx, byref(dev_list_ptr), usb_vid, usb_pid
                 )
                 if res < 0:
-                    err_msg = self.fdll.ftdi_get_error_string(byref(ctx))
+                    err_msg = self.fdll.ftdi_get_error_string(ctx)
                     msg = "%s (%d)" % (err_msg, res)
                     raise FtdiError(msg)
                 elif res > 0:
@@ -279,7 +837,7 @@ class Driver:
                     try:
                         while dev_list_ptr:
                             res = self.fdll.ftdi_usb_get_strings(
-                                byref(ctx),
+                                ctx,
                                 dev_list_ptr.contents.dev,
                                 manuf,
                                 127,
@@ -291,7 +849,7 @@ class Driver:
                             # don't error on failure to get all the data
                             # error codes: -7: manuf, -8: desc, -9: serial
                             if res < 0 and res not in (-7, -8, -9):
-                                err_msg = self.fdll.ftdi_get_error_string(byref(ctx))
+                                err_msg = self.fdll.ftdi_get_error_string(ctx)
                                 msg = "%s (%d)" % (err_msg, res)
                                 raise FtdiError(msg)
                             devices.append(
@@ -304,5 +862,5 @@ class Driver:
                     finally:
                         self.fdll.ftdi_list_free(dev_list_base)
         finally:
-            self.fdll.ftdi_deinit(byref(ctx))
+            self.fdll.ftdi_free(ctx)
         return devices
@@ -0,0 +1,150 @@
+"""
+pylibftdi.fifo - synchronous FIFO streaming on FT232H / FT2232H devices
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+"""
+
+from __future__ import annotations
+
+from collections import namedtuple
+from collections.abc import Callable
+from ctypes import addressof, c_char, memmove
+from typing import Any
+
+from pylibftdi._base import FtdiError
+from pylibftdi.device import Device
+from pylibftdi.driver import BITMODE_SYNCFF, FTDIStreamCallback
+
+StreamProgress = namedtuple(
+    "StreamProgress", "total_bytes total_time total_rate current_rate"
+)
+
+
+class FifoStreamDevice(Device):
+    """
+    Device in 245 synchronous FIFO mode (FT232H / FT2232H channel A),
+    supporting high-rate capture with libftdi's ftdi_readstream().
+
+    Rather than calling read() repeatedly, stream() keeps many USB
+    transfers queued inside libftdi and hands the received data to a
+    Python consumer in large batches:
+
+    >>> def consume(data):
+    ...     sink.write(data)
+    ...
+    >>> with FifoStreamDevice() as dev:
+    ...     dev.stream(consume, batch_size=1 << 20)
+
+    Note the chip must be configured (in EEPROM) for FIFO operation.
+    """
+
+    # set by stop() to end a stream() in progress
+    _stop_stream = False
+
+    def open(self) -> None:
+        """
+        open the device, switching it to synchronous FIFO mode
+        """
+        super().open()
+        self.ftdi_fn.ftdi_set_bitmode(0xFF, BITMODE_SYNCFF)
+
+    def stream(
+        self,
+        consumer: Callable[[memoryview], Any],
+        batch_size: int = 1 << 20,
+        packets_per_transfer: int = 8,
+        num_transfers: int = 256,
+        progress: Callable[[StreamProgress], Any] | None = None,
+    ) -> StreamProgress | None:
+        """
+        stream(consumer[, batch_size[, ...]]) -> final StreamProgress
+
+        continuously read from the device with ftdi_readstream(), passing
+        data to `consumer` in batches of `batch_size` bytes (the final
+        batch may be shorter). Returns once `consumer` or `progress`
+        returns a true value, or stop() is called.
+
+        :param consumer: called with a memoryview of each batch. The view
+            is only valid during the call, as its memory is reused.
+        :param batch_size: size of the batches passed to the consumer
+        :param packets_per_transfer: number of 512 byte USB packets in each
+            libftdi transfer
+        :param num_transfers: number of transfers libftdi keeps queued
+        :param progress: optional callable given a StreamProgress
+            (total_bytes, total_time, total_rate, current_rate) roughly
+            once a second.
+        :return: the last progress information reported, if any
+        """
+        if not self._opened:
+            raise FtdiError("stream() on closed Device")
+
+        batch = bytearray(batch_size)
+        c_batch = (c_char * batch_size).from_buffer(batch)
+        batch_addr = addressof(c_batch)
+        batch_view = memoryview(batch)
+        filled = 0
+        error: BaseException | None = None
+        last_progress: StreamProgress | None = None
+        self._stop_stream = False
+
+        def deliver(size: int) -> bool:
+            view = batch_view[:size]
+            try:
+                return bool(consumer(view))
+            finally:
+                view.release()
+
+        def callback(buffer: Any, length: int, prog: Any, userdata: Any) -> int:
+            nonlocal filled, error, last_progress
+            try:
+                if prog:
+                    info = prog.contents
+                    last_progress = StreamProgress(
+                        info.current.totalBytes,
+                        info.totalTime,
+                        info.totalRate,
+                        info.currentRate,
+                    )
+                    if progress is not None and progress(last_progress):
+                        return 1
+                offset = 0
+                while offset < length:
+                    count = min(length - offset, batch_size - filled)
+                    memmove(
+                        batch_addr + filled, addressof(buffer.contents) + offset, count
+                    )
+                    filled += count
+                    offset += count
+                    if filled == batch_size:
+                        filled = 0
+                        if deliver(batch_size):
+                            return 1
+            except BaseException as exc:
+                # exceptions can't propagate through libftdi; stop the
+                # stream and re-raise once ftdi_readstream has returned.
+                error = exc
+                return 1
+            return 1 if self._stop_stream else 0
+
+        c_callback = FTDIStreamCallback(callback)
+        res = self.fdll.ftdi_readstream(
+            self.ctx, c_callback, None, packets_per_transfer, num_transfers
+        )
+        if error is not None:
+            raise error
+        if filled:
+            deliver(filled)
+        if res < 0:
+            raise FtdiError("%s (%d)" % (self.get_error_string(), res))
+        return last_progress
+
+    def stop(self) -> None:
+        """
+        stop a stream() in progress, e.g. from another thread or a
+        consumer callback
+        """
+        self._stop_stream = True
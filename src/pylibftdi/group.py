@@ -0,0 +1,269 @@
+"""
+pylibftdi.group - operations on groups of devices
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from pylibftdi._base import FtdiError
+from pylibftdi.device import Device
+
+
+class BroadcastResult:
+    """
+    The outcome of broadcast_write() to a sequence of devices.
+
+    `counts[i]` is the number of bytes written to device i, or None if
+    the write failed, in which case `errors[i]` holds the exception.
+    `completed[i]` is the time.perf_counter() value when the write to
+    device i completed (or failed).
+    """
+
+    def __init__(
+        self,
+        counts: list[int | None],
+        errors: dict[int, BaseException],
+        started: float,
+        completed: list[float],
+    ) -> None:
+        self.counts = counts
+        self.errors = errors
+        self.started = started
+        self.completed = completed
+
+    @property
+    def ok(self) -> bool:
+        """
+        True if all the writes succeeded
+        """
+        return not self.errors
+
+    @property
+    def skew(self) -> float:
+        """
+        time in seconds between the first and last successful writes
+        completing
+        """
+        times = [t for idx, t in enumerate(self.completed) if idx not in self.errors]
+        return max(times) - min(times) if times else 0.0
+
+    @property
+    def elapsed(self) -> float:
+        """
+        time in seconds from the writes starting until the last completed
+        """
+        return max(self.completed, default=self.started) - self.started
+
+
+def broadcast_write(
+    devices: Sequence[Device],
+    data: Any,
+) -> BroadcastResult:
+    """
+    broadcast_write(devices, data) -> BroadcastResult
+
+    write to several devices at once, as close together as possible.
+
+    Each write is made from its own thread, with the threads released
+    together once all are ready, so the USB transfers proceed in parallel
+    (ctypes releases the GIL) rather than one after another.
+
+    :param devices: the devices to write to
+    :param data: either a single str / bytes / buffer written to every
+        device, or a list (or tuple) with an item for each device.
+    :return: BroadcastResult with the count of bytes written to each
+        device, any errors, and the timing of the writes.
+    """
+    if isinstance(data, (list, tuple)):
+        if len(data) != len(devices):
+            raise ValueError("data must have an item for each device")
+        payloads = list(data)
+    else:
+        payloads = [data] * len(devices)
+
+    count = len(devices)
+    counts: list[int | None] = [None] * count
+    errors: dict[int, BaseException] = {}
+    completed = [0.0] * count
+    # the extra party is this thread, which records the start time
+    barrier = threading.Barrier(count + 1)
+
+    def write_one(idx: int) -> None:
+        barrier.wait()
+        try:
+            counts[idx] = devices[idx].write(payloads[idx])
+        except BaseException as exc:
+            errors[idx] = exc
+        completed[idx] = time.perf_counter()
+
+    threads = [
+        threading.Thread(target=write_one, args=(idx,), daemon=True)
+        for idx in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return BroadcastResult(counts, errors, started, completed)
+
+
+class DeviceGroup:
+    """
+    A group of devices opened together with open_all(), which may be
+    closed together (e.g. as a context manager).
+
+    Devices are held in the order of the specs they were opened from;
+    `devices[i]` is None if opening `specs[i]` failed, in which case
+    `errors[i]` holds the exception raised.
+    """
+
+    def __init__(
+        self,
+        specs: list[str | Mapping[str, Any]],
+        devices: list[Device | None],
+        errors: dict[int, BaseException],
+    ) -> None:
+        self.specs = specs
+        self.devices = devices
+        self.errors = errors
+
+    @classmethod
+    def open_all(
+        cls,
+        specs: Iterable[str | Mapping[str, Any]],
+        max_workers: int | None = None,
+        *,
+        device_class: type[Device] = Device,
+        configure: Callable[[Device], Any] | None = None,
+        **kwargs: Any,
+    ) -> DeviceGroup:
+        """
+        open_all(specs[, max_workers, ...]) -> DeviceGroup
+
+        open (and optionally configure) several devices concurrently.
+
+        Opening a device involves enumeration and several USB control
+        transfers, during which ctypes releases the GIL, so with many
+        devices this is much quicker than opening each in turn.
+
+        A failure to open or configure one device doesn't affect the
+        others; check `errors` (or call check()) on the returned group.
+
+        :param specs: the devices to open. Each is either a device_id
+            (serial number) or a mapping of Device keyword arguments.
+        :param max_workers: maximum number of devices to open at once;
+            defaults to the ThreadPoolExecutor default.
+        :param device_class: the Device subclass to instantiate
+        :param configure: optional function called with each device once
+            open, e.g. to set the baudrate. Any exception it raises is
+            treated as a failure to open the device, which is closed.
+        :param kwargs: Device keyword arguments common to all the devices;
+            these are overridden by any given in a spec.
+        """
+        specs = list(specs)
+
+        def open_one(spec: str | Mapping[str, Any]) -> Device:
+            dev_kwargs = dict(kwargs)
+            if isinstance(spec, str):
+                dev_kwargs["device_id"] = spec
+            else:
+                dev_kwargs.update(spec)
+            dev_kwargs["lazy_open"] = True
+            dev = device_class(**dev_kwargs)
+            dev.open()
+            if configure is not None:
+                try:
+                    configure(dev)
+                except BaseException:
+                    dev.close()
+                    raise
+            return dev
+
+        devices: list[Device | None] = []
+        errors: dict[int, BaseException] = {}
+        if specs:
+            with ThreadPoolExecutor(max_workers) as executor:
+                futures = [executor.submit(open_one, spec) for spec in specs]
+            for idx, future in enumerate(futures):
+                exc = future.exception()
+                if exc is None:
+                    devices.append(future.result())
+                else:
+                    devices.append(None)
+                    errors[idx] = exc
+        return cls(specs, devices, errors)
+
+    @property
+    def ok(self) -> bool:
+        """
+        True if all the devices were opened successfully
+        """
+        return not self.errors
+
+    def check(self) -> None:
+        """
+        raise FtdiError describing any devices which failed to open
+        """
+        if self.errors:
+            failures = "; ".join(
+                f"{self.specs[idx]!r}: {exc}" for idx, exc in self.errors.items()
+            )
+            raise FtdiError(
+                f"{len(self.errors)} of {len(self.specs)} devices failed to "
+                f"open: {failures}"
+            )
+
+    def broadcast_write(self, data: Any) -> BroadcastResult:
+        """
+        write to all the opened devices at once; see broadcast_write().
+
+        :param data: written to every device, or a list with an item for
+            each opened device (in the order they are iterated).
+        """
+        return broadcast_write(list(self), data)
+
+    def __len__(self) -> int:
+        return len(self.devices)
+
+    def __getitem__(self, idx: int) -> Device | None:
+        return self.devices[idx]
+
+    def __iter__(self) -> Iterator[Device]:
+        """
+        iterate over the successfully opened devices
+        """
+        return (dev for dev in self.devices if dev is not None)
+
+    def close(self) -> None:
+        """
+        close all the devices, in order. All devices are closed even if
+        closing one fails, in which case the first exception is raised.
+        """
+        first_exc: BaseException | None = None
+        for dev in self:
+            try:
+                dev.close()
+            except BaseException as exc:
+                if first_exc is None:
+                    first_exc = exc
+        if first_exc is not None:
+            raise first_exc
+
+    def __enter__(self) -> DeviceGroup:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
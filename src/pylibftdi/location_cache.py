@@ -0,0 +1,103 @@
+"""
+pylibftdi.location_cache - persistent cache of device USB locations
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from typing import Any
+
+
+def default_cache_path() -> str:
+    """
+    :return: the default location cache file, under $XDG_CACHE_HOME
+        (or ~/.cache if that isn't set)
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "pylibftdi", "locations.json")
+
+
+class LocationCache:
+    """
+    A JSON file mapping device IDs (serial numbers or descriptions) to the
+    USB location - bus, address and port path - each was last opened at.
+
+    Opening a device at a known location avoids scanning every attached
+    device for a matching serial number. Entries are only hints: the
+    device found at a cached location must be checked before use.
+
+    The file is re-read on each lookup, so the cache can be shared by
+    several processes. Errors reading or writing the file are ignored;
+    the cache is simply treated as empty.
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        """
+        :param path: the cache file; defaults to default_cache_path()
+        """
+        if path is None:
+            path = default_cache_path()
+        self.path = os.path.expanduser(path)
+
+    def _load(self) -> dict[str, Any]:
+        try:
+            with open(self.path) as cache_file:
+                entries = json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _save(self, entries: dict[str, Any]) -> None:
+        cache_dir = os.path.dirname(self.path)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            # write to a temporary file and rename it into place, so
+            # concurrent readers never see a partially written file.
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as cache_file:
+                    json.dump(entries, cache_file, indent=1, sort_keys=True)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            pass
+
+    def get(self, device_id: str) -> dict[str, Any] | None:
+        """
+        :return: dict with 'bus', 'address' and 'port_path' keys for the
+            last known location of `device_id`, or None if unknown.
+        """
+        location = self._load().get(device_id)
+        if isinstance(location, dict) and {"bus", "address"} <= location.keys():
+            return location
+        return None
+
+    def set(self, device_id: str, bus: int, address: int, port_path: str) -> None:
+        """
+        record the location of `device_id`
+        """
+        location = {"bus": bus, "address": address, "port_path": port_path}
+        entries = self._load()
+        if entries.get(device_id) != location:
+            entries[device_id] = location
+            self._save(entries)
+
+    def discard(self, device_id: str) -> None:
+        """
+        remove any entry for `device_id`
+        """
+        entries = self._load()
+        if entries.pop(device_id, None) is not None:
+            self._save(entries)
@@ -0,0 +1,340 @@
+"""
+pylibftdi.pool - sharing devices between components of a process
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from typing import Any
+
+from pylibftdi._base import FtdiError
+from pylibftdi.device import Device
+
+
+class _PoolEntry:
+    """
+    A Device held open by a DevicePool, with its reference count
+    """
+
+    def __init__(self, key: tuple[Any, ...]) -> None:
+        self.key = key
+        # None while being opened, or once closed by eviction
+        self.device: Device | None = None
+        self.refs = 0
+        # serialises use of the device between handles, and opening and
+        # closing it. Taken before (never while holding) the pool lock.
+        self.lock = threading.RLock()
+        # time.monotonic() value when refs last dropped to zero
+        self.idle_since = 0.0
+
+
+class PooledDevice:
+    """
+    A handle to a Device shared through a DevicePool.
+
+    Methods and attributes of the Device are available on the handle,
+    and may be set through it. Method calls and attribute access are
+    made while holding the device's lock, so operations from different
+    handles (e.g. in different threads) don't interleave.
+    For a sequence of operations which must not be interleaved with other
+    users - e.g. a write followed by reading its response - use the
+    handle as a context manager, which holds the lock and provides the
+    Device itself::
+
+        with handle as dev:
+            dev.write(b'status?\\n')
+            status = dev.readline()
+
+    Call release() once the handle is no longer required.
+    """
+
+    def __init__(self, pool: DevicePool, entry: _PoolEntry, device: Device) -> None:
+        self._pool = pool
+        self._entry: _PoolEntry | None = entry
+        # the entry's device, which doesn't change while it has handles
+        self._device = device
+
+    def _get_entry(self) -> _PoolEntry:
+        entry = self._entry
+        if entry is None:
+            raise FtdiError("PooledDevice has been released")
+        return entry
+
+    @property
+    def device(self) -> Device:
+        """
+        the underlying Device. Access through this isn't serialised.
+        """
+        self._get_entry()
+        return self._device
+
+    @property
+    def released(self) -> bool:
+        return self._entry is None
+
+    def __getattr__(self, name: str) -> Any:
+        entry = self._get_entry()
+        # properties (e.g. port, modem_status) may do device I/O
+        with entry.lock:
+            attr = getattr(self._device, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def locked_call(*args: Any, **kwargs: Any) -> Any:
+            with entry.lock:
+                return attr(*args, **kwargs)
+
+        return locked_call
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name.startswith("_") or hasattr(type(self), name):
+            object.__setattr__(self, name, value)
+            return
+        entry = self._get_entry()
+        with entry.lock:
+            setattr(self._device, name, value)
+
+    def __enter__(self) -> Device:
+        self._get_entry().lock.acquire()
+        return self._device
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._get_entry().lock.release()
+
+    def release(self) -> None:
+        """
+        release this handle. The device is closed once it has no handles
+        and has been idle for the pool's idle_timeout.
+        """
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool._release(entry)
+
+    def __del__(self) -> None:
+        self.release()
+
+
+class DevicePool:
+    """
+    A pool of open devices, shared by reference-counted handles.
+
+    Devices are keyed by (device_id, interface_select, mode); all
+    acquire() calls with the same key share a single open Device, which
+    is kept open between uses until it has been unused for
+    `idle_timeout` seconds.
+
+    default_pool() returns a process-wide instance.
+    """
+
+    def __init__(
+        self,
+        device_class: type[Device] = Device,
+        idle_timeout: float | None = 30.0,
+        **device_kwargs: Any,
+    ) -> None:
+        """
+        :param device_class: the Device subclass to create
+        :param idle_timeout: seconds an unused device stays open. 0 closes
+            devices as soon as they are unused; None keeps them open until
+            the pool is closed.
+        :param device_kwargs: keyword arguments (e.g. `driver`) passed to
+            device_class for every device
+        """
+        self.device_class = device_class
+        self.idle_timeout = idle_timeout
+        self.device_kwargs = device_kwargs
+        self._entries: dict[tuple[Any, ...], _PoolEntry] = {}
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+
+    def acquire(
+        self,
+        device_id: str | None = None,
+        interface_select: int | None = None,
+        mode: str = "b",
+    ) -> PooledDevice:
+        """
+        :return: a handle to the device with the given parameters, opening
+            the device if it isn't already open in the pool.
+        """
+        key = (device_id, interface_select, mode)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _PoolEntry(key)
+            entry.refs += 1
+        # the device is opened holding just the entry's lock, so a slow
+        # open doesn't hold up other keys; acquirers of this key wait.
+        try:
+            with entry.lock:
+                if entry.device is None:
+                    entry.device = self.device_class(
+                        device_id,
+                        mode,
+                        interface_select=interface_select,
+                        **self.device_kwargs,
+                    )
+                device = entry.device
+        except BaseException:
+            self._release(entry)
+            raise
+        return PooledDevice(self, entry, device)
+
+    @contextlib.contextmanager
+    def use(
+        self,
+        device_id: str | None = None,
+        interface_select: int | None = None,
+        mode: str = "b",
+    ) -> Iterator[Device]:
+        """
+        context manager providing exclusive use of a pooled device; the
+        handle is released on exit.
+        """
+        handle = self.acquire(device_id, interface_select, mode)
+        try:
+            with handle as device:
+                yield device
+        finally:
+            handle.release()
+
+    def _release(self, entry: _PoolEntry) -> None:
+        with self._lock:
+            entry.refs -= 1
+            if entry.refs > 0 or self._entries.get(entry.key) is not entry:
+                return
+            if entry.device is None:
+                # the device failed to open; there is nothing to close
+                del self._entries[entry.key]
+                return
+            entry.idle_since = time.monotonic()
+            if self.idle_timeout is None or sys.is_finalizing():
+                # starting a timer thread during interpreter shutdown can
+                # hang the process; the device is left for exit to close.
+                return
+            if self.idle_timeout > 0:
+                self._schedule_eviction(self.idle_timeout)
+                return
+        self._evict(entry, 0.0)
+
+    def _evict(self, entry: _PoolEntry, idle_timeout: float) -> bool:
+        """
+        close the entry's device if it is still unused after idle_timeout,
+        then remove the entry from the pool.
+
+        The device is closed before the entry is removed, holding the
+        entry's lock, so an acquire() for the same key can't open a second
+        handle to the device while it is closing; instead it waits, then
+        reopens it.
+
+        :return: True if the device was closed
+        """
+        with entry.lock:
+            with self._lock:
+                if (
+                    entry.refs
+                    or entry.device is None
+                    or self._entries.get(entry.key) is not entry
+                    or entry.idle_since + idle_timeout > time.monotonic()
+                ):
+                    return False
+            device, entry.device = entry.device, None
+            device.close()
+            with self._lock:
+                if not entry.refs and self._entries.get(entry.key) is entry:
+                    del self._entries[entry.key]
+        return True
+
+    def _schedule_eviction(self, delay: float) -> None:
+        # called with self._lock held
+        if self._timer is None:
+            self._timer = threading.Timer(delay, self._evict_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _evict_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+        self.evict_idle()
+
+    def evict_idle(self) -> int:
+        """
+        close devices which have been unused for at least idle_timeout
+
+        :return: the number of devices closed
+        """
+        idle_timeout = self.idle_timeout
+        if idle_timeout is None:
+            return 0
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            next_expiry = None
+            for entry in self._entries.values():
+                if entry.refs or entry.device is None:
+                    continue
+                expiry = entry.idle_since + idle_timeout
+                if expiry <= now:
+                    expired.append(entry)
+                elif next_expiry is None or expiry < next_expiry:
+                    next_expiry = expiry
+            if next_expiry is not None:
+                self._schedule_eviction(next_expiry - now)
+        # entries may have been acquired again since; _evict checks
+        return sum(self._evict(entry, idle_timeout) for entry in expired)
+
+    def __len__(self) -> int:
+        """
+        the number of open devices in the pool
+        """
+        with self._lock:
+            return sum(entry.device is not None for entry in self._entries.values())
+
+    def close(self) -> None:
+        """
+        close all devices in the pool, including any with outstanding
+        handles, which can no longer be used.
+        """
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        for entry in entries:
+            with entry.lock:
+                if entry.device is not None:
+                    entry.device.close()
+
+    def __enter__(self) -> DevicePool:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+_default_pool: DevicePool | None = None
+_default_pool_lock = threading.Lock()
+
+
+def default_pool() -> DevicePool:
+    """
+    :return: the process-wide DevicePool
+    """
+    global _default_pool  # noqa: PLW0603
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = DevicePool()
+        return _default_pool
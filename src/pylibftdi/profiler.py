@@ -0,0 +1,200 @@
+"""
+pylibftdi.profiler - timing of calls into libftdi
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import os
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from pylibftdi.device import Device
+
+# if set (to anything other than '' or '0'), every Driver profiles its
+# libftdi calls with default_profiler(), which is reported on exit.
+PROFILE_ENV_VAR = "PYLIBFTDI_PROFILE"
+
+
+class FunctionProfile:
+    """
+    Accumulated calls to a single libftdi function
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.calls if self.calls else 0.0
+
+
+class Profiler:
+    """
+    Counts calls and accumulates wall time for each libftdi function
+    called through a ProfiledLibrary.
+
+    Typically used through the profile() context manager, or
+    Driver(profile=True), which profiles all calls made through that
+    Driver with default_profiler().
+    """
+
+    def __init__(self) -> None:
+        self.functions: dict[str, FunctionProfile] = {}
+        self._lock = threading.Lock()
+        # wall time of any completed profile() blocks
+        self.elapsed_ns = 0
+
+    def record(self, name: str, elapsed_ns: int) -> None:
+        with self._lock:
+            func = self.functions.get(name)
+            if func is None:
+                func = self.functions[name] = FunctionProfile(name)
+            func.calls += 1
+            func.total_ns += elapsed_ns
+            func.max_ns = max(func.max_ns, elapsed_ns)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.functions = {}
+            self.elapsed_ns = 0
+
+    def sorted(self) -> list[FunctionProfile]:
+        """
+        :return: the profiled functions, in decreasing order of total time
+        """
+        with self._lock:
+            functions = list(self.functions.values())
+        return sorted(functions, key=lambda func: func.total_ns, reverse=True)
+
+    def report(self, limit: int | None = None) -> str:
+        """
+        :return: a table of the profiled functions, in decreasing order of
+            total time, limited to the top `limit` functions if given.
+        """
+        functions = self.sorted()
+        lines = [
+            f"{'function':<32} {'calls':>8} {'total ms':>10} "
+            f"{'mean us':>10} {'max us':>10}"
+        ]
+        for func in functions[:limit]:
+            lines.append(
+                f"{func.name:<32} {func.calls:>8} {func.total_ns / 1e6:>10.3f} "
+                f"{func.mean_ns / 1e3:>10.1f} {func.max_ns / 1e3:>10.1f}"
+            )
+        total_ns = sum(func.total_ns for func in functions)
+        calls = sum(func.calls for func in functions)
+        lines.append(f"{'total':<32} {calls:>8} {total_ns / 1e6:>10.3f}")
+        if self.elapsed_ns:
+            # the remainder is Python (pylibftdi and application) overhead
+            lines.append(
+                f"wall time {self.elapsed_ns / 1e6:.3f} ms, "
+                f"{100 * total_ns / self.elapsed_ns:.1f}% in libftdi"
+            )
+        return "\n".join(lines)
+
+
+class ProfiledLibrary:
+    """
+    Wraps a ctypes library (e.g. Driver.fdll), timing calls to each of its
+    functions with the given Profiler.
+    """
+
+    def __init__(self, lib: Any, profiler: Profiler) -> None:
+        self._lib = lib
+        self._profiler = profiler
+
+    def __getattr__(self, name: str) -> Any:
+        # only called when `name` isn't already cached in the instance dict
+        attr = getattr(self._lib, name)
+        if not callable(attr):
+            return attr
+        record = self._profiler.record
+        perf_counter_ns = time.perf_counter_ns
+
+        def profiled(*args: Any) -> Any:
+            start = perf_counter_ns()
+            try:
+                return attr(*args)
+            finally:
+                record(name, perf_counter_ns() - start)
+
+        profiled.__name__ = name
+        setattr(self, name, profiled)
+        return profiled
+
+
+@contextlib.contextmanager
+def profile(device: Device, profiler: Profiler | None = None) -> Iterator[Profiler]:
+    """
+    context manager profiling the libftdi calls made by `device` within
+    the block, e.g. to find which calls dominate opening a device::
+
+        dev = Device(lazy_open=True)
+        with profile(dev) as prof:
+            dev.open()
+        print(prof.report())
+
+    :param device: the Device to profile
+    :param profiler: Profiler to record to; defaults to a new Profiler
+    :return: the Profiler, which also records the wall time of the block
+    """
+    if profiler is None:
+        profiler = Profiler()
+    fdll = device.fdll
+    device.fdll = ProfiledLibrary(fdll, profiler)
+    # ftdi_fn binds functions from fdll, so must be rebuilt
+    device._ftdi_fn = None
+    start = time.perf_counter_ns()
+    try:
+        yield profiler
+    finally:
+        profiler.elapsed_ns += time.perf_counter_ns() - start
+        device.fdll = fdll
+        device._ftdi_fn = None
+
+
+def profile_requested() -> bool:
+    """
+    :return: True if profiling is enabled by the PYLIBFTDI_PROFILE
+        environment variable
+    """
+    return os.environ.get(PROFILE_ENV_VAR, "") not in ("", "0")
+
+
+_default_profiler: Profiler | None = None
+_default_profiler_lock = threading.Lock()
+
+
+def _report_at_exit(profiler: Profiler) -> None:
+    if profiler.functions:
+        print(profiler.report(), file=sys.stderr)
+
+
+def default_profiler() -> Profiler:
+    """
+    :return: the process-wide Profiler used by Driver(profile=True). If
+        profiling is enabled by PYLIBFTDI_PROFILE, its report is written to
+        stderr when the process exits.
+    """
+    global _default_profiler  # noqa: PLW0603
+    with _default_profiler_lock:
+        if _default_profiler is None:
+            _default_profiler = Profiler()
+            if profile_requested():
+                atexit.register(_report_at_exit, _default_profiler)
+        return _default_profiler
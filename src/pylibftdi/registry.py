@@ -0,0 +1,277 @@
+"""
+pylibftdi.registry - cached device enumeration, updated on hotplug events
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable
+from ctypes import byref, c_int
+from typing import Any
+
+from pylibftdi._base import FtdiError
+from pylibftdi.driver import (
+    LIBUSB_CAP_HAS_HOTPLUG,
+    LIBUSB_HOTPLUG_EVENT_DEVICE_ARRIVED,
+    LIBUSB_HOTPLUG_EVENT_DEVICE_LEFT,
+    LIBUSB_HOTPLUG_MATCH_ANY,
+    DeviceInfo,
+    Driver,
+    LibusbHotplugCallback,
+    _EnumerationContext,
+    timeval,
+)
+
+# events passed to DeviceRegistry subscribers
+DEVICE_ARRIVED = "arrived"
+DEVICE_LEFT = "left"
+
+Subscriber = Callable[[str, DeviceInfo], None]
+
+
+class DeviceRegistry:
+    """
+    A cache of attached devices, as returned by Driver.enumerate_devices(),
+    which is only rescanned when devices are attached or removed.
+
+    Once start()ed, if libusb supports hotplug notification a background
+    thread handles libusb events, rescanning as soon as devices arrive or
+    leave. Otherwise the thread rescans every `rescan_interval` seconds.
+    Without start(), devices() rescans on demand, at most once per
+    `rescan_interval` seconds.
+
+    Since the strings of each DeviceInfo are cached, list_devices() only
+    reads string descriptors from newly attached devices.
+
+    Subscribers are called as `callback(event, info)`, where event is
+    DEVICE_ARRIVED or DEVICE_LEFT, from whichever thread performs the
+    rescan.
+    """
+
+    # minimum time in seconds between rescans without hotplug events
+    rescan_interval = 1.0
+
+    # maximum time in seconds the background thread waits for libusb
+    # events before checking whether it has been stopped
+    event_timeout = 0.5
+
+    def __init__(
+        self,
+        driver: Driver | None = None,
+        vid_list: list[int] | None = None,
+        pid_list: list[int] | None = None,
+        *,
+        use_hotplug: bool = True,
+        rescan_interval: float | None = None,
+    ) -> None:
+        """
+        :param driver: the Driver to use; defaults to a new Driver()
+        :param vid_list: vendor IDs to match; defaults to USB_VID_LIST
+        :param pid_list: product IDs to match; defaults to USB_PID_LIST
+        :param use_hotplug: if False, always rescan periodically even if
+            libusb supports hotplug events
+        :param rescan_interval: overrides the class attribute
+        """
+        self.driver = Driver() if driver is None else driver
+        self.vid_list = vid_list
+        self.pid_list = pid_list
+        self.use_hotplug = use_hotplug
+        if rescan_interval is not None:
+            self.rescan_interval = rescan_interval
+
+        self._context: _EnumerationContext | None = None
+        self._devices: dict[tuple[int, int], DeviceInfo] = {}
+        self._scanned_at: float | None = None
+        self._lock = threading.Lock()
+        self._subscribers: list[Subscriber] = []
+        # set by the hotplug callback when a rescan is required
+        self._dirty = False
+        self._hotplug_handle: int | None = None
+        self._hotplug_cb: Any = None
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+        # any exception raised in the background thread
+        self.error: BaseException | None = None
+
+    @property
+    def hotplug(self) -> bool:
+        """
+        True if the registry is being updated by hotplug events
+        """
+        return self._hotplug_handle is not None
+
+    def _get_context(self) -> _EnumerationContext:
+        if self._context is None:
+            self._context = _EnumerationContext(self.driver)
+        return self._context
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """
+        call `callback(event, info)` whenever a device arrives or leaves
+
+        :return: a function which unsubscribes `callback`
+        """
+        self._subscribers.append(callback)
+        return lambda: self.unsubscribe(callback)
+
+    def unsubscribe(self, callback: Subscriber) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def rescan(self) -> list[DeviceInfo]:
+        """
+        rescan the bus now, notifying subscribers of any changes
+
+        :return: the attached devices
+        """
+        with self._lock:
+            self._dirty = False
+            previous = self._devices
+            devices = self.driver._enumerate(
+                self._get_context(), self.vid_list, self.pid_list, known=previous
+            )
+            self._devices = {(info.bus, info.address): info for info in devices}
+            self._scanned_at = time.monotonic()
+        events = [
+            (DEVICE_LEFT, info)
+            for key, info in previous.items()
+            if key not in self._devices
+        ]
+        events.extend(
+            (DEVICE_ARRIVED, info)
+            for key, info in self._devices.items()
+            if key not in previous
+        )
+        for event, info in events:
+            for callback in list(self._subscribers):
+                callback(event, info)
+        return devices
+
+    def devices(self) -> list[DeviceInfo]:
+        """
+        :return: a DeviceInfo for each attached device, rescanning only
+            if the cached list may be out of date.
+        """
+        if self.error is not None:
+            raise FtdiError(f"registry stopped: {self.error!r}") from self.error
+        scanned_at = self._scanned_at
+        if (
+            self._dirty
+            or scanned_at is None
+            or (
+                not self.hotplug
+                and time.monotonic() - scanned_at >= self.rescan_interval
+            )
+        ):
+            return self.rescan()
+        return list(self._devices.values())
+
+    def list_devices(self) -> list[tuple[str, str, str]]:
+        """
+        :return: (manufacturer, description, serial#) for each attached
+            device, as Driver.list_devices().
+        """
+        return [
+            (info.manufacturer, info.description, info.serial)
+            for info in self.devices()
+        ]
+
+    def start(self) -> DeviceRegistry:
+        """
+        start updating the registry in a background thread, using hotplug
+        events if available.
+        """
+        if self._thread is not None:
+            return self
+        usb_ctx = self._get_context().ctx.contents.usb_ctx
+        libusb = self.driver._libusb
+        if self.use_hotplug and libusb.libusb_has_capability(LIBUSB_CAP_HAS_HOTPLUG):
+            self._hotplug_cb = LibusbHotplugCallback(self._on_hotplug)
+            handle = c_int()
+            res = libusb.libusb_hotplug_register_callback(
+                usb_ctx,
+                LIBUSB_HOTPLUG_EVENT_DEVICE_ARRIVED | LIBUSB_HOTPLUG_EVENT_DEVICE_LEFT,
+                0,
+                LIBUSB_HOTPLUG_MATCH_ANY,
+                LIBUSB_HOTPLUG_MATCH_ANY,
+                LIBUSB_HOTPLUG_MATCH_ANY,
+                self._hotplug_cb,
+                None,
+                byref(handle),
+            )
+            if res == 0:
+                self._hotplug_handle = handle.value
+        # the initial scan ensures events are only reported for changes
+        self.rescan()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _on_hotplug(self, usb_ctx: Any, dev: Any, event: int, user_data: Any) -> int:
+        # called by libusb from libusb_handle_events_*(), where many libusb
+        # functions may not be used; just flag that a rescan is needed.
+        self._dirty = True
+        return 0
+
+    def _run(self) -> None:
+        try:
+            usb_ctx = self._get_context().ctx.contents.usb_ctx
+            libusb = self.driver._libusb
+            seconds, fraction = divmod(self.event_timeout, 1)
+            timeout = timeval(int(seconds), int(fraction * 1e6))
+            while not self._stopping.is_set():
+                if self.hotplug:
+                    libusb.libusb_handle_events_timeout_completed(
+                        usb_ctx, byref(timeout), None
+                    )
+                    if self._dirty and not self._stopping.is_set():
+                        self.rescan()
+                elif not self._stopping.wait(self.rescan_interval):
+                    self.rescan()
+        except BaseException as exc:
+            self.error = exc
+
+    def stop(self) -> None:
+        """
+        stop the background thread, if running
+        """
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stopping.set()
+        if self._hotplug_handle is not None:
+            usb_ctx = self._get_context().ctx.contents.usb_ctx
+            libusb = self.driver._libusb
+            libusb.libusb_hotplug_deregister_callback(usb_ctx, self._hotplug_handle)
+            self._hotplug_handle = None
+            if hasattr(libusb, "libusb_interrupt_event_handler"):
+                libusb.libusb_interrupt_event_handler(usb_ctx)
+        thread.join()
+        self._hotplug_cb = None
+
+    def close(self) -> None:
+        """
+        stop the registry and release all resources. Strings which
+        haven't already been read from DeviceInfo instances are no longer
+        available.
+        """
+        self.stop()
+        self._devices = {}
+        self._scanned_at = None
+        context, self._context = self._context, None
+        if context is not None:
+            context.close()
+
+    def __enter__(self) -> DeviceRegistry:
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
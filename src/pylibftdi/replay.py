@@ -0,0 +1,576 @@
+"""
+pylibftdi.replay - recording and replaying libftdi calls
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+from ctypes import (
+    POINTER,
+    Array,
+    _Pointer,
+    _SimpleCData,
+    byref,
+    c_char_p,
+    c_int,
+    c_void_p,
+    c_wchar_p,
+    memmove,
+    pointer,
+)
+from typing import IO, Any
+
+from pylibftdi._base import FtdiError
+from pylibftdi.driver import (
+    FTDI_PROTOTYPES,
+    Driver,
+    ftdi_context,
+    libftdi_version,
+)
+
+# Log format: a header, followed by a sequence of records.
+#
+# header: MAGIC, FORMAT_VERSION (B), libftdi_version major / minor / micro
+#   (HHH), version_str and snapshot_str (strings), and the count (H) and
+#   names (strings) of the functions available in the recorded library.
+# string: length (H) followed by UTF-8 bytes.
+# records:
+#   REC_NAME: id (H), name (string) - assigns an id to a function name
+#   REC_CALL: function id (H), start and duration in ns (QQ), count of
+#     arguments (B), the arguments, and the result (each a value).
+#     Driver.list_devices() is recorded as a call of LIST_DEVICES, with a
+#     single TAG_BYTES argument of the NUL-separated strings it returned.
+# value: a tag (B) followed by a payload depending on the tag.
+MAGIC = b"PYFTDREC"
+FORMAT_VERSION = 1
+
+REC_NAME = 1
+REC_CALL = 2
+
+TAG_NONE = 0
+TAG_INT = 1  # payload: q
+TAG_FLOAT = 2  # payload: d
+TAG_BYTES = 3  # input data; payload: length (I) and bytes
+TAG_OUT = 4  # data returned in an argument; payload as TAG_BYTES
+TAG_PTR = 5  # an opaque non-NULL pointer (e.g. ftdi_context *)
+TAG_NULL = 6  # a NULL pointer
+TAG_PTR_OUT = 7  # a pointer returned in an argument, which can't be replayed
+
+# the pseudo-function name under which list_devices() results are recorded
+LIST_DEVICES = "list_devices"
+
+# functions whose buffer arguments are data sent to the device
+_INPUT_DATA = {"ftdi_write_data", "ftdi_write_data_submit"}
+# functions filling a buffer later, when the transfer completes
+_DEFERRED_DATA = {"ftdi_read_data_submit"}
+# functions returning the number of bytes filled in their buffer argument
+_COUNT_RESULT = {"ftdi_read_data"}
+
+# the type of byref() results
+_CArgObject: Any = type(byref(c_int()))
+# pointer types, whose values are only meaningful in the recording process
+_POINTER_TYPES = (_Pointer, c_void_p, c_char_p, c_wchar_p)
+
+RecordedCall = namedtuple("RecordedCall", "name start_ns duration_ns args result")
+RecordedCall.__doc__ = """\
+A call in a recording. `args` and `result` are (tag, value) pairs.
+"""
+
+
+def _pack_str(value: str) -> bytes:
+    data = value.encode()
+    return struct.pack("<H", len(data)) + data
+
+
+def _encode_value(tag: int, value: Any) -> bytes:
+    if tag == TAG_INT:
+        return struct.pack("<Bq", tag, value)
+    if tag == TAG_FLOAT:
+        return struct.pack("<Bd", tag, value)
+    if tag in (TAG_BYTES, TAG_OUT):
+        return struct.pack("<BI", tag, len(value)) + value
+    return struct.pack("<B", tag)
+
+
+def _arg_value(arg: Any, output: bool) -> tuple[int, Any]:  # noqa: PLR0911
+    """
+    :return: (tag, value) describing a call argument. Buffers and byref()
+        arguments are recorded as TAG_OUT if `output`, otherwise TAG_BYTES.
+    """
+    buffer_tag = TAG_OUT if output else TAG_BYTES
+    if arg is None:
+        return TAG_NONE, None
+    if isinstance(arg, int):
+        return TAG_INT, int(arg)
+    if isinstance(arg, float):
+        return TAG_FLOAT, arg
+    if isinstance(arg, bytes):
+        return TAG_BYTES, arg
+    if isinstance(arg, c_char_p):
+        return (TAG_NONE, None) if arg.value is None else (TAG_BYTES, arg.value)
+    if isinstance(arg, _CArgObject):
+        if isinstance(arg._obj, _POINTER_TYPES):
+            # e.g. the device list from ftdi_usb_find_all()
+            return TAG_PTR_OUT, None
+        return buffer_tag, bytes(arg._obj)
+    if isinstance(arg, Array):
+        return buffer_tag, bytes(arg)
+    if isinstance(arg, _SimpleCData):
+        value = arg.value
+        if isinstance(value, int):
+            return TAG_INT, value
+        return (TAG_PTR, None) if value else (TAG_NULL, None)
+    if isinstance(arg, _Pointer):
+        return (TAG_PTR, None) if arg else (TAG_NULL, None)
+    return TAG_PTR, None
+
+
+def _result_value(result: Any) -> tuple[int, Any]:
+    if result is None:
+        return TAG_NONE, None
+    if isinstance(result, int):
+        return TAG_INT, int(result)
+    if isinstance(result, bytes):
+        return TAG_BYTES, result
+    if isinstance(result, _Pointer):
+        return (TAG_PTR, None) if result else (TAG_NULL, None)
+    # e.g. structures returned by value, which aren't replayed
+    return TAG_NONE, None
+
+
+class Recorder:
+    """
+    Writes calls to a binary log.
+    """
+
+    def __init__(
+        self,
+        log: str | os.PathLike[str] | IO[bytes],
+        version: libftdi_version,
+        functions: list[str],
+    ) -> None:
+        """
+        :param log: path or binary file object to write the log to
+        :param version: libftdi version of the library being recorded
+        :param functions: names of the functions the library provides
+        """
+        if isinstance(log, (str, os.PathLike)):
+            self._file: IO[bytes] = open(log, "wb")
+            self._owns_file = True
+        else:
+            self._file = log
+            self._owns_file = False
+        self._lock = threading.Lock()
+        self._names: dict[str, int] = {}
+        self._start = time.perf_counter_ns()
+        header = [
+            MAGIC,
+            struct.pack("<BHHH", FORMAT_VERSION, *version[:3]),
+            _pack_str(version.version_str),
+            _pack_str(version.snapshot_str),
+            struct.pack("<H", len(functions)),
+        ]
+        header.extend(_pack_str(name) for name in functions)
+        self._file.write(b"".join(header))
+
+    def record(
+        self,
+        name: str,
+        start_ns: int,
+        end_ns: int,
+        args: list[tuple[int, Any]],
+        result: tuple[int, Any],
+    ) -> None:
+        parts = []
+        with self._lock:
+            func_id = self._names.get(name)
+            if func_id is None:
+                func_id = self._names[name] = len(self._names)
+                parts.append(struct.pack("<BH", REC_NAME, func_id) + _pack_str(name))
+            parts.append(
+                struct.pack(
+                    "<BHQQB",
+                    REC_CALL,
+                    func_id,
+                    max(start_ns - self._start, 0),
+                    end_ns - start_ns,
+                    len(args),
+                )
+            )
+            parts.extend(_encode_value(tag, value) for tag, value in args)
+            parts.append(_encode_value(*result))
+            self._file.write(b"".join(parts))
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._owns_file:
+                self._file.close()
+            else:
+                self._file.flush()
+
+
+class RecordingLibrary:
+    """
+    Wraps a ctypes libftdi library (e.g. Driver.fdll), recording each
+    call made through it - arguments, data returned in buffers, result
+    and timing - with a Recorder.
+    """
+
+    def __init__(self, lib: Any, recorder: Recorder) -> None:
+        self._lib = lib
+        self._recorder = recorder
+        # buffers passed to ftdi_read_data_submit, by transfer handle
+        self._pending: dict[int, Any] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        # only called when `name` isn't already cached in the instance dict
+        fn = getattr(self._lib, name)
+        if not callable(fn):
+            return fn
+        record = self._recorder.record
+        perf_counter_ns = time.perf_counter_ns
+        output = name not in _INPUT_DATA
+        pending = self._pending
+
+        def recorded(*args: Any) -> Any:
+            start = perf_counter_ns()
+            result = fn(*args)
+            end = perf_counter_ns()
+            values = [_arg_value(arg, output) for arg in args]
+            if name in _COUNT_RESULT and result >= 0:
+                values[1] = (TAG_OUT, values[1][1][:result])
+            elif name in _DEFERRED_DATA:
+                values[1] = (TAG_BYTES, b"")
+                if result:
+                    pending[result] = args[1]
+            elif name == "ftdi_transfer_data_done":
+                buf = pending.pop(args[0], None)
+                if buf is not None:
+                    # the data read by a submitted transfer is recorded
+                    # as an extra argument when it completes
+                    values.append((TAG_OUT, bytes(buf)[: max(result, 0)]))
+            record(name, start, end, values, _result_value(result))
+            return result
+
+        recorded.__name__ = name
+        setattr(self, name, recorded)
+        return recorded
+
+
+def _available_functions(lib: Any) -> list[str]:
+    names = list(FTDI_PROTOTYPES) + ["ftdi_get_library_version"]
+    return [name for name in names if hasattr(lib, name)]
+
+
+class RecordingDriver(Driver):
+    """
+    A Driver recording all libftdi calls made through it to a log, e.g.
+    to reproduce a problem later without the hardware using ReplayDriver::
+
+        with RecordingDriver('session.log') as driver:
+            with BitBangDevice(driver=driver) as bb:
+                bb.port = 0x55
+
+    list_devices() is recorded by the strings it returns, rather than the
+    underlying libftdi calls. Other calls made directly to libusb aren't
+    recorded. The log is complete once close() has been called.
+    """
+
+    def __init__(
+        self,
+        log: str | os.PathLike[str] | IO[bytes],
+        driver: Driver | None = None,
+    ) -> None:
+        """
+        :param log: path or binary file object to write the log to
+        :param driver: the Driver to record; defaults to a new Driver()
+        """
+        super().__init__()
+        self.driver = Driver() if driver is None else driver
+        fdll = self.driver.fdll
+        version = self.driver.libftdi_version()
+        self.recorder = Recorder(log, version, _available_functions(fdll))
+        # these take the place of the lazily loaded values in Driver
+        self._fdll = RecordingLibrary(fdll, self.recorder)
+        self._libftdi_version = version
+
+    def list_devices(self) -> list[tuple[str, str, str]]:
+        start = time.perf_counter_ns()
+        devices = self.driver.list_devices()
+        end = time.perf_counter_ns()
+        strings = "\0".join(field for device in devices for field in device)
+        self.recorder.record(
+            LIST_DEVICES,
+            start,
+            end,
+            [(TAG_BYTES, strings.encode())],
+            (TAG_INT, len(devices)),
+        )
+        return devices
+
+    def close(self) -> None:
+        """
+        finish writing the log
+        """
+        self.recorder.close()
+
+    def __enter__(self) -> RecordingDriver:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class Recording:
+    """
+    The contents of a log written by RecordingDriver
+    """
+
+    def __init__(
+        self,
+        version: libftdi_version,
+        functions: list[str],
+        calls: list[RecordedCall],
+    ) -> None:
+        self.libftdi_version = version
+        self.functions = functions
+        self.calls = calls
+
+
+class _LogReader:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.pos = 0
+
+    def unpack(self, fmt: str) -> tuple[Any, ...]:
+        try:
+            values = struct.unpack_from(fmt, self.data, self.pos)
+        except struct.error:
+            raise FtdiError("truncated recording") from None
+        self.pos += struct.calcsize(fmt)
+        return values
+
+    def bytes(self, length: int) -> bytes:
+        if self.pos + length > len(self.data):
+            raise FtdiError("truncated recording")
+        self.pos += length
+        return self.data[self.pos - length : self.pos]
+
+    def str(self) -> str:
+        return self.bytes(self.unpack("<H")[0]).decode()
+
+    def value(self) -> tuple[int, Any]:
+        (tag,) = self.unpack("<B")
+        if tag == TAG_INT:
+            return tag, self.unpack("<q")[0]
+        if tag == TAG_FLOAT:
+            return tag, self.unpack("<d")[0]
+        if tag in (TAG_BYTES, TAG_OUT):
+            return tag, self.bytes(self.unpack("<I")[0])
+        if tag in (TAG_NONE, TAG_PTR, TAG_NULL, TAG_PTR_OUT):
+            return tag, None
+        raise FtdiError(f"invalid value tag {tag} in recording")
+
+
+def read_recording(log: str | os.PathLike[str] | IO[bytes]) -> Recording:
+    """
+    :param log: path or binary file object of a log written by
+        RecordingDriver
+    :return: the Recording it contains
+    """
+    if isinstance(log, (str, os.PathLike)):
+        with open(log, "rb") as log_file:
+            data = log_file.read()
+    else:
+        data = log.read()
+    if not data.startswith(MAGIC):
+        raise FtdiError("not a pylibftdi recording")
+    reader = _LogReader(data)
+    reader.pos = len(MAGIC)
+    fmt_version, major, minor, micro = reader.unpack("<BHHH")
+    if fmt_version != FORMAT_VERSION:
+        raise FtdiError(f"unsupported recording format {fmt_version}")
+    version = libftdi_version(major, minor, micro, reader.str(), reader.str())
+    functions = [reader.str() for _ in range(reader.unpack("<H")[0])]
+    names: dict[int, str] = {}
+    calls = []
+    while reader.pos < len(data):
+        (rec_type,) = reader.unpack("<B")
+        if rec_type == REC_NAME:
+            (func_id,) = reader.unpack("<H")
+            names[func_id] = reader.str()
+        elif rec_type == REC_CALL:
+            func_id, start_ns, duration_ns, nargs = reader.unpack("<HQQB")
+            args = [reader.value() for _ in range(nargs)]
+            result = reader.value()
+            calls.append(
+                RecordedCall(names[func_id], start_ns, duration_ns, args, result)
+            )
+        else:
+            raise FtdiError(f"invalid record type {rec_type} in recording")
+    return Recording(version, functions, calls)
+
+
+class ReplayLibrary:
+    """
+    Stands in for libftdi, serving the calls from a Recording in order.
+
+    Each call must be of the next recorded function, otherwise FtdiError
+    is raised; its result is the recorded result, and any data recorded
+    as returned in buffer arguments is copied into the given buffers.
+    """
+
+    def __init__(self, recording: Recording, realtime: bool = False) -> None:
+        """
+        :param recording: the Recording to replay
+        :param realtime: if True, each call returns no earlier (relative
+            to the first call) than it did when recorded; otherwise calls
+            return as quickly as possible.
+        """
+        self._calls = recording.calls
+        self._functions = set(recording.functions)
+        self._realtime = realtime
+        self._pos = 0
+        self._lock = threading.Lock()
+        # time.perf_counter_ns() corresponding to the start of the recording
+        self._origin: int | None = None
+        # buffers passed to ftdi_read_data_submit, by transfer handle
+        self._pending: dict[int, Any] = {}
+
+    @property
+    def remaining(self) -> int:
+        """
+        number of recorded calls not yet replayed
+        """
+        return len(self._calls) - self._pos
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in self._functions:
+            raise AttributeError(name)
+
+        def replayed(*args: Any) -> Any:
+            return self._replay(name, args)
+
+        replayed.__name__ = name
+        setattr(self, name, replayed)
+        return replayed
+
+    def _next_call(self, name: str) -> tuple[RecordedCall, int]:
+        """
+        :return: the next recorded call, which must be of `name`, and the
+            perf_counter_ns() value by which it completes in a realtime
+            replay
+        """
+        with self._lock:
+            pos = self._pos
+            if pos >= len(self._calls):
+                raise FtdiError(f"recording exhausted at {name}()")
+            call = self._calls[pos]
+            if call.name != name:
+                raise FtdiError(
+                    f"replay diverged at call {pos}: recorded {call.name}(), "
+                    f"called {name}()"
+                )
+            self._pos = pos + 1
+            if self._origin is None:
+                self._origin = time.perf_counter_ns() - call.start_ns
+            target = self._origin + call.start_ns + call.duration_ns
+        return call, target
+
+    def _wait(self, target: int) -> None:
+        if self._realtime:
+            delay = target - time.perf_counter_ns()
+            if delay > 0:
+                time.sleep(delay / 1e9)
+
+    def list_devices(self) -> list[tuple[str, str, str]]:
+        """
+        :return: the result of the next call, which must be a recorded
+            Driver.list_devices()
+        """
+        call, target = self._next_call(LIST_DEVICES)
+        _tag, strings = call.args[0]
+        fields = strings.decode().split("\0")
+        devices = [
+            (fields[idx], fields[idx + 1], fields[idx + 2])
+            for idx in range(0, 3 * call.result[1], 3)
+        ]
+        self._wait(target)
+        return devices
+
+    def _replay(self, name: str, args: tuple[Any, ...]) -> Any:
+        call, target = self._next_call(name)
+        if any(tag == TAG_PTR_OUT for tag, _value in call.args):
+            raise FtdiError(
+                f"{name}() returned pointers when recorded, so can't be replayed"
+            )
+        for idx, (tag, value) in enumerate(call.args[: len(args)]):
+            if tag == TAG_OUT and value:
+                # both arrays and byref() objects are accepted as pointers
+                memmove(args[idx], value, len(value))
+        result_tag, result = call.result
+        if name in _DEFERRED_DATA and result:
+            self._pending[result] = args[1]
+        elif name == "ftdi_transfer_data_done" and len(call.args) > len(args):
+            buf = self._pending.pop(args[0], None)
+            tag, value = call.args[len(args)]
+            if buf is not None and value:
+                memmove(buf, value, len(value))
+
+        self._wait(target)
+        if result_tag == TAG_PTR:
+            # e.g. ftdi_new(); a zeroed context has no usb_dev, so isn't
+            # passed to libusb.
+            return pointer(ftdi_context())
+        if result_tag == TAG_NULL:
+            return POINTER(ftdi_context)()
+        return result
+
+
+class ReplayDriver(Driver):
+    """
+    A Driver replaying a log written by RecordingDriver, for use without
+    the hardware, e.g.::
+
+        driver = ReplayDriver('session.log')
+        with BitBangDevice(driver=driver) as bb:
+            bb.port = 0x55
+
+    The application must make the same sequence of libftdi calls as when
+    recording; FtdiError is raised if it diverges. Data passed to stream
+    callbacks (e.g. by FifoStreamDevice) isn't replayed.
+    """
+
+    def __init__(
+        self,
+        log: str | os.PathLike[str] | IO[bytes] | Recording,
+        realtime: bool = False,
+    ) -> None:
+        """
+        :param log: path or binary file object of the log, or a Recording
+        :param realtime: if True, replay with the recorded timing,
+            otherwise as fast as possible.
+        """
+        super().__init__()
+        recording = log if isinstance(log, Recording) else read_recording(log)
+        self.recording = recording
+        # these take the place of the lazily loaded values in Driver
+        self._fdll = ReplayLibrary(recording, realtime)
+        self._libftdi_version = recording.libftdi_version
+
+    def list_devices(self) -> list[tuple[str, str, str]]:
+        return self._fdll.list_devices()
@@ -0,0 +1,750 @@
+"""
+pylibftdi.sim - simulated FTDI devices
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from ctypes import addressof, c_uint, c_uint16, memmove, pointer, string_at
+from typing import Any
+
+from pylibftdi.driver import (
+    BITMODE_BITBANG,
+    BITMODE_RESET,
+    BITMODE_SYNCBB,
+    FTDI_ERROR_DEVICE_NOT_FOUND,
+    FTDI_VENDOR_ID,
+    HIGH_SPEED_TYPES,
+    TYPE_230X,
+    TYPE_232H,
+    TYPE_2232C,
+    TYPE_2232H,
+    TYPE_4232H,
+    TYPE_AM,
+    TYPE_BM,
+    TYPE_R,
+    Driver,
+    ftdi_context,
+    libftdi_version,
+)
+from pylibftdi.profiler import ProfiledLibrary, Profiler
+
+# (product id, description, tx FIFO size, rx FIFO size, max baudrate) for
+# each chip type. The tx FIFO holds data written by the host until it is
+# sent on the line, and the rx FIFO data received from the line until the
+# host reads it. Sizes are per interface, from the datasheets.
+CHIP_TYPES = {
+    TYPE_AM: (0x6001, "FT8U232AM", 128, 384, 3_000_000),
+    TYPE_BM: (0x6001, "FT232BM", 128, 384, 3_000_000),
+    TYPE_2232C: (0x6010, "Dual RS232", 128, 384, 3_000_000),
+    TYPE_R: (0x6001, "FT232R USB UART", 128, 256, 3_000_000),
+    TYPE_2232H: (0x6010, "Dual RS232-HS", 4096, 4096, 12_000_000),
+    TYPE_4232H: (0x6011, "Quad RS232-HS", 2048, 2048, 12_000_000),
+    TYPE_232H: (0x6014, "Single RS232-HS", 1024, 1024, 12_000_000),
+    TYPE_230X: (0x6015, "FT230X Basic UART", 512, 512, 3_000_000),
+}
+
+# Data payload of each USB packet read from the device, after the two
+# modem status bytes, for full-speed and high-speed chips.
+FULL_SPEED_PACKET = 62
+HIGH_SPEED_PACKET = 510
+# Approximate sustained bulk transfer rates, in bytes per second
+FULL_SPEED_USB_RATE = 1_000_000
+HIGH_SPEED_USB_RATE = 40_000_000
+
+# libftdi defaults
+DEFAULT_CHUNKSIZE = 4096
+DEFAULT_LATENCY = 16
+WRITE_TIMEOUT = 5.0
+
+# Longest single wait while a read or write is blocked, so changes made by
+# other threads (e.g. writing to a peer) are noticed promptly.
+MAX_WAIT = 0.001
+MIN_WAIT = 1e-6
+
+SIM_LIBFTDI_VERSION = libftdi_version(1, 5, 0, "1.5", "pylibftdi.sim")
+
+
+class RealClock:
+    """
+    The default SimDriver clock: simulated transfers take real time.
+    """
+
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+
+class SimClock:
+    """
+    A virtual clock for SimDriver. sleep() advances the time immediately,
+    so simulated transfers take no real time and timings measured with
+    now() are exactly reproducible. Only suitable for use from one thread.
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._now = start
+
+    def now(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            self._now += seconds
+
+
+class SimChip:
+    """
+    A simulated FTDI chip interface, created with SimDriver.add_chip().
+
+    Data written by the host passes through the tx FIFO at the line rate
+    (baudrate / bits per frame) to the `peer` chip's rx FIFO, where it
+    stays until read; data arriving with the rx FIFO full is dropped and
+    counted in `overruns`. Reads return a full USB packet as soon as one
+    is available, otherwise whatever has arrived when the latency timer
+    expires, as the real chips do.
+
+    In bitbang mode bytes are clocked out to the pins at 16 times the
+    baudrate; in synchronous bitbang mode the pins are sampled into the rx
+    FIFO before each byte is output. The level of pins configured as
+    inputs is taken from `input_pins`.
+
+    The state is brought up to date with the clock by each simulated
+    libftdi call, or SimDriver.update().
+
+    Attributes such as the FIFO sizes may be changed to model other parts.
+    """
+
+    def __init__(
+        self,
+        serial: str,
+        chip_type: int = TYPE_R,
+        interface: int = 1,
+        description: str | None = None,
+    ) -> None:
+        if chip_type not in CHIP_TYPES:
+            raise ValueError(f"unknown chip type {chip_type}")
+        pid, default_description, tx_size, rx_size, max_baudrate = CHIP_TYPES[chip_type]
+        self.serial = serial
+        self.chip_type = chip_type
+        self.interface = interface
+        self.description = default_description if description is None else description
+        self.vid = FTDI_VENDOR_ID
+        self.pid = pid
+        self.tx_fifo_size = tx_size
+        self.rx_fifo_size = rx_size
+        self.max_baudrate = max_baudrate
+        high_speed = chip_type in HIGH_SPEED_TYPES
+        self.packet_size = HIGH_SPEED_PACKET if high_speed else FULL_SPEED_PACKET
+        self.usb_rate = HIGH_SPEED_USB_RATE if high_speed else FULL_SPEED_USB_RATE
+        # the chip receiving data sent by this one, which may be itself
+        self.peer: SimChip | None = None
+        self.overruns = 0
+        self.input_pins = 0
+        self.rts = 0
+        self.dtr = 0
+
+        self.baudrate = 9600
+        # start bit, 8 data bits, 1 stop bit
+        self.frame_bits = 10.0
+        self.latency = DEFAULT_LATENCY
+        self.bitmode = BITMODE_RESET
+        self.direction = 0
+        self.latch = 0
+        self.tx = bytearray()
+        self.rx = bytearray()
+        self.opened = False
+        # set on overrun, cleared when the modem status is polled
+        self._overrun_error = False
+        # fractional bytes sent on the line since the last whole byte
+        self._credit = 0.0
+        # clock time to which the FIFOs have been brought up to date
+        self._updated = 0.0
+        # clock time at which the latency timer expires
+        self._flush_at = 0.0
+
+    def __repr__(self) -> str:
+        return f"<SimChip {self.serial!r} interface {self.interface}>"
+
+    @property
+    def pins(self) -> int:
+        """
+        the current pin levels: the output latch for output pins, and
+        `input_pins` for inputs
+        """
+        return (
+            (self.latch & self.direction) | (self.input_pins & ~self.direction)
+        ) & 0xFF
+
+    @property
+    def line_rate(self) -> float:
+        """
+        bytes per second sent from the tx FIFO
+        """
+        if self.bitmode in (BITMODE_BITBANG, BITMODE_SYNCBB):
+            return self.baudrate * 16.0
+        return self.baudrate / self.frame_bits
+
+    def feeds(self, other: SimChip) -> bool:
+        """
+        :return: True if data sent by this chip is received by `other`
+        """
+        if self.bitmode == BITMODE_SYNCBB:
+            return other is self
+        return self.bitmode == BITMODE_RESET and self.peer is other
+
+    def advance(self, now: float) -> None:
+        """
+        send data from the tx FIFO up to clock time `now`
+        """
+        elapsed = now - self._updated
+        self._updated = now
+        if not self.tx:
+            self._credit = 0.0
+            return
+        if elapsed <= 0:
+            return
+        self._credit += elapsed * self.line_rate
+        count = min(int(self._credit), len(self.tx))
+        if self.bitmode == BITMODE_SYNCBB:
+            # the chip stalls rather than overrun with samples
+            count = min(count, self.rx_fifo_size - len(self.rx))
+        if count:
+            data = bytes(self.tx[:count])
+            del self.tx[:count]
+            self._send(data)
+        self._credit -= count
+        if not self.tx or self._credit >= 1:
+            # idle, or stalled
+            self._credit = 0.0
+
+    def _send(self, data: bytes) -> None:
+        if self.bitmode == BITMODE_SYNCBB:
+            samples = bytearray()
+            for value in data:
+                # the pins are sampled just before each byte is output
+                samples.append(self.pins)
+                self.latch = value
+            self.receive(samples)
+        elif self.bitmode == BITMODE_BITBANG:
+            self.latch = data[-1]
+        elif self.peer is not None:
+            self.peer.receive(data)
+
+    def receive(self, data: bytes | bytearray) -> None:
+        """
+        add data received from the line to the rx FIFO
+        """
+        free = self.rx_fifo_size - len(self.rx)
+        if len(data) > free:
+            self.overruns += len(data) - free
+            self._overrun_error = True
+            data = data[:free]
+        self.rx += data
+
+    def modem_status(self) -> int:
+        """
+        :return: the modem status, as from ftdi_poll_modem_status(). CTS
+            and DSR follow the peer's RTS and DTR lines (for a loopback,
+            this chip's own).
+        """
+        status = 0x01
+        if self.peer is not None:
+            status |= self.peer.rts << 4 | self.peer.dtr << 5
+        if self.rx:
+            status |= 0x0100
+        if self._overrun_error:
+            status |= 0x0200
+            self._overrun_error = False
+        if len(self.tx) < self.tx_fifo_size:
+            status |= 0x2000
+        if not self.tx:
+            status |= 0x4000
+        return status
+
+
+class _Handle:
+    """
+    libftdi state associated with a ftdi_context
+    """
+
+    def __init__(self) -> None:
+        self.chip: SimChip | None = None
+        self.interface = 1
+        self.error = ""
+        self.read_chunksize = DEFAULT_CHUNKSIZE
+        self.write_chunksize = DEFAULT_CHUNKSIZE
+        # data received in earlier transfers but not yet returned
+        self.read_buffer = bytearray()
+
+
+class SimLibrary:
+    """
+    Stands in for libftdi, implementing the functions used by pylibftdi's
+    device classes against a list of SimChips.
+
+    Functions not simulated (e.g. those for MPSSE, sync FIFO or EEPROM
+    access) raise AttributeError, as a missing library function would.
+    """
+
+    def __init__(self, chips: list[SimChip], clock: Any) -> None:
+        self._chips = chips
+        self._clock = clock
+        self._lock = threading.Lock()
+        # keyed by the address of each ftdi_context
+        self._handles: dict[int, _Handle] = {}
+
+    def _handle(self, ctx: Any) -> _Handle:
+        return self._handles[addressof(ctx.contents)]
+
+    def _update(self) -> float:
+        """
+        bring all the chips up to date with the clock; called with the
+        lock held
+
+        :return: the current clock time
+        """
+        now: float = self._clock.now()
+        for chip in self._chips:
+            chip.advance(now)
+        return now
+
+    @staticmethod
+    def _error(handle: _Handle, code: int, message: str) -> int:
+        handle.error = message
+        return code
+
+    def _unavailable(self, handle: _Handle) -> int:
+        return self._error(handle, -666, "USB device unavailable")
+
+    def ftdi_new(self) -> Any:
+        ctx = pointer(ftdi_context())
+        self._handles[addressof(ctx.contents)] = _Handle()
+        return ctx
+
+    def ftdi_free(self, ctx: Any) -> None:
+        handle = self._handles.pop(addressof(ctx.contents))
+        if handle.chip is not None:
+            handle.chip.opened = False
+
+    def ftdi_get_error_string(self, ctx: Any) -> bytes:
+        return self._handle(ctx).error.encode()
+
+    def ftdi_set_interface(self, ctx: Any, interface: int) -> int:
+        handle = self._handle(ctx)
+        if handle.chip is not None:
+            return self._error(
+                handle, -3, "Interface can not be changed on an already open device"
+            )
+        if not 0 <= interface <= 4:
+            return self._error(handle, -1, "Unknown interface")
+        # INTERFACE_ANY selects the first interface
+        handle.interface = interface or 1
+        return 0
+
+    def ftdi_usb_open_desc_index(  # noqa: PLR0917
+        self,
+        ctx: Any,
+        vendor: int,
+        product: int,
+        description: Any,
+        serial: Any,
+        index: int,
+    ) -> int:
+        handle = self._handle(ctx)
+        description = description.value.decode("latin1") if description else None
+        serial = serial.value.decode("latin1") if serial else None
+        matches = [
+            chip
+            for chip in self._chips
+            if chip.vid == vendor
+            and chip.pid == product
+            and chip.interface == handle.interface
+            and description in (None, chip.description)
+            and serial in (None, chip.serial)
+        ]
+        if index >= len(matches):
+            return self._error(handle, FTDI_ERROR_DEVICE_NOT_FOUND, "device not found")
+        chip = matches[index]
+        with self._lock:
+            if chip.opened:
+                return self._error(
+                    handle,
+                    -5,
+                    "unable to claim usb device. Make sure the default FTDI "
+                    "driver is not in use",
+                )
+            now = self._update()
+            chip.opened = True
+            chip._flush_at = now + chip.latency / 1000
+        handle.chip = chip
+        contents = ctx.contents
+        contents.type = chip.chip_type
+        contents.interface = chip.interface - 1
+        contents.baudrate = chip.baudrate
+        contents.max_packet_size = chip.packet_size + 2
+        contents.readbuffer_chunksize = handle.read_chunksize
+        contents.writebuffer_chunksize = handle.write_chunksize
+        return 0
+
+    def ftdi_usb_close(self, ctx: Any) -> int:
+        handle = self._handle(ctx)
+        if handle.chip is not None:
+            handle.chip.opened = False
+            handle.chip = None
+        handle.read_buffer.clear()
+        return 0
+
+    def ftdi_set_bitmode(self, ctx: Any, bitmask: int, mode: int) -> int:
+        handle = self._handle(ctx)
+        chip = handle.chip
+        if chip is None:
+            return self._unavailable(handle)
+        if mode not in (BITMODE_RESET, BITMODE_BITBANG, BITMODE_SYNCBB):
+            return self._error(
+                handle, -1, f"bitmode 0x{mode:02x} not supported by pylibftdi.sim"
+            )
+        with self._lock:
+            self._update()
+            chip.bitmode = mode
+            chip.direction = bitmask & 0xFF
+        ctx.contents.bitbang_enabled = mode != BITMODE_RESET
+        ctx.contents.bitbang_mode = mode
+        return 0
+
+    def ftdi_setflowctrl(self, ctx: Any, flowctrl: int) -> int:
+        # accepted, but flow control isn't simulated
+        handle = self._handle(ctx)
+        return 0 if handle.chip is not None else self._unavailable(handle)
+
+    def ftdi_set_line_property(
+        self, ctx: Any, bits: int, stopbits: int, parity: int
+    ) -> int:
+        handle = self._handle(ctx)
+        chip = handle.chip
+        if chip is None:
+            return self._unavailable(handle)
+        with self._lock:
+            self._update()
+            # start bit, data bits, optional parity bit and 1, 1.5 or 2
+            # stop bits (STOP_BIT_1, STOP_BIT_15, STOP_BIT_2)
+            chip.frame_bits = 1 + bits + (parity != 0) + (1.0, 1.5, 2.0)[stopbits]
+        return 0
+
+    def ftdi_set_baudrate(self, ctx: Any, baudrate: int) -> int:
+        handle = self._handle(ctx)
+        chip = handle.chip
+        if chip is None:
+            return self._unavailable(handle)
+        if baudrate <= 0:
+            return self._error(handle, -1, "Silly baudrate <= 0.")
+        if baudrate > chip.max_baudrate:
+            return self._error(handle, -1, "Unsupported baudrate.")
+        with self._lock:
+            self._update()
+            chip.baudrate = baudrate
+        ctx.contents.baudrate = baudrate
+        return 0
+
+    def ftdi_set_latency_timer(self, ctx: Any, latency: int) -> int:
+        handle = self._handle(ctx)
+        if handle.chip is None:
+            return self._unavailable(handle)
+        if not 1 <= latency <= 255:
+            return self._error(handle, -1, "latency out of range. Only valid for 1-255")
+        handle.chip.latency = latency
+        return 0
+
+    def ftdi_get_latency_timer(self, ctx: Any, latency: Any) -> int:
+        handle = self._handle(ctx)
+        if handle.chip is None:
+            return self._unavailable(handle)
+        memmove(latency, bytes([handle.chip.latency]), 1)
+        return 0
+
+    def ftdi_read_data_set_chunksize(self, ctx: Any, chunksize: int) -> int:
+        self._handle(ctx).read_chunksize = chunksize
+        ctx.contents.readbuffer_chunksize = chunksize
+        return 0
+
+    def ftdi_read_data_get_chunksize(self, ctx: Any, chunksize: Any) -> int:
+        memmove(chunksize, bytes(c_uint(self._handle(ctx).read_chunksize)), 4)
+        return 0
+
+    def ftdi_write_data_set_chunksize(self, ctx: Any, chunksize: int) -> int:
+        self._handle(ctx).write_chunksize = chunksize
+        ctx.contents.writebuffer_chunksize = chunksize
+        return 0
+
+    def ftdi_write_data_get_chunksize(self, ctx: Any, chunksize: Any) -> int:
+        memmove(chunksize, bytes(c_uint(self._handle(ctx).write_chunksize)), 4)
+        return 0
+
+    def _purge(self, ctx: Any, rx: bool, tx: bool) -> int:
+        handle = self._handle(ctx)
+        chip = handle.chip
+        if chip is None:
+            return self._unavailable(handle)
+        with self._lock:
+            self._update()
+            if rx:
+                chip.rx.clear()
+                handle.read_buffer.clear()
+            if tx:
+                chip.tx.clear()
+        return 0
+
+    def ftdi_usb_purge_rx_buffer(self, ctx: Any) -> int:
+        return self._purge(ctx, rx=True, tx=False)
+
+    def ftdi_usb_purge_tx_buffer(self, ctx: Any) -> int:
+        return self._purge(ctx, rx=False, tx=True)
+
+    def ftdi_usb_purge_buffers(self, ctx: Any) -> int:
+        return self._purge(ctx, rx=True, tx=True)
+
+    def ftdi_read_pins(self, ctx: Any, pins: Any) -> int:
+        handle = self._handle(ctx)
+        chip = handle.chip
+        if chip is None:
+            return self._unavailable(handle)
+        with self._lock:
+            self._update()
+            value = chip.pins
+        memmove(pins, bytes([value]), 1)
+        return 0
+
+    def ftdi_setdtr(self, ctx: Any, state: int) -> int:
+        handle = self._handle(ctx)
+        if handle.chip is None:
+            return self._unavailable(handle)
+        handle.chip.dtr = state & 1
+        return 0
+
+    def ftdi_setrts(self, ctx: Any, state: int) -> int:
+        handle = self._handle(ctx)
+        if handle.chip is None:
+            return self._unavailable(handle)
+        handle.chip.rts = state & 1
+        return 0
+
+    def ftdi_setdtr_rts(self, ctx: Any, dtr: int, rts: int) -> int:
+        res = self.ftdi_setdtr(ctx, dtr)
+        return res if res else self.ftdi_setrts(ctx, rts)
+
+    def ftdi_poll_modem_status(self, ctx: Any, status: Any) -> int:
+        handle = self._handle(ctx)
+        chip = handle.chip
+        if chip is None:
+            return self._unavailable(handle)
+        with self._lock:
+            self._update()
+            value = chip.modem_status()
+        memmove(status, bytes(c_uint16(value)), 2)
+        return 0
+
+    def _rx_wait(self, chip: SimChip, now: float) -> float:
+        """
+        :return: how long to wait for the latency timer to expire, or for
+            a full packet to be received, whichever is sooner
+        """
+        wait = chip._flush_at - now
+        need = chip.packet_size - len(chip.rx)
+        for source in self._chips:
+            if source.feeds(chip) and len(source.tx) >= need:
+                wait = min(wait, (need - source._credit) / source.line_rate)
+        return min(max(wait, MIN_WAIT), MAX_WAIT)
+
+    def _transfer(self, handle: _Handle, chip: SimChip) -> bytes:
+        """
+        simulate a USB bulk read of up to read_chunksize bytes, which
+        completes when it is full or the device sends a short packet (when
+        its latency timer expires).
+        """
+        packets = max(handle.read_chunksize // (chip.packet_size + 2), 1)
+        capacity = packets * chip.packet_size
+        data = bytearray()
+        done = False
+        while not done:
+            with self._lock:
+                now = self._update()
+                latency = chip.latency / 1000
+                if len(chip.rx) >= chip.packet_size:
+                    data += chip.rx[: chip.packet_size]
+                    del chip.rx[: chip.packet_size]
+                    chip._flush_at = now + latency
+                    done = len(data) >= capacity
+                    wait = 0.0
+                elif now >= chip._flush_at:
+                    # a short packet, perhaps with just the status bytes
+                    data += chip.rx
+                    chip.rx.clear()
+                    chip._flush_at = now + latency
+                    done = True
+                else:
+                    wait = self._rx_wait(chip, now)
+            if not done and wait:
+                self._clock.sleep(wait)
+        self._clock.sleep(len(data) / chip.usb_rate)
+        return bytes(data)
+
+    def ftdi_read_data(self, ctx: Any, buf: Any, size: int) -> int:
+        handle = self._handle(ctx)
+        chip = handle.chip
+        if chip is None:
+            return self._unavailable(handle)
+        if size <= 0:
+            return 0
+        with self._lock:
+            self._update()
+            if chip.bitmode == BITMODE_BITBANG and not chip.rx:
+                # asynchronous bitbang reads sample the pins directly
+                memmove(buf, bytes([chip.pins]), 1)
+                return 1
+        # as libftdi, return data left over from a previous transfer first,
+        # and keep reading until `size` bytes or a transfer is empty.
+        data = handle.read_buffer[:size]
+        del handle.read_buffer[:size]
+        while len(data) < size:
+            received = self._transfer(handle, chip)
+            if not received:
+                break
+            need = size - len(data)
+            data += received[:need]
+            handle.read_buffer += received[need:]
+        memmove(buf, bytes(data), len(data))
+        return len(data)
+
+    def ftdi_write_data(self, ctx: Any, buf: Any, size: int) -> int:
+        handle = self._handle(ctx)
+        chip = handle.chip
+        if chip is None:
+            return self._unavailable(handle)
+        data = string_at(buf, size)
+        offset = 0
+        progress = self._clock.now()
+        while offset < size:
+            with self._lock:
+                now = self._update()
+                free = chip.tx_fifo_size - len(chip.tx)
+                if free > 0:
+                    # the device accepts data as long as its FIFO has room
+                    count = min(free, size - offset, handle.write_chunksize)
+                    chip.tx += data[offset : offset + count]
+                    offset += count
+                    progress = now
+                    wait = count / chip.usb_rate
+                elif now - progress > WRITE_TIMEOUT:
+                    return self._error(handle, -1, "usb bulk write failed")
+                else:
+                    need = min(chip.packet_size, size - offset)
+                    wait = min(
+                        max((need - chip._credit) / chip.line_rate, MIN_WAIT),
+                        MAX_WAIT,
+                    )
+            self._clock.sleep(wait)
+        return size
+
+
+class SimDriver(Driver):
+    """
+    A Driver for simulated FTDI chips, so devices can be used without
+    hardware (or libftdi), e.g.::
+
+        driver = SimDriver()
+        driver.add_chip('SIM1', loopback=True)
+        with Device('SIM1', driver=driver) as dev:
+            dev.baudrate = 115200
+            dev.write(b'hello')
+            time.sleep(0.02)
+            assert dev.read(5) == b'hello'
+
+    With a SimClock, simulated time only passes while blocked in a
+    transfer, so tests and benchmarks are fast and reproducible.
+
+    The FIFO sizes, baudrate and latency timer determine timing; other
+    effects (e.g. USB scheduling and flow control) are approximated or
+    ignored. MPSSE, sync FIFO and EEPROM functions aren't simulated.
+    """
+
+    def __init__(
+        self, clock: Any = None, profile: bool | Profiler | None = None
+    ) -> None:
+        """
+        :param clock: a SimClock for simulated time, or None for real time
+        :param profile: as for Driver
+        """
+        super().__init__(profile=profile)
+        self.clock = RealClock() if clock is None else clock
+        self.chips: list[SimChip] = []
+        self.library = SimLibrary(self.chips, self.clock)
+        fdll: Any = self.library
+        if self.profiler is not None:
+            fdll = ProfiledLibrary(fdll, self.profiler)
+        # these take the place of the lazily loaded values in Driver
+        self._fdll = fdll
+        self._libftdi_version = SIM_LIBFTDI_VERSION
+
+    def add_chip(
+        self,
+        serial: str,
+        chip_type: int = TYPE_R,
+        *,
+        interface: int = 1,
+        description: str | None = None,
+        loopback: bool = False,
+    ) -> SimChip:
+        """
+        add a simulated chip, which may be opened by serial number or
+        description
+
+        :param serial: the serial number
+        :param chip_type: one of the TYPE_* constants from driver
+        :param interface: the interface number (1 for INTERFACE_A)
+        :param description: defaults to the usual one for the chip type
+        :param loopback: if True, data sent is received by the same chip,
+            as with TX connected to RX (and RTS / DTR to CTS / DSR)
+        :return: the new SimChip
+        """
+        chip = SimChip(serial, chip_type, interface, description)
+        if loopback:
+            chip.peer = chip
+        self.chips.append(chip)
+        return chip
+
+    @staticmethod
+    def connect(chip_a: SimChip, chip_b: SimChip) -> None:
+        """
+        cross-connect two chips, so each receives what the other sends
+        """
+        chip_a.peer = chip_b
+        chip_b.peer = chip_a
+
+    def update(self) -> None:
+        """
+        bring the state of all the chips up to date with the clock
+        """
+        with self.library._lock:
+            self.library._update()
+
+    def list_devices(self) -> list[tuple[str, str, str]]:
+        """
+        :return: (manufacturer, description, serial#) for each simulated
+            device; chips sharing a serial number are listed once.
+        """
+        devices = []
+        seen = set()
+        for chip in self.chips:
+            if chip.serial not in seen:
+                seen.add(chip.serial)
+                devices.append(("FTDI", chip.description, chip.serial))
+        return devices
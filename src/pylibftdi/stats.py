@@ -0,0 +1,314 @@
+"""
+pylibftdi.stats - I/O statistics for devices
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any
+
+# Each power of two is split into 2**SUB_BUCKET_BITS linear sub-buckets,
+# so a recorded value is known to within 25% (as with HdrHistogram, but
+# at a fixed, coarse precision).
+SUB_BUCKET_BITS = 2
+# Enough buckets for values up to 7 * 2**28 microseconds (about half an
+# hour), where the last bucket starts; larger values are counted in it.
+HISTOGRAM_BUCKETS = (32 - SUB_BUCKET_BITS) << SUB_BUCKET_BITS
+
+# bounds (in microseconds) used for Prometheus exposition: powers of 4
+# from 1us to ~4s. Each is reported as the upper edge of its bucket.
+PROMETHEUS_BOUNDS = [4**n for n in range(12)]
+
+
+def bucket_index(value: int) -> int:
+    """
+    :return: index of the LatencyHistogram bucket holding `value`
+    """
+    if value < (1 << SUB_BUCKET_BITS):
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    index = ((shift + 1) << SUB_BUCKET_BITS) + (value >> shift) - (1 << SUB_BUCKET_BITS)
+    return min(index, HISTOGRAM_BUCKETS - 1)
+
+
+def bucket_lower_bound(index: int) -> int:
+    """
+    :return: the smallest value held by the bucket with the given index
+    """
+    if index < (1 << SUB_BUCKET_BITS):
+        return index
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    sub_bucket = index & ((1 << SUB_BUCKET_BITS) - 1)
+    return (sub_bucket + (1 << SUB_BUCKET_BITS)) << shift
+
+
+class LatencyHistogram:
+    """
+    A histogram of latencies in microseconds with fixed, logarithmically
+    sized buckets, so recording a value is a constant-time increment
+    regardless of its magnitude.
+    """
+
+    def __init__(self) -> None:
+        self.counts = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: int) -> None:
+        """
+        record a latency of `value` microseconds
+        """
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def copy(self) -> LatencyHistogram:
+        other = LatencyHistogram()
+        other.counts = list(self.counts)
+        other.count = self.count
+        other.total = self.total
+        other.max = self.max
+        return other
+
+    @property
+    def mean(self) -> float:
+        """
+        mean latency in microseconds, or 0 if nothing has been recorded
+        """
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> int:
+        """
+        :return: an upper bound (within the bucket precision) of the
+            given percentile latency in microseconds, or 0 if nothing
+            has been recorded.
+        """
+        if not self.count:
+            return 0
+        threshold = self.count * percent / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= threshold:
+                return min(bucket_lower_bound(index + 1) - 1, self.max)
+        return self.max
+
+    def cumulative(self, bounds: Iterable[int]) -> list[tuple[int, int]]:
+        """
+        :return: (upper, count) pairs giving the number of values less
+            than or equal to `upper`, for each of the ascending `bounds`.
+            Values are only known to within a bucket, so `upper` is the
+            largest value in the bucket holding the bound: the bound
+            itself if it ends a bucket (e.g. 2**n - 1), otherwise up to
+            the bucket precision (25%) above it. Bounds sharing a bucket
+            give a single pair, and bounds in the last (unbounded) bucket
+            give none.
+        """
+        result: list[tuple[int, int]] = []
+        index = seen = 0
+        for bound in bounds:
+            end = bucket_index(bound) + 1
+            if end >= HISTOGRAM_BUCKETS:
+                break
+            if end <= index:
+                continue
+            seen += sum(self.counts[index:end])
+            index = end
+            result.append((bucket_lower_bound(end) - 1, seen))
+        return result
+
+
+class DeviceStats:
+    """
+    Counters and latency histograms for I/O on a Device, enabled with
+    Device.enable_stats() or the `collect_stats` Device option.
+
+    Reads which returned no data are counted in `empty_reads`, and writes
+    where the device accepted fewer bytes than given in `short_writes`.
+    Calls which raised an exception are counted in `read_errors` /
+    `write_errors` but otherwise not recorded.
+
+    Each call is recorded with a handful of integer updates; there is no
+    locking, so counts from concurrent calls on the same device may
+    (rarely) be lost.
+    """
+
+    COUNTERS = (
+        "read_calls",
+        "read_bytes",
+        "empty_reads",
+        "read_errors",
+        "write_calls",
+        "write_bytes",
+        "short_writes",
+        "write_errors",
+    )
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        reset all counters and histograms to zero
+        """
+        self.read_calls = 0
+        self.read_bytes = 0
+        self.empty_reads = 0
+        self.read_errors = 0
+        self.write_calls = 0
+        self.write_bytes = 0
+        self.short_writes = 0
+        self.write_errors = 0
+        self.read_latency = LatencyHistogram()
+        self.write_latency = LatencyHistogram()
+        # time.time() when collection started or was last reset
+        self.since = time.time()
+
+    def record_read(self, count: int, elapsed_ns: int) -> None:
+        self.read_calls += 1
+        self.read_bytes += count
+        if not count:
+            self.empty_reads += 1
+        self.read_latency.record(elapsed_ns // 1000)
+
+    def record_write(self, count: int, requested: int, elapsed_ns: int) -> None:
+        self.write_calls += 1
+        self.write_bytes += count
+        if count < requested:
+            self.short_writes += 1
+        self.write_latency.record(elapsed_ns // 1000)
+
+    def copy(self) -> DeviceStats:
+        """
+        :return: a snapshot of the current statistics
+        """
+        other = DeviceStats()
+        for name in self.COUNTERS:
+            setattr(other, name, getattr(self, name))
+        other.read_latency = self.read_latency.copy()
+        other.write_latency = self.write_latency.copy()
+        other.since = self.since
+        return other
+
+    def as_dict(self) -> dict[str, Any]:
+        """
+        :return: the counters and a latency summary (in microseconds),
+            e.g. for logging.
+        """
+        result: dict[str, Any] = {name: getattr(self, name) for name in self.COUNTERS}
+        for name in ("read_latency", "write_latency"):
+            hist = getattr(self, name)
+            result[name] = {
+                "mean": hist.mean,
+                "p50": hist.percentile(50),
+                "p99": hist.percentile(99),
+                "max": hist.max,
+            }
+        return result
+
+    def wrap_read(self, read: Callable[[int], bytes]) -> Callable[[int], bytes]:
+        """
+        :return: a function calling `read` (e.g. Device._read) and recording
+            the result in these stats
+        """
+        perf_counter_ns = time.perf_counter_ns
+
+        def read_with_stats(length: int) -> bytes:
+            start = perf_counter_ns()
+            try:
+                data = read(length)
+            except BaseException:
+                self.read_errors += 1
+                raise
+            self.record_read(len(data), perf_counter_ns() - start)
+            return data
+
+        return read_with_stats
+
+    def wrap_readinto(self, readinto: Callable[[Any], int]) -> Callable[[Any], int]:
+        """
+        :return: a function calling `readinto` (e.g. Device._readinto) and
+            recording the result in these stats
+        """
+        perf_counter_ns = time.perf_counter_ns
+
+        def readinto_with_stats(buffer: Any) -> int:
+            start = perf_counter_ns()
+            try:
+                count = readinto(buffer)
+            except BaseException:
+                self.read_errors += 1
+                raise
+            self.record_read(count, perf_counter_ns() - start)
+            return count
+
+        return readinto_with_stats
+
+    def wrap_write(self, write: Callable[[Any], int]) -> Callable[[Any], int]:
+        """
+        :return: a function calling `write` (e.g. Device._write) and
+            recording the result in these stats
+        """
+        perf_counter_ns = time.perf_counter_ns
+
+        def write_with_stats(data: Any) -> int:
+            start = perf_counter_ns()
+            try:
+                count = write(data)
+            except BaseException:
+                self.write_errors += 1
+                raise
+            self.record_write(count, len(data), perf_counter_ns() - start)
+            return count
+
+        return write_with_stats
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(
+    device_stats: Mapping[str, DeviceStats], prefix: str = "pylibftdi"
+) -> str:
+    """
+    prometheus_text(device_stats[, prefix]) -> str
+
+    format statistics in the Prometheus text exposition format, e.g. to
+    serve from a /metrics endpoint.
+
+    :param device_stats: DeviceStats keyed by the value of the `device`
+        label to give them, e.g. {dev.device_id: dev.stats()}
+    :param prefix: prefix for the metric names
+    """
+    lines = []
+    items = [(_escape_label(name), stats) for name, stats in device_stats.items()]
+    for counter in DeviceStats.COUNTERS:
+        metric = f"{prefix}_{counter}_total"
+        lines.append(f"# HELP {metric} {counter.replace('_', ' ')}")
+        lines.append(f"# TYPE {metric} counter")
+        for label, stats in items:
+            lines.append(f'{metric}{{device="{label}"}} {getattr(stats, counter)}')
+    for direction in ("read", "write"):
+        metric = f"{prefix}_{direction}_latency_seconds"
+        lines.append(f"# HELP {metric} {direction} call latency")
+        lines.append(f"# TYPE {metric} histogram")
+        for label, stats in items:
+            hist = getattr(stats, f"{direction}_latency")
+            for bound, count in hist.cumulative(PROMETHEUS_BOUNDS):
+                lines.append(
+                    f'{metric}_bucket{{device="{label}",le="{bound / 1e6:g}"}} {count}'
+                )
+            lines.append(f'{metric}_bucket{{device="{label}",le="+Inf"}} {hist.count}')
+            lines.append(f'{metric}_sum{{device="{label}"}} {hist.total / 1e6:g}')
+            lines.append(f'{metric}_count{{device="{label}"}} {hist.count}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,81 @@
+"""
+pylibftdi.transfer - asynchronous (submitted) USB transfers
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from pylibftdi._base import FtdiError
+
+if TYPE_CHECKING:
+    from pylibftdi.device import Device
+
+
+class Transfer:
+    """
+    A USB transfer submitted with ftdi_read_data_submit() or
+    ftdi_write_data_submit(), which may still be in progress.
+
+    The memory being transferred is referenced until the transfer has
+    completed (or been cancelled), so it remains valid while libusb
+    is using it.
+
+    Normally created with Device.submit_read() / Device.submit_write().
+    """
+
+    def __init__(self, device: Device, handle: Any, buffer: Any) -> None:
+        """
+        :param device: the Device the transfer was submitted on
+        :param handle: the ftdi_transfer_control pointer
+        :param buffer: the ctypes-compatible buffer being transferred
+        """
+        self.device = device
+        self._handle = handle
+        self._buffer = buffer
+        self._result: int | None = None
+
+    @property
+    def done(self) -> bool:
+        """
+        True once wait() or cancel() has been called
+        """
+        return self._handle is None
+
+    def wait(self) -> int:
+        """
+        wait() -> number of bytes transferred
+
+        block until the transfer completes. Note that read transfers only
+        complete once the entire buffer has been filled.
+        """
+        if self._handle is not None:
+            # ftdi_transfer_data_done also frees the transfer control
+            handle, self._handle = self._handle, None
+            self._result = self.device.fdll.ftdi_transfer_data_done(handle)
+            self._buffer = None
+        assert self._result is not None
+        if self._result < 0:
+            raise FtdiError("%s (%d)" % (self.device.get_error_string(), self._result))
+        return self._result
+
+    def cancel(self) -> None:
+        """
+        cancel the transfer if it is still in progress
+        """
+        if self._handle is not None:
+            handle, self._handle = self._handle, None
+            fdll = self.device.fdll
+            if hasattr(fdll, "ftdi_transfer_data_cancel"):
+                fdll.ftdi_transfer_data_cancel(handle, None)
+                self._result = 0
+            else:
+                # libftdi < 1.2 can't cancel, so wait for it instead
+                self._result = fdll.ftdi_transfer_data_done(handle)
+            self._buffer = None
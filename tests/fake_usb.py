@@ -0,0 +1,173 @@
+"""
+pylibftdi - python wrapper for libftdi
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+Fake libftdi / libusb libraries emulating a USB bus with several
+attached devices, for testing enumeration and opening by location.
+"""
+
+import time
+from ctypes import POINTER, c_void_p, cast, pointer
+
+from pylibftdi.driver import (
+    Driver,
+    libftdi_version,
+    libusb_config_descriptor,
+)
+from tests.test_common import StubFdll
+
+
+class FakeBus:
+    """
+    attached USB devices, keyed by the (integer) libusb_device pointer
+    """
+
+    def __init__(self):
+        # dev: [bus, address, ports, serial, pid]
+        self.devices = {
+            1: [1, 4, [2], "FT000001", 0x6001],
+            2: [1, 7, [2, 3], "FT000002", 0x6010],
+            3: [2, 5, [1], "FT000003", 0x6001],
+            # not an FTDI device
+            4: [2, 1, [], "", None],
+        }
+        self.calls = []
+        self.refs = dict.fromkeys(self.devices, 0)
+        self.scans = 0
+        # hotplug events waiting to be delivered by handle_events
+        self.hotplug_events = []
+
+    def attach(self, dev, location, serial, pid=0x6001):
+        bus, address, ports = location
+        self.devices[dev] = [bus, address, ports, serial, pid]
+        self.refs.setdefault(dev, 0)
+        self.hotplug_events.append((dev, 1))
+
+    def detach(self, dev):
+        del self.devices[dev]
+        self.hotplug_events.append((dev, 2))
+
+
+class FakeLibusb:
+    def __init__(self, bus, hotplug=False):
+        self.bus = bus
+        self.hotplug = hotplug
+        self.hotplug_cb = None
+
+    def __getattr__(self, key):
+        return lambda *o: 0
+
+    def libusb_get_device_list(self, usb_ctx, list_ref):
+        self.bus.scans += 1
+        self._list = (c_void_p * len(self.bus.devices))(*self.bus.devices)
+        pointer(list_ref._obj)[0] = cast(self._list, POINTER(c_void_p))
+        return len(self._list)
+
+    def libusb_get_device(self, handle):
+        # handles are the same as devices for these tests
+        return handle
+
+    def libusb_get_bus_number(self, dev):
+        return self.bus.devices[dev][0]
+
+    def libusb_get_device_address(self, dev):
+        return self.bus.devices[dev][1]
+
+    def libusb_get_port_numbers(self, dev, ports, max_ports):
+        dev_ports = self.bus.devices[dev][2]
+        ports[: len(dev_ports)] = dev_ports
+        return len(dev_ports)
+
+    def libusb_get_device_descriptor(self, dev, desc_ref):
+        pid = self.bus.devices[dev][4]
+        desc_ref._obj.idVendor = 0x0403 if pid else 0x1D6B
+        desc_ref._obj.idProduct = pid or 0x0002
+        return 0
+
+    def libusb_get_config_descriptor(self, dev, index, config_ref):
+        self._config = libusb_config_descriptor()
+        self._config.bNumInterfaces = 2 if self.bus.devices[dev][4] == 0x6010 else 1
+        pointer(config_ref._obj)[0] = pointer(self._config)
+        return 0
+
+    def libusb_ref_device(self, dev):
+        self.bus.refs[dev] += 1
+        return dev
+
+    def libusb_unref_device(self, dev):
+        self.bus.refs[dev] -= 1
+
+    def libusb_has_capability(self, capability):
+        return self.hotplug
+
+    def libusb_hotplug_register_callback(self, usb_ctx, *args):
+        self.hotplug_cb = args[5]
+        return 0
+
+    def libusb_hotplug_deregister_callback(self, usb_ctx, handle):
+        self.hotplug_cb = None
+
+    def libusb_handle_events_timeout_completed(self, usb_ctx, tv, completed):
+        time.sleep(0.001)
+        while self.bus.hotplug_events and self.hotplug_cb is not None:
+            dev, event = self.bus.hotplug_events.pop(0)
+            self.hotplug_cb(usb_ctx, dev, event, None)
+        return 0
+
+
+class FakeFdll(StubFdll):
+    def __init__(self, bus):
+        self.bus = bus
+
+    def _open(self, ctx, dev):
+        ctx.contents.usb_dev = dev
+        return 0
+
+    def ftdi_usb_open_bus_addr(self, ctx, bus, address):
+        self.bus.calls.append("open_bus_addr")
+        for dev, info in self.bus.devices.items():
+            if info[:2] == [bus, address]:
+                return self._open(ctx, dev)
+        return -3
+
+    def ftdi_usb_open_dev(self, ctx, dev):
+        self.bus.calls.append("open_dev")
+        return self._open(ctx, dev)
+
+    def ftdi_usb_open_desc_index(self, ctx, *args):
+        _vid, _pid, _desc, serial, _index = args
+        self.bus.calls.append("open_desc_index")
+        for dev, info in self.bus.devices.items():
+            if serial is None or serial.value == info[3].encode():
+                return self._open(ctx, dev)
+        return -3
+
+    def ftdi_usb_get_strings2(self, ctx, dev, *args):
+        manuf, _mlen, desc, _dlen, serial, _slen = args
+        if manuf is not None:
+            manuf.value = b"FTDI"
+        desc.value = b"FT232R USB UART"
+        serial.value = self.bus.devices[dev][3].encode()
+        return 0
+
+    def ftdi_usb_get_strings(self, ctx, dev, *args):
+        self.bus.calls.append("get_strings")
+        return self.ftdi_usb_get_strings2(ctx, dev, *args)
+
+    def ftdi_usb_close(self, ctx):
+        ctx.contents.usb_dev = None
+        return 0
+
+
+class FakeDriver(Driver):
+    def __init__(self, bus, hotplug=False):
+        super().__init__()
+        self._fdll = FakeFdll(bus)
+        self._libusb_dll = FakeLibusb(bus, hotplug)
+
+    def libftdi_version(self):
+        return libftdi_version(1, 5, 0, "1.5", "")
@@ -0,0 +1,114 @@
+"""
+pylibftdi - python wrapper for libftdi
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+This module contains tests for the asyncio device wrappers.
+"""
+
+import asyncio
+import unittest
+
+from pylibftdi import FtdiError
+from pylibftdi.async_device import AsyncBitBangDevice, AsyncDevice, AsyncSerialDevice
+from tests.test_bitbang import LoopBitBangDevice
+from tests.test_common import LoopDevice
+from tests.test_serial import LoopSerialDevice
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=10))
+
+
+class AsyncDeviceTest(unittest.TestCase):
+    def testReadWrite(self):
+        async def _():
+            async with AsyncDevice(device=LoopDevice()) as dev:
+                dev.write(b"Hello\nWorld")
+                await dev.drain()
+                self.assertEqual(await dev.readline(), b"Hello\n")
+                self.assertEqual(await dev.readexactly(3), b"Wor")
+                dev.writelines([b"--", b"!"])
+                await dev.drain()
+                self.assertEqual(await dev.readuntil(b"!"), b"ld--!")
+            self.assertTrue(dev.device.closed)
+
+        run(_())
+
+    def testManyCoroutines(self):
+        async def echo(dev, idx):
+            msg = b"%03d" % idx
+            await dev.call(dev.device.write, msg)
+
+        async def _():
+            async with AsyncDevice(device=LoopDevice()) as dev:
+                await asyncio.gather(*(echo(dev, idx) for idx in range(100)))
+                data = await dev.readexactly(300)
+            self.assertEqual(
+                sorted(data[i : i + 3] for i in range(0, 300, 3)),
+                [b"%03d" % idx for idx in range(100)],
+            )
+
+        run(_())
+
+    def testLazyOpen(self):
+        async def _():
+            dev = AsyncDevice(device=LoopDevice(lazy_open=True))
+            self.assertTrue(dev.device.closed)
+            await dev.open()
+            self.assertFalse(dev.device.closed)
+            await dev.close()
+            self.assertTrue(dev.device.closed)
+
+        run(_())
+
+    def testWriteError(self):
+        async def _():
+            async with AsyncDevice(device=LoopDevice()) as dev:
+                dev.device.close()
+                dev.write(b"x")
+                with self.assertRaises(FtdiError):
+                    await dev.drain()
+
+        run(_())
+
+    def testDeviceArgs(self):
+        self.assertRaises(TypeError, AsyncDevice, "serial", device=LoopDevice())
+
+
+class AsyncBitBangTest(unittest.TestCase):
+    def testPort(self):
+        class LoopAsyncBitBangDevice(AsyncBitBangDevice):
+            device_class = LoopBitBangDevice
+
+        async def _():
+            async with LoopAsyncBitBangDevice(direction=0xFF) as bb:
+                await bb.set_port(0x55)
+                self.assertEqual(await bb.get_port(), 0x55)
+                await bb.set_direction(0x0F)
+                self.assertEqual(bb.device.direction, 0x0F)
+
+        run(_())
+
+
+class AsyncSerialTest(unittest.TestCase):
+    def testModemLines(self):
+        class LoopAsyncSerialDevice(AsyncSerialDevice):
+            device_class = LoopSerialDevice
+
+        async def _():
+            async with LoopAsyncSerialDevice() as sd:
+                await sd.set_dtr(1)
+                await sd.set_rts(0)
+                self.assertEqual((sd.device.dtr, sd.device.rts), (1, 0))
+                self.assertEqual(await sd.modem_status(), 0)
+                self.assertEqual(await sd.cts(), 0)
+
+        run(_())
+
+
+if __name__ == "__main__":
+    unittest.main()
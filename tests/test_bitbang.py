@@ -35,7 +35,7 @@ class BitBangFunctions(CallCheckMixin, unittest.TestCase):
         self.assertCallsExact(
             _,
             [
-                "ftdi_init",
+                "ftdi_new",
                 "ftdi_usb_open_desc_index",
                 "ftdi_set_bitmode",
                 "ftdi_setflowctrl",
@@ -43,7 +43,7 @@ class BitBangFunctions(CallCheckMixin, unittest.TestCase):
                 "ftdi_set_latency_timer",
                 "ftdi_set_bitmode",
                 "ftdi_usb_close",
-                "ftdi_deinit",
+                "ftdi_free",
             ],
         )
 
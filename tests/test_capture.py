@@ -0,0 +1,94 @@
+"""
+pylibftdi - python wrapper for libftdi
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+This module contains tests for background capture and its ring buffer.
+"""
+
+import unittest
+
+from pylibftdi import FtdiError
+from pylibftdi.capture import RingBuffer
+from tests.test_common import LoopDevice
+
+
+class RingBufferTest(unittest.TestCase):
+    def testReadWrite(self):
+        ring = RingBuffer(8)
+        self.assertEqual(ring.write(b"abcde"), 5)
+        self.assertEqual(len(ring), 5)
+        self.assertEqual(ring.read(3), b"abc")
+        # this wraps around the end of the buffer
+        self.assertEqual(ring.write(b"fghij"), 5)
+        self.assertEqual(ring.read(100), b"defghij")
+        self.assertEqual(len(ring), 0)
+        self.assertEqual(ring.overruns, 0)
+
+    def testOverrun(self):
+        ring = RingBuffer(4)
+        self.assertEqual(ring.write(b"abcdef"), 4)
+        self.assertEqual(ring.overruns, 2)
+        buf = bytearray(6)
+        self.assertEqual(ring.readinto(buf), 4)
+        self.assertEqual(buf, b"abcd\x00\x00")
+
+    def testInvalidSize(self):
+        self.assertRaises(ValueError, RingBuffer, 0)
+
+
+class CaptureTest(unittest.TestCase):
+    def testCapture(self):
+        dev = LoopDevice(chunk_size=16)
+        payload = bytes(range(256)) * 4
+        dev.write(payload)
+        capture = dev.start_capture(ring_size=4096)
+        self.assertEqual(capture.read_size, 16)
+        received = bytearray()
+        while len(received) < len(payload):
+            data = capture.read(100, timeout=5)
+            self.assertTrue(data, "timed out waiting for capture data")
+            received += data
+        dev.stop_capture()
+        self.assertFalse(capture.running)
+        self.assertEqual(received, payload)
+        self.assertEqual(capture.overruns, 0)
+
+    def testCaptureOverrun(self):
+        dev = LoopDevice()
+        dev.write(b"x" * 100)
+        with dev.start_capture(ring_size=64) as capture:
+            while capture.available < 64:
+                capture.read(0, timeout=5)
+        self.assertEqual(capture.overruns, 36)
+        # captured data remains readable after stopping
+        self.assertEqual(capture.read(100), b"x" * 64)
+
+    def testDeviceReadDuringCapture(self):
+        dev = LoopDevice()
+        dev.start_capture()
+        self.assertRaises(FtdiError, dev.read, 1)
+        self.assertRaises(FtdiError, dev.start_capture)
+        # closing the device stops the capture
+        dev.close()
+        self.assertIsNone(dev._capture)
+
+    def testCaptureError(self):
+        dev = LoopDevice()
+
+        def broken_read(size):
+            raise FtdiError("device went away")
+
+        dev._read = broken_read
+        capture = dev.start_capture()
+        with self.assertRaises(FtdiError):
+            capture.read(10, timeout=5)
+        self.assertIsInstance(capture.error, FtdiError)
+        dev.stop_capture()
+
+
+if __name__ == "__main__":
+    unittest.main()
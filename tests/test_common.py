@@ -14,6 +14,7 @@ to be attached.
 import gc
 import logging
 import sys
+from ctypes import pointer
 
 from tests.call_log import CallLog
 
@@ -34,6 +35,9 @@ class SimpleMock:
     def __call__(self, *o, **k):
         CallLog.append(self.__name)
         logging.debug(f"{self.__name}(*{o}, **{k})")
+        if self.__name == "ftdi_new":
+            # callers need a non-NULL context pointer
+            return pointer(pylibftdi.driver.ftdi_context())
         return 0
 
 
@@ -77,6 +81,33 @@ class MockDriver:
         return pylibftdi.driver.libftdi_version(1, 2, 3, 0, 0)
 
 
+class StubFdll:
+    """
+    base for fake fdll objects, which implement just the libftdi
+    functions a test needs; any other function succeeds, returning 0.
+    """
+
+    def __getattr__(self, key):
+        return lambda *o: 0
+
+    def ftdi_new(self):
+        return pointer(pylibftdi.driver.ftdi_context())
+
+
+class StubDriver:
+    """
+    a driver for the given StubFdll instance
+    """
+
+    version = pylibftdi.driver.libftdi_version(1, 5, 0, "1.5", "")
+
+    def __init__(self, fdll):
+        self.fdll = fdll
+
+    def libftdi_version(self):
+        return self.version
+
+
 # importing this _does_ things...
 pylibftdi.device.Driver = MockDriver  # type: ignore
 
@@ -99,6 +130,11 @@ class LoopDevice(Device):
         self.__buffer = self.__buffer[size:]
         return result
 
+    def _readinto(self, buffer):
+        data = self._read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
     def _write(self, data):
         super()._write(data)  # discard result
         self.__buffer.extend(bytearray(data))
@@ -11,11 +11,16 @@ functionality without requiring an actual hardware device
 to be attached.
 """
 
+import array
+import io
+import time
 import unittest
+from ctypes import Array, addressof, c_char_p, c_void_p, cast
 
-from pylibftdi import FtdiError
-from pylibftdi.device import Device
-from tests.test_common import CallCheckMixin, LoopDevice
+from pylibftdi import FtdiError, FtdiTimeoutError
+from pylibftdi.device import HIGH_SPEED_CHUNKSIZES, Device, DeviceIO
+from pylibftdi.driver import TYPE_232H, TYPE_R
+from tests.test_common import CallCheckMixin, LoopDevice, StubDriver, StubFdll
 
 # and now some test cases...
 
@@ -29,14 +34,14 @@ class DeviceFunctions(CallCheckMixin, unittest.TestCase):
         self.assertCallsExact(
             _,
             [
-                "ftdi_init",
+                "ftdi_new",
                 "ftdi_usb_open_desc_index",
                 "ftdi_set_bitmode",
                 "ftdi_setflowctrl",
                 "ftdi_set_baudrate",
                 "ftdi_set_latency_timer",
                 "ftdi_usb_close",
-                "ftdi_deinit",
+                "ftdi_free",
             ],
         )
 
@@ -59,6 +64,75 @@ class DeviceFunctions(CallCheckMixin, unittest.TestCase):
         with Device() as dev:
             self.assertCalls(lambda: dev.write("xxx"), "ftdi_write_data")
             self.assertCalls(lambda: dev.read(10), "ftdi_read_data")
+            self.assertCalls(lambda: dev.write(bytearray(b"xxx")), "ftdi_write_data")
+            self.assertCalls(lambda: dev.readinto(bytearray(10)), "ftdi_read_data")
+            # readinto() needs a writable buffer
+            self.assertRaises(TypeError, dev.readinto, b"read-only")
+
+    def testFtdiFnCached(self):
+        dev = Device()
+        fn = dev.ftdi_fn
+        self.assertIs(dev.ftdi_fn, fn)
+        self.assertIs(fn.ftdi_set_latency_timer, fn.ftdi_set_latency_timer)
+        self.assertCalls(
+            lambda: dev.ftdi_fn.ftdi_set_latency_timer(1), "ftdi_set_latency_timer"
+        )
+        # a new context is created on re-open, so the forwarder is replaced
+        dev.close()
+        dev.open()
+        self.assertIsNot(dev.ftdi_fn, fn)
+
+    def testChunksize(self):
+        dev = Device(lazy_open=True, read_chunksize=8192)
+        self.assertEqual(dev.read_chunksize, 8192)
+        self.assertIsNone(dev.write_chunksize)
+        self.assertCalls(dev.open, "ftdi_read_data_set_chunksize")
+        self.assertCalls(lambda: dev.write_chunksize, "ftdi_write_data_get_chunksize")
+        self.assertCalls(
+            lambda: setattr(dev, "write_chunksize", 512),
+            "ftdi_write_data_set_chunksize",
+        )
+        # set values are retained across close / open
+        dev.close()
+        self.assertEqual(dev.write_chunksize, 512)
+        self.assertNotCalls(Device, "ftdi_read_data_set_chunksize")
+
+    def testLatencyTimer(self):
+        dev = Device(lazy_open=True, latency_timer=2)
+        self.assertEqual(dev.latency_timer, 2)
+        self.assertRaises(ValueError, setattr, dev, "latency_timer", 0)
+        self.assertRaises(ValueError, Device, latency_timer=256)
+        self.assertCalls(dev.open, "ftdi_set_latency_timer")
+        self.assertCalls(lambda: dev.latency_timer, "ftdi_get_latency_timer")
+        self.assertCalls(
+            lambda: setattr(dev, "latency_timer", 1), "ftdi_set_latency_timer"
+        )
+        dev.close()
+        self.assertEqual(dev.latency_timer, 1)
+
+    def testAdaptiveLatency(self):
+        dev = LoopDevice(adaptive_latency=True)
+        self.assertEqual(dev._latency_timer, 16)
+        # small writes are treated as interactive traffic
+        self.assertCalls(lambda: dev.write(b"?"), "ftdi_set_latency_timer")
+        self.assertEqual(dev._latency_timer, 1)
+        self.assertNotCalls(lambda: dev.write(b"?"), "ftdi_set_latency_timer")
+        # large reads are treated as bulk traffic
+        dev.write(bytes(8192))
+        self.assertEqual(dev._latency_timer, 1)
+        self.assertCalls(lambda: dev.read(8192), "ftdi_set_latency_timer")
+        self.assertEqual(dev._latency_timer, 16)
+        # ...but not without adaptive_latency
+        dev.adaptive_latency = False
+        self.assertNotCalls(lambda: dev.write(b"?"), "ftdi_set_latency_timer")
+
+    def testAdaptiveLatencyExplicit(self):
+        # an explicit latency_timer isn't overridden by bulk_latency on open
+        dev = LoopDevice(latency_timer=5, adaptive_latency=True)
+        self.assertEqual(dev._latency_timer, 5)
+        dev.close()
+        dev.open()
+        self.assertEqual(dev._latency_timer, 5)
 
     def testFlush(self):
         with Device() as dev:
@@ -73,6 +147,9 @@ class DeviceFunctions(CallCheckMixin, unittest.TestCase):
         d = Device()
         d.close()
         self.assertRaises(FtdiError, d.read, 1)
+        d = Device()
+        d.close()
+        self.assertRaises(FtdiError, d.readinto, bytearray(1))
 
 
 class LoopbackTest(unittest.TestCase):
@@ -123,25 +200,344 @@ class LoopbackTest(unittest.TestCase):
         self.assertEqual(d.readline(), "Hello World\n")
         self.assertEqual(d.readline(), "Bye")
 
+    def testReadInto(self):
+        d = LoopDevice()
+        d.write(b"Hello World")
+        buf = bytearray(5)
+        self.assertEqual(d.readinto(buf), 5)
+        self.assertEqual(buf, b"Hello")
+        # a memoryview slice is filled in-place
+        buf = bytearray(10)
+        self.assertEqual(d.readinto(memoryview(buf)[2:]), 6)
+        self.assertEqual(buf, b"\x00\x00 World\x00\x00")
+
+    def testReadIntoChunked(self):
+        d = LoopDevice(chunk_size=3)
+        d.write(b"\x01\x00\x02\x00\x03\x00")
+        # any writable buffer-protocol object can be read into
+        buf = array.array("H", [0, 0, 0, 0])
+        self.assertEqual(d.readinto(buf), 6)
+        self.assertEqual(buf.tobytes(), b"\x01\x00\x02\x00\x03\x00\x00\x00")
+
+    def testReadChunked(self):
+        d = LoopDevice(chunk_size=3)
+        d.write(b"Hello World")
+        self.assertEqual(d.read(8), b"Hello Wo")
+        self.assertEqual(d.read(8), b"rld")
+        self.assertEqual(d.read(8), b"")
+
+    def testWriteBuffers(self):
+        d = LoopDevice()
+        self.assertEqual(d.write(bytearray(b"Hello")), 5)
+        self.assertEqual(d.write(memoryview(b"xx World")[2:]), 6)
+        self.assertEqual(d.write(array.array("B", b"!!")), 2)
+        self.assertEqual(d.read(20), b"Hello World!!")
+
+    def testWriteBuffersChunked(self):
+        d = LoopDevice(chunk_size=3)
+        data = array.array("H", range(10))
+        self.assertEqual(d.write(data), 20)
+        self.assertEqual(d.write(b"Hello"), 5)
+        self.assertEqual(d.read(30), data.tobytes() + b"Hello")
+
+    def testWriteBytesChunkedNoCopy(self):
+        chunks = []
+
+        class ChunkDevice(LoopDevice):
+            def _write(self, data):
+                chunks.append(addressof(data) if isinstance(data, Array) else None)
+                return super()._write(data)
+
+        d = ChunkDevice(chunk_size=4)
+        data = b"Hello World"
+        self.assertEqual(d.write(data), 11)
+        self.assertEqual(d.read(20), data)
+        # each chunk refers to the memory of `data`, rather than a copy
+        base = cast(c_char_p(data), c_void_p).value
+        self.assertEqual(chunks, [base, base + 4, base + 8])
+
     def testReadLineBytes(self):
         """
-        Device.readline() when in byte mode should raise a TypeError.
-        This method should only be used in text mode.
+        Device.readline() in byte mode returns bytes
         """
         d = LoopDevice(mode="b")
-        d.write(b"Hello\n")
-        with self.assertRaises(TypeError):
-            d.readline()
+        d.write(b"Hello\nWorld")
+        self.assertEqual(d.readline(), b"Hello\n")
+        self.assertEqual(d.readline(), b"World")
+        self.assertEqual(d.readline(), b"")
 
     def testReadLinesBytes(self):
         """
-        Device.readlines() when in byte mode should raise a TypeError.
-        This method should only be used in text mode.
+        Device.readlines() in byte mode returns a list of bytes
         """
         d = LoopDevice(mode="b")
-        d.write(b"Hello\n")
-        with self.assertRaises(TypeError):
-            d.readlines()
+        d.write(b"Hello\nWorld\n")
+        self.assertEqual(d.readlines(), [b"Hello\n", b"World\n"])
+
+    def testReadLinesSizeHint(self):
+        d = LoopDevice(mode="t")
+        d.write("one\ntwo\nthree\n")
+        self.assertEqual(d.readlines(5), ["one\n", "two\n"])
+        self.assertEqual(d.readlines(), ["three\n"])
+
+    def testReadLineSize(self):
+        d = LoopDevice(mode="t")
+        d.write("Hello World\n")
+        self.assertEqual(d.readline(5), "Hello")
+        self.assertEqual(d.readline(), " World\n")
+
+    def testReadUntil(self):
+        d = LoopDevice()
+        d.write(b"abc\r\ndef\r\nghi")
+        self.assertEqual(d.read_until(b"\r\n"), b"abc\r\n")
+        self.assertEqual(d.read_until("\r\n", max_size=2), b"de")
+        self.assertEqual(d.read_until(b"\r\n"), b"f\r\n")
+        self.assertEqual(d.read_until(b"\r\n"), b"ghi")
+        self.assertRaises(ValueError, d.read_until, b"")
+
+    def testDelimiter(self):
+        d = LoopDevice(mode="t", delimiter=";")
+        d.write("a;b;c")
+        self.assertEqual(list(d), ["a;", "b;", "c"])
+
+    def testReadAfterReadLine(self):
+        d = LoopDevice()
+        d.write(b"line\nrest of data")
+        self.assertEqual(d.readline(), b"line\n")
+        # data buffered by readline() is returned by subsequent reads
+        self.assertEqual(d.read(4), b"rest")
+        buf = bytearray(3)
+        self.assertEqual(d.readinto(buf), 3)
+        self.assertEqual(buf, b" of")
+        self.assertEqual(d.read(10), b" data")
+
+    def testFlushInputDiscardsBuffered(self):
+        d = LoopDevice()
+        d.write(b"line\nrest")
+        d.readline()
+        d.flush_input()
+        self.assertEqual(d.read(10), b"")
+
+
+class MakeFileTest(unittest.TestCase):
+    def testBinary(self):
+        d = LoopDevice()
+        f = d.makefile("rwb")
+        self.assertIsInstance(f, io.BufferedRWPair)
+        f.write(b"Hello\nWorld\n")
+        f.flush()
+        self.assertEqual(f.readline(), b"Hello\n")
+        self.assertEqual(f.read(), b"World\n")
+
+    def testText(self):
+        d = LoopDevice()
+        f = d.makefile("rw", newline=None)
+        self.assertIsInstance(f, io.TextIOWrapper)
+        self.assertEqual(f.encoding, "latin1")
+        f.write("caf\xe9\r\nbar\n")
+        f.flush()
+        # universal newlines translates the \r\n
+        self.assertEqual(f.readlines(), ["caf\xe9\n", "bar\n"])
+
+    def testUnbuffered(self):
+        d = LoopDevice()
+        raw = d.makefile("wb", buffering=0)
+        self.assertIsInstance(raw, DeviceIO)
+        self.assertFalse(raw.readable())
+        self.assertEqual(raw.write(b"abc"), 3)
+        self.assertRaises(io.UnsupportedOperation, raw.read, 1)
+        self.assertEqual(d.read(3), b"abc")
+        self.assertRaises(ValueError, d.makefile, "w", buffering=0)
+        self.assertRaises(ValueError, d.makefile, "rwx")
+
+    def testCloseLeavesDeviceOpen(self):
+        d = LoopDevice()
+        with d.makefile("rb") as f:
+            self.assertTrue(f.readable())
+        self.assertFalse(d.closed)
+
+
+class TrickleDevice(LoopDevice):
+    """
+    a LoopDevice which returns one queued chunk of data per read,
+    simulating data arriving over time
+    """
+
+    def __init__(self, *o, **k):
+        super().__init__(*o, **k)
+        self.chunks = []
+        self.polls = 0
+        # keep the backoff short so the tests are quick
+        self._latency_timer = 2
+
+    def _read(self, size):
+        self.polls += 1
+        if self.chunks:
+            self.write(self.chunks.pop(0))
+        return super()._read(size)
+
+
+class ReadPolicyTest(unittest.TestCase):
+    def testDefaultNoWait(self):
+        d = TrickleDevice()
+        d.chunks = [b"", b"abc"]
+        self.assertEqual(d.read(10), b"")
+        self.assertEqual(d.polls, 1)
+
+    def testReadMin(self):
+        d = TrickleDevice(read_min=4)
+        d.chunks = [b"", b"ab", b"", b"cd", b"ef"]
+        self.assertEqual(d.read(10), b"abcd")
+        self.assertEqual(d.polls, 4)
+        # read_min is bounded by the requested length
+        self.assertEqual(d.read(1), b"e")
+
+    def testReadTimeout(self):
+        d = TrickleDevice(read_timeout=0.05)
+        start = time.monotonic()
+        self.assertEqual(d.read(10), b"")
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        # polls back off rather than spinning
+        self.assertLess(d.polls, 40)
+
+    def testInterbyteTimeout(self):
+        d = TrickleDevice(read_min=10, read_interbyte_timeout=0.02)
+        d.chunks = [b"a", b"", b"b"]
+        self.assertEqual(d.read(10), b"ab")
+
+    def testReadInto(self):
+        d = TrickleDevice(read_min=3)
+        d.chunks = [b"", b"a", b"bc"]
+        buf = bytearray(5)
+        self.assertEqual(d.readinto(buf), 3)
+        self.assertEqual(buf, b"abc\x00\x00")
+
+    def testReadLineTimeout(self):
+        d = TrickleDevice(read_timeout=0.5)
+        d.chunks = [b"par", b"", b"tial\nrest"]
+        self.assertEqual(d.readline(), b"partial\n")
+        d.read_timeout = 0.01
+        self.assertEqual(d.readline(), b"rest")
+
+    def testReadExactly(self):
+        d = TrickleDevice()
+        d.chunks = [b"ab", b"", b"cdef"]
+        self.assertEqual(d.read_exactly(4), b"abcd")
+        self.assertEqual(d.read(10), b"ef")
+
+    def testReadExactlyTimeout(self):
+        d = TrickleDevice()
+        d.chunks = [b"ab"]
+        self.assertRaises(FtdiTimeoutError, d.read_exactly, 4, 0.01)
+        # partial data is retained
+        self.assertEqual(d.read(10), b"ab")
+
+
+class ChunksizeFdll(StubFdll):
+    """
+    fdll retaining the chunk sizes set on it
+    """
+
+    def __init__(self):
+        self.chunksize = {"read": 0, "write": 0}
+
+    def ftdi_read_data_set_chunksize(self, ctx, size):
+        self.chunksize["read"] = size
+        return 0
+
+    def ftdi_read_data_get_chunksize(self, ctx, size_ref):
+        size_ref._obj.value = self.chunksize["read"]
+        return 0
+
+    def ftdi_write_data_set_chunksize(self, ctx, size):
+        self.chunksize["write"] = size
+        return 0
+
+    def ftdi_write_data_get_chunksize(self, ctx, size_ref):
+        size_ref._obj.value = self.chunksize["write"]
+        return 0
+
+
+class TuneChunksizeTest(unittest.TestCase):
+    class TuneDevice(Device):
+        # fake throughput for each chunk size, peaking at 4096
+        def _loopback_rate(self, peer, data):
+            read_size, write_size = self.read_chunksize, peer.write_chunksize
+            self.tried.append((read_size, write_size, len(data)))
+            return 1e6 - abs(read_size - 4096) - abs(write_size - 4096)
+
+    def setUp(self):
+        self.dev = self.TuneDevice(driver=StubDriver(ChunksizeFdll()))
+        self.dev.tried = []
+        self.dev.baudrate = 3000000
+
+    def testTune(self):
+        d = self.dev
+        peer = Device(driver=StubDriver(ChunksizeFdll()))
+        self.assertEqual(d.tune_chunksize(peer, [512, 4096, 16384]), 4096)
+        # each candidate is applied to both devices and measured
+        self.assertEqual(
+            d.tried, [(size, size, 1 << 18) for size in (512, 4096, 16384)]
+        )
+        # ...and the fastest kept
+        self.assertEqual(d.fdll.chunksize["read"], 4096)
+        self.assertEqual(peer.fdll.chunksize["write"], 4096)
+        self.assertEqual(d.read_chunksize, 4096)
+        self.assertEqual(peer.write_chunksize, 4096)
+        self.assertRaises(ValueError, d.tune_chunksize, candidates=[])
+
+    def testTestSize(self):
+        d = self.dev
+        d.baudrate = 115200
+        d.tune_chunksize(candidates=[256, 4096])
+        self.assertEqual([tried[2] for tried in d.tried], [11520, 11520])
+        # too slow to be worth tuning, unless a test_size is given
+        d.baudrate = 9600
+        self.assertRaises(ValueError, d.tune_chunksize)
+        self.assertEqual(d.tune_chunksize(test_size=100), 4096)
+        self.assertEqual(d.tried[-1][2], 100)
+
+    def testCandidatesByChipType(self):
+        d = self.dev
+        d.ctx.contents.type = TYPE_232H
+        self.assertTrue(d.high_speed)
+        self.assertEqual(d.tune_chunksize(), 4096)
+        self.assertEqual([tried[0] for tried in d.tried], list(HIGH_SPEED_CHUNKSIZES))
+        d.ctx.contents.type = TYPE_R
+        self.assertFalse(d.high_speed)
+
+    def testLoopbackRate(self):
+        d = LoopDevice()
+        data = bytes(range(256)) * 4
+        self.assertGreater(d._loopback_rate(d, data), 0)
+        self.assertEqual(d.read(10), b"")
+
+    def testLoopbackRateWriteErrors(self):
+        class FailingDevice(LoopDevice):
+            def write(self, data):
+                raise FtdiError("write failed")
+
+        class ShortWriteDevice(LoopDevice):
+            def write(self, data):
+                super().write(data)
+                return 0
+
+        data = bytes(range(256)) * 4
+        d = FailingDevice()
+        self.assertRaises(FtdiError, d._loopback_rate, d, data, 0.01)
+        # only bytes reported as written count towards the rate
+        d = ShortWriteDevice()
+        self.assertEqual(d._loopback_rate(d, data, 0.01), 0.0)
+
+
+class ReadLineCalls(CallCheckMixin, unittest.TestCase):
+    def testReadLineBlockRead(self):
+        """
+        readline() should read from the device in blocks, not per-byte
+        """
+        d = LoopDevice()
+        d.write(b"x" * 100 + b"\n")
+        self.assertCallsExact(d.readline, ["ftdi_read_data"])
 
 
 if __name__ == "__main__":
@@ -9,10 +9,14 @@ pylibftdi: https://github.com/codedstructure/pylibftdi
 This module contains some basic tests for Driver class.
 """
 
+import threading
+import time
 import unittest
+from types import SimpleNamespace
 
 from pylibftdi import LibraryMissingError
-from pylibftdi.driver import Driver
+from pylibftdi.driver import FTDI_PROTOTYPES, Driver
+from tests.fake_usb import FakeBus, FakeDriver
 
 
 class DriverTest(unittest.TestCase):
@@ -30,6 +34,13 @@ class DriverTest(unittest.TestCase):
             "libftdi": ["ftdi1", "libftdi1", "ftdi", "libftdi"],
             "libusb": ["usb-1.0", "libusb-1.0"],
         }
+        Driver._libraries = {}
+        Driver._libftdi_versions = {}
+
+    def tearDown(self):
+        # don't leave fake libraries in the process-wide cache
+        Driver._libraries = {}
+        Driver._libftdi_versions = {}
 
     def testNoneLibrary(self):
         """
@@ -107,6 +118,109 @@ class DriverTest(unittest.TestCase):
         except LibraryMissingError:
             self.fail("LibraryMissingError raised for default library names.")
 
+    def testPrototypes(self):
+        """
+        Functions present in the loaded library have their restype and
+        argtypes set from FTDI_PROTOTYPES; absent functions are skipped.
+        """
+        fake_lib = SimpleNamespace(
+            ftdi_new=SimpleNamespace(),
+            ftdi_read_data=SimpleNamespace(),
+        )
+        driver = Driver()
+        driver._load_library = lambda name: fake_lib  # type: ignore
+        fdll = driver.fdll
+        self.assertIs(fdll, fake_lib)
+        for name in ("ftdi_new", "ftdi_read_data"):
+            restype, argtypes = FTDI_PROTOTYPES[name]
+            self.assertEqual(getattr(fdll, name).restype, restype)
+            self.assertEqual(getattr(fdll, name).argtypes, argtypes)
+        self.assertFalse(hasattr(fdll, "ftdi_write_data"))
+
+    def testSearchNotShared(self):
+        """
+        libftdi_search only affects the Driver it is given to.
+        """
+        Driver(libftdi_search="custom-ftdi")
+        driver = Driver()
+        self.assertListEqual(
+            driver._lib_search["libftdi"], ["ftdi1", "libftdi1", "ftdi", "libftdi"]
+        )
+
+    def testSharedLibrary(self):
+        """
+        Each library is loaded and set up once per process, however many
+        Driver instances use it, even when first used concurrently.
+        """
+        loads = []
+        lock = threading.Lock()
+
+        def load_library(name):
+            with lock:
+                loads.append(name)
+            time.sleep(0.01)
+            return SimpleNamespace(ftdi_get_library_version=get_version)
+
+        def get_version():
+            loads.append("version")
+            return SimpleNamespace(
+                major=1, minor=5, micro=0, version_str=b"1.5", snapshot_str=b""
+            )
+
+        drivers = [Driver() for _ in range(8)]
+        for driver in drivers:
+            driver._load_library = load_library  # type: ignore
+        threads = [threading.Thread(target=lambda d=d: d.fdll) for d in drivers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(loads, ["libftdi"])
+        self.assertEqual(len({id(driver.fdll) for driver in drivers}), 1)
+        for driver in drivers:
+            self.assertEqual(driver.libftdi_version().major, 1)
+        self.assertEqual(loads, ["libftdi", "version"])
+
+        # a different search list is a different library
+        custom = Driver(libftdi_search="custom-ftdi")
+        custom._load_library = load_library  # type: ignore
+        self.assertIsNot(custom.fdll, drivers[0].fdll)
+        self.assertEqual(loads, ["libftdi", "version", "libftdi"])
+
+
+class EnumerateTest(unittest.TestCase):
+    def setUp(self):
+        self.bus = FakeBus()
+        self.driver = FakeDriver(self.bus)
+
+    def testEnumerate(self):
+        devices = self.driver.enumerate_devices()
+        self.assertEqual(len(devices), 3)
+        info = devices[1]
+        self.assertEqual((info.vid, info.pid), (0x0403, 0x6010))
+        self.assertEqual((info.bus, info.address), (1, 7))
+        self.assertEqual(info.port_path, "1-2.3")
+        self.assertEqual(info.num_interfaces, 2)
+        # filtering by vid / pid
+        devices = self.driver.enumerate_devices(pid_list=[0x6001])
+        self.assertEqual([d.serial for d in devices], ["FT000001", "FT000003"])
+        self.assertEqual(self.driver.enumerate_devices(vid_list=[0x1234]), [])
+
+    def testLazyStrings(self):
+        info = self.driver.enumerate_devices()[0]
+        self.assertNotIn("get_strings", self.bus.calls)
+        self.assertEqual(info.serial, "FT000001")
+        self.assertEqual(info.manufacturer, "FTDI")
+        self.assertEqual(info.description, "FT232R USB UART")
+        # strings are fetched together, once
+        self.assertEqual(self.bus.calls, ["get_strings"])
+
+    def testDeviceReferences(self):
+        devices = self.driver.enumerate_devices()
+        self.assertEqual(self.bus.refs, {1: 1, 2: 1, 3: 1, 4: 0})
+        del devices
+        self.assertEqual(self.bus.refs, {1: 0, 2: 0, 3: 0, 4: 0})
+
 
 if __name__ == "__main__":
     unittest.main()
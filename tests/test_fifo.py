@@ -0,0 +1,90 @@
+"""
+pylibftdi - python wrapper for libftdi
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+This module contains tests for synchronous FIFO streaming.
+"""
+
+import unittest
+from ctypes import POINTER, c_ubyte, cast, create_string_buffer, pointer
+
+from pylibftdi.driver import BITMODE_SYNCFF, FTDIProgressInfo
+from pylibftdi.fifo import FifoStreamDevice
+from tests.test_common import StubDriver, StubFdll
+
+
+class StreamFdll(StubFdll):
+    """
+    fdll whose ftdi_readstream delivers `packets` to the callback,
+    followed by a progress report.
+    """
+
+    def __init__(self, packets):
+        self.packets = packets
+        self.bitmodes = []
+
+    def ftdi_set_bitmode(self, ctx, mask, mode):
+        self.bitmodes.append(mode)
+        return 0
+
+    def ftdi_readstream(self, ctx, callback, userdata, packets, transfers):
+        for packet in self.packets:
+            buf = create_string_buffer(packet, len(packet))
+            if callback(cast(buf, POINTER(c_ubyte)), len(packet), None, None):
+                return 1
+        info = FTDIProgressInfo(totalTime=1.0, totalRate=123.0)
+        info.current.totalBytes = sum(len(p) for p in self.packets)
+        return callback(None, 0, pointer(info), None)
+
+
+class FifoStreamTest(unittest.TestCase):
+    def testOpenSetsMode(self):
+        dev = FifoStreamDevice(driver=StubDriver(StreamFdll([])))
+        self.assertEqual(dev.fdll.bitmodes[-1], BITMODE_SYNCFF)
+
+    def testBatches(self):
+        packets = [bytes([n]) * 300 for n in range(10)]
+        dev = FifoStreamDevice(driver=StubDriver(StreamFdll(packets)))
+        batches = []
+        reports = []
+        result = dev.stream(
+            lambda data: batches.append(bytes(data)),
+            batch_size=1024,
+            progress=reports.append,
+        )
+        self.assertEqual([len(b) for b in batches], [1024, 1024, 952])
+        self.assertEqual(b"".join(batches), b"".join(packets))
+        self.assertEqual(len(reports), 1)
+        self.assertEqual(result, reports[0])
+        self.assertEqual(result.total_bytes, 3000)
+        self.assertEqual(result.total_rate, 123.0)
+
+    def testConsumerStops(self):
+        packets = [b"x" * 100] * 10
+        dev = FifoStreamDevice(driver=StubDriver(StreamFdll(packets)))
+        batches = []
+
+        def consume(data):
+            batches.append(bytes(data))
+            return True
+
+        dev.stream(consume, batch_size=250)
+        # nothing more is delivered once the consumer has asked to stop
+        self.assertEqual(batches, [b"x" * 250])
+
+    def testConsumerError(self):
+        dev = FifoStreamDevice(driver=StubDriver(StreamFdll([b"x" * 100])))
+
+        def consume(data):
+            raise ValueError("bad data")
+
+        with self.assertRaises(ValueError):
+            dev.stream(consume, batch_size=10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+pylibftdi - python wrapper for libftdi
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+This module contains tests for DeviceGroup.
+"""
+
+import threading
+import time
+import unittest
+
+from pylibftdi import FtdiError
+from pylibftdi.group import DeviceGroup, broadcast_write
+from tests.test_common import LoopDevice, StubDriver, StubFdll
+
+
+class SlowFdll(StubFdll):
+    """
+    fdll where opening a device takes a while, failing for the serial
+    number 'missing', and recording how many opens overlap.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.opening = 0
+        self.max_opening = 0
+        self.closed = []
+
+    def ftdi_usb_open_desc_index(self, ctx, *args):
+        # the device_id is passed as serial, then as description
+        device_id = args[3] or args[2]
+        with self.lock:
+            self.opening += 1
+            self.max_opening = max(self.max_opening, self.opening)
+        time.sleep(0.01)
+        with self.lock:
+            self.opening -= 1
+        return -3 if device_id.value == b"missing" else 0
+
+    def ftdi_usb_close(self, ctx):
+        self.closed.append(ctx)
+        return 0
+
+
+class DeviceGroupTest(unittest.TestCase):
+    def setUp(self):
+        self.driver = StubDriver(SlowFdll())
+
+    def testOpenAll(self):
+        specs = ["A", {"device_id": "B", "mode": "t"}, "missing", "C"]
+        group = DeviceGroup.open_all(specs, max_workers=4, driver=self.driver)
+        self.assertGreater(self.driver.fdll.max_opening, 1)
+        self.assertEqual(len(group), 4)
+        self.assertFalse(group.ok)
+        self.assertEqual([dev.device_id for dev in group], ["A", "B", "C"])
+        self.assertEqual(group[1].mode, "t")
+        self.assertIsNone(group[2])
+        self.assertIsInstance(group.errors[2], FtdiError)
+        self.assertRaises(FtdiError, group.check)
+        with group:
+            pass
+        self.assertEqual(len(self.driver.fdll.closed), 3)
+        self.assertTrue(all(dev.closed for dev in group))
+
+    def testConfigureFailure(self):
+        def configure(dev):
+            if dev.device_id == "B":
+                raise ValueError("bad config")
+            dev.baudrate = 115200
+
+        group = DeviceGroup.open_all(
+            ["A", "B"], configure=configure, driver=self.driver
+        )
+        self.assertEqual(group[0].baudrate, 115200)
+        self.assertIsNone(group[1])
+        self.assertIsInstance(group.errors[1], ValueError)
+        # the device which failed to configure has been closed
+        self.assertEqual(len(self.driver.fdll.closed), 1)
+        group.close()
+
+    def testEmpty(self):
+        group = DeviceGroup.open_all([])
+        self.assertTrue(group.ok)
+        group.check()
+        self.assertEqual(list(group), [])
+
+
+class BroadcastTest(unittest.TestCase):
+    def testBroadcast(self):
+        devices = [LoopDevice() for _ in range(4)]
+        result = broadcast_write(devices, b"frame")
+        self.assertTrue(result.ok)
+        self.assertEqual(result.counts, [5] * 4)
+        self.assertEqual([d.read(10) for d in devices], [b"frame"] * 4)
+        self.assertGreaterEqual(result.skew, 0)
+        self.assertGreaterEqual(result.elapsed, result.skew)
+
+    def testPerDevice(self):
+        devices = [LoopDevice() for _ in range(3)]
+        result = broadcast_write(devices, [b"a", b"bb", "ccc"])
+        self.assertEqual(result.counts, [1, 2, 3])
+        self.assertEqual(devices[2].read(10), b"ccc")
+        self.assertRaises(ValueError, broadcast_write, devices, [b"a"])
+
+    def testErrors(self):
+        devices = [LoopDevice() for _ in range(3)]
+        devices[1].close()
+        result = broadcast_write(devices, b"x")
+        self.assertFalse(result.ok)
+        self.assertEqual(result.counts, [1, None, 1])
+        self.assertIsInstance(result.errors[1], FtdiError)
+
+    def testGroup(self):
+        group = DeviceGroup.open_all(["A", "B"], device_class=LoopDevice)
+        with group:
+            self.assertEqual(group.broadcast_write(b"xy").counts, [2, 2])
+            self.assertEqual(group[1].read(2), b"xy")
+
+
+if __name__ == "__main__":
+    unittest.main()
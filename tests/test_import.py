@@ -0,0 +1,70 @@
+"""
+pylibftdi - python wrapper for libftdi
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+This module contains tests for the cost of `import pylibftdi`.
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+import pylibftdi
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src")
+
+# print the modules loaded by the statement under test
+REPORT = "; import sys; print(' '.join(sys.modules))"
+
+
+def run_imports(statement):
+    """
+    run `statement` in a fresh interpreter
+
+    :return: the set of modules loaded
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [SRC_DIR, env.get("PYTHONPATH")]))
+    proc = subprocess.run(
+        [sys.executable, "-c", statement + REPORT],
+        env=env,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return set(proc.stdout.split())
+
+
+class ImportTest(unittest.TestCase):
+    def testLazyImport(self):
+        # compare against a bare interpreter, as site setup may load
+        # some modules (e.g. typing) anyway
+        modules = run_imports("import pylibftdi") - run_imports("pass")
+        # nothing beyond the package itself is loaded until it is used
+        self.assertEqual(sorted(m for m in modules if m.startswith("pylibftdi.")), [])
+        self.assertNotIn("ctypes", modules)
+        self.assertNotIn("typing", modules)
+        self.assertNotIn("TYPE_CHECKING", dir(pylibftdi))
+
+    def testFromImport(self):
+        modules = run_imports("from pylibftdi import Device")
+        self.assertIn("pylibftdi.device", modules)
+        # bitbang etc. are only loaded if used
+        self.assertNotIn("pylibftdi.bitbang", modules)
+
+    def testAttributes(self):
+        for name in pylibftdi.__all__:
+            self.assertIsNotNone(getattr(pylibftdi, name))
+            self.assertIn(name, dir(pylibftdi))
+        self.assertIs(pylibftdi.Device, pylibftdi.device.Device)
+        self.assertIs(pylibftdi.FtdiError, pylibftdi._base.FtdiError)
+        self.assertRaises(AttributeError, getattr, pylibftdi, "NoSuchThing")
+
+
+if __name__ == "__main__":
+    unittest.main()
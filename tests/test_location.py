@@ -0,0 +1,119 @@
+"""
+pylibftdi - python wrapper for libftdi
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+This module contains tests for opening devices by USB location, and the
+persistent location cache.
+"""
+
+import os
+import tempfile
+import unittest
+
+from pylibftdi import FtdiError
+from pylibftdi.device import Device
+from pylibftdi.location_cache import LocationCache
+from tests.fake_usb import FakeBus, FakeDriver
+
+
+class OpenLocationTest(unittest.TestCase):
+    def setUp(self):
+        self.bus = FakeBus()
+        self.driver = FakeDriver(self.bus)
+
+    def testBusAddress(self):
+        dev = Device(bus=1, address=7, driver=self.driver)
+        self.assertEqual(dev.ctx.contents.usb_dev, 2)
+        self.assertEqual(self.bus.calls, ["open_bus_addr"])
+        self.assertRaises(FtdiError, Device, bus=1, address=1, driver=self.driver)
+        self.assertRaises(ValueError, Device, bus=1, driver=self.driver)
+
+    def testPortPath(self):
+        dev = Device(port_path="1-2.3", driver=self.driver)
+        self.assertEqual(dev.ctx.contents.usb_dev, 2)
+        dev = Device(port_path="2-1", driver=self.driver)
+        self.assertEqual(dev.ctx.contents.usb_dev, 3)
+        self.assertEqual(self.bus.calls, ["open_dev", "open_dev"])
+        self.assertRaises(FtdiError, Device, port_path="1-4", driver=self.driver)
+
+    def testUsbLocation(self):
+        self.assertEqual(self.driver._usb_location(2), (1, 7, "1-2.3"))
+
+
+class LocationCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "sub", "locations.json")
+        self.bus = FakeBus()
+        self.driver = FakeDriver(self.bus)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def testCache(self):
+        cache = LocationCache(self.path)
+        self.assertIsNone(cache.get("FT000001"))
+        cache.set("FT000001", 1, 4, "1-2")
+        self.assertEqual(
+            cache.get("FT000001"), {"bus": 1, "address": 4, "port_path": "1-2"}
+        )
+        cache.discard("FT000001")
+        self.assertIsNone(LocationCache(self.path).get("FT000001"))
+
+    def testCorruptCache(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as f:
+            f.write("{not json")
+        cache = LocationCache(self.path)
+        self.assertIsNone(cache.get("FT000001"))
+        cache.set("FT000001", 1, 4, "1-2")
+        self.assertIsNotNone(cache.get("FT000001"))
+
+    def testOpenCached(self):
+        def open_device():
+            return Device("FT000002", location_cache=self.path, driver=self.driver)
+
+        # first open searches, and records the location
+        open_device()
+        self.assertEqual(self.bus.calls, ["open_desc_index"])
+        self.assertEqual(LocationCache(self.path).get("FT000002")["address"], 7)
+        # subsequent opens use the cached location
+        del self.bus.calls[:]
+        dev = open_device()
+        self.assertEqual(dev.ctx.contents.usb_dev, 2)
+        self.assertEqual(self.bus.calls, ["open_bus_addr"])
+        dev.close()
+
+        # a different device at the cached location is rejected...
+        self.bus.devices[1][1], self.bus.devices[2][1] = 7, 8
+        del self.bus.calls[:]
+        dev = open_device()
+        self.assertEqual(dev.ctx.contents.usb_dev, 2)
+        self.assertEqual(self.bus.calls, ["open_bus_addr", "open_desc_index"])
+        # ...and the cache updated
+        self.assertEqual(LocationCache(self.path).get("FT000002")["address"], 8)
+
+    def testOpenCachedIds(self):
+        Device("FT000002", location_cache=self.path, driver=self.driver)
+        del self.bus.calls[:]
+        # the cached device doesn't match the pid filter, so the cache is
+        # ignored (in favour of a search, which the fake bus doesn't filter)
+        Device("FT000002", pid=0x6001, location_cache=self.path, driver=self.driver)
+        self.assertEqual(self.bus.calls, ["open_bus_addr", "open_desc_index"])
+        del self.bus.calls[:]
+        Device("FT000002", pid=0x6010, location_cache=self.path, driver=self.driver)
+        self.assertEqual(self.bus.calls, ["open_bus_addr"])
+
+    def testCacheDisabled(self):
+        Device("FT000002", driver=self.driver)
+        Device("FT000002", driver=self.driver)
+        self.assertEqual(self.bus.calls, ["open_desc_index"] * 2)
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,271 @@
+"""
+pylibftdi - python wrapper for libftdi
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+This module contains tests for DevicePool.
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+
+from pylibftdi import FtdiError
+from pylibftdi.pool import DevicePool, default_pool
+from tests.test_common import LoopDevice, MockDriver
+
+ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
+
+# a handle still held when the interpreter exits
+HELD_AT_EXIT = """
+from pylibftdi.pool import DevicePool
+from tests.test_common import LoopDevice, MockDriver
+handle = DevicePool(LoopDevice, 1, driver=MockDriver()).acquire("X")
+"""
+
+
+class GatedDevice(LoopDevice):
+    """
+    a LoopDevice where opening the device_id 'slow' waits for the
+    `opening` event and close() waits for `closing`, recording the steps
+    as (step, device_id) in `events`. Opening the device_id 'missing'
+    fails.
+    """
+
+    def __init__(self, *o, gates, **k):
+        self.opening, self.closing, self.events = gates
+        super().__init__(*o, **k)
+
+    def open(self):
+        if self.device_id == "slow":
+            self.events.append(("opening", self.device_id))
+            self.opening.wait(5)
+        if self.device_id == "missing":
+            raise FtdiError("device not found")
+        self.events.append(("open", self.device_id))
+        super().open()
+
+    def close(self):
+        if not self.closed:
+            self.events.append(("closing", self.device_id))
+            self.closing.wait(5)
+            self.events.append(("close", self.device_id))
+        super().close()
+
+
+class DevicePoolTest(unittest.TestCase):
+    def pool(self, idle_timeout=None, device_class=LoopDevice, **kwargs):
+        pool = DevicePool(device_class, idle_timeout, driver=MockDriver(), **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def gated_pool(self, idle_timeout=None):
+        """
+        :return: (pool, opening, closing, events) - a pool of GatedDevice,
+            with its (initially set) gates and the list of events
+        """
+        opening, closing = threading.Event(), threading.Event()
+        opening.set()
+        closing.set()
+        # never leave a device waiting on a gate
+        self.addCleanup(closing.set)
+        self.addCleanup(opening.set)
+        events = []
+        pool = self.pool(idle_timeout, GatedDevice, gates=(opening, closing, events))
+        return pool, opening, closing, events
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 2
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.001)
+        self.assertTrue(condition())
+
+    def testSlowOpen(self):
+        pool, opening, _closing, events = self.gated_pool()
+        opening.clear()
+        handles = []
+        thread = threading.Thread(target=lambda: handles.append(pool.acquire("slow")))
+        thread.start()
+        self.wait_for(lambda: ("opening", "slow") in events)
+        # other keys aren't held up by the open...
+        pool.acquire("A").release()
+        self.assertTrue(thread.is_alive())
+        # ...but acquirers of the same key wait for it
+        thread2 = threading.Thread(target=lambda: handles.append(pool.acquire("slow")))
+        thread2.start()
+        thread2.join(0.05)
+        self.assertTrue(thread2.is_alive())
+        opening.set()
+        thread.join()
+        thread2.join()
+        self.assertIs(handles[0].device, handles[1].device)
+        self.assertEqual(events.count(("open", "slow")), 1)
+
+    def testOpenFailure(self):
+        pool, _opening, _closing, _events = self.gated_pool()
+        self.assertRaises(FtdiError, pool.acquire, "missing")
+        self.assertEqual(len(pool), 0)
+        self.assertEqual(pool._entries, {})
+        self.assertRaises(FtdiError, pool.acquire, "missing")
+        handle = pool.acquire("A")
+        self.assertFalse(handle.closed)
+
+    def testAcquireWhileClosing(self):
+        pool, _opening, closing, events = self.gated_pool(idle_timeout=0)
+        handle = pool.acquire("A")
+        dev = handle.device
+        closing.clear()
+        release = threading.Thread(target=handle.release)
+        release.start()
+        self.wait_for(lambda: ("closing", "A") in events)
+        handles = []
+        thread = threading.Thread(target=lambda: handles.append(pool.acquire("A")))
+        thread.start()
+        # the acquire waits for the close to complete...
+        thread.join(0.05)
+        self.assertTrue(thread.is_alive())
+        closing.set()
+        release.join()
+        thread.join()
+        # ...then reopens the device
+        self.assertTrue(dev.closed)
+        self.assertIsNot(handles[0].device, dev)
+        self.assertFalse(handles[0].closed)
+        self.assertEqual(events[-2:], [("close", "A"), ("open", "A")])
+        self.assertEqual(len(pool), 1)
+
+    def testShared(self):
+        pool = self.pool()
+        h1 = pool.acquire("FT000001")
+        h2 = pool.acquire("FT000001")
+        h3 = pool.acquire("FT000001", mode="t")
+        self.assertIs(h1.device, h2.device)
+        self.assertIsNot(h1.device, h3.device)
+        self.assertEqual(len(pool), 2)
+        h1.write(b"hello")
+        self.assertEqual(h2.read(5), b"hello")
+        self.assertEqual(h3.device_id, "FT000001")
+
+    def testRelease(self):
+        pool = self.pool(idle_timeout=0)
+        h1 = pool.acquire("FT000001")
+        h2 = pool.acquire("FT000001")
+        dev = h1.device
+        h1.release()
+        self.assertRaises(FtdiError, lambda: h1.write(b"x"))
+        self.assertFalse(dev.closed)
+        # the device is closed once the last handle is released
+        h2.release()
+        h2.release()
+        self.assertTrue(dev.closed)
+        self.assertEqual(len(pool), 0)
+
+    def testIdleEviction(self):
+        pool = self.pool(idle_timeout=0.05)
+        handle = pool.acquire("FT000001")
+        dev = handle.device
+        handle.release()
+        # re-acquiring an idle device reuses it
+        handle = pool.acquire("FT000001")
+        self.assertIs(handle.device, dev)
+        handle.release()
+        self.assertEqual(pool.evict_idle(), 0)
+        deadline = time.monotonic() + 2
+        while not dev.closed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(dev.closed)
+        self.assertEqual(len(pool), 0)
+
+    def testSerialised(self):
+        pool = self.pool()
+        h1 = pool.acquire("FT000001")
+        h2 = pool.acquire("FT000001")
+        done = threading.Event()
+
+        def other():
+            h2.write(b"2")
+            done.set()
+
+        with h1 as dev:
+            thread = threading.Thread(target=other)
+            thread.start()
+            # the other handle's write waits for the lock
+            self.assertFalse(done.wait(0.05))
+            dev.write(b"1")
+        thread.join()
+        self.assertEqual(h1.read(2), b"12")
+
+    def testAttributes(self):
+        pool = self.pool()
+        h1 = pool.acquire("FT000001")
+        h2 = pool.acquire("FT000001")
+        h1.baudrate = 115200
+        self.assertEqual(h1.device.baudrate, 115200)
+        self.assertEqual(h2.baudrate, 115200)
+        self.assertNotIn("baudrate", vars(h1))
+        self.assertRaises(AttributeError, setattr, h1, "released", True)
+
+    def testAttributesSerialised(self):
+        pool = self.pool()
+        h1 = pool.acquire("FT000001")
+        h2 = pool.acquire("FT000001")
+        results = []
+
+        def other():
+            results.append(h2.baudrate)
+            h2.baudrate = 19200
+
+        with h1 as dev:
+            thread = threading.Thread(target=other)
+            thread.start()
+            # property access through the other handle waits for the lock
+            thread.join(0.05)
+            self.assertTrue(thread.is_alive())
+            dev.baudrate = 38400
+        thread.join()
+        self.assertEqual(results, [38400])
+        self.assertEqual(h1.baudrate, 19200)
+
+    def testUse(self):
+        pool = self.pool(idle_timeout=0)
+        with pool.use("FT000001") as dev:
+            self.assertFalse(dev.closed)
+        self.assertTrue(dev.closed)
+
+    def testClose(self):
+        pool = self.pool()
+        handle = pool.acquire("FT000001")
+        dev = handle.device
+        pool.close()
+        self.assertTrue(dev.closed)
+        handle.release()
+
+    def testHeldAtExit(self):
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            filter(
+                None, [os.path.join(ROOT_DIR, "src"), ROOT_DIR, env.get("PYTHONPATH")]
+            )
+        )
+        proc = subprocess.run(
+            [sys.executable, "-c", HELD_AT_EXIT],
+            cwd=ROOT_DIR,
+            env=env,
+            capture_output=True,
+            timeout=30,
+            check=False,
+        )
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+
+    def testDefaultPool(self):
+        self.assertIs(default_pool(), default_pool())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+pylibftdi - python wrapper for libftdi
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+This module contains tests for profiling libftdi calls.
+"""
+
+import os
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from pylibftdi.driver import Driver
+from pylibftdi.profiler import (
+    PROFILE_ENV_VAR,
+    ProfiledLibrary,
+    Profiler,
+    default_profiler,
+    profile,
+)
+from tests.test_common import LoopDevice
+
+
+def fake_lib():
+    return SimpleNamespace(
+        ftdi_fast=lambda *args: 0,
+        ftdi_slow=lambda *args: time.sleep(0.002) or 1,
+        ftdi_version=3,
+    )
+
+
+class ProfilerTest(unittest.TestCase):
+    def testProfiledLibrary(self):
+        profiler = Profiler()
+        lib = ProfiledLibrary(fake_lib(), profiler)
+        for _ in range(3):
+            self.assertEqual(lib.ftdi_fast(1, 2), 0)
+        self.assertEqual(lib.ftdi_slow(), 1)
+        self.assertEqual(lib.ftdi_version, 3)
+        self.assertFalse(hasattr(lib, "ftdi_missing"))
+        fast, slow = profiler.functions["ftdi_fast"], profiler.functions["ftdi_slow"]
+        self.assertEqual((fast.calls, slow.calls), (3, 1))
+        self.assertGreaterEqual(slow.total_ns, 2000000)
+        # the report is sorted by total time
+        self.assertEqual(
+            [func.name for func in profiler.sorted()], ["ftdi_slow", "ftdi_fast"]
+        )
+        report = profiler.report().splitlines()
+        self.assertTrue(report[1].startswith("ftdi_slow"))
+        self.assertTrue(report[-1].startswith("total"))
+        self.assertEqual(len(profiler.report(limit=1).splitlines()), 3)
+        profiler.reset()
+        self.assertEqual(profiler.functions, {})
+
+    def testDriverProfile(self):
+        profiler = Profiler()
+        driver = Driver(libftdi_search="profile-test", profile=profiler)
+        key = driver._library_key("libftdi")
+        self.addCleanup(Driver._libraries.pop, key, None)
+        driver._load_library = lambda name: fake_lib()  # type: ignore
+        driver.fdll.ftdi_fast()
+        self.assertEqual(profiler.functions["ftdi_fast"].calls, 1)
+        # the shared library itself isn't profiled
+        self.assertNotIsInstance(Driver._libraries[key], ProfiledLibrary)
+        self.assertIsNone(Driver().profiler)
+
+    def testEnvironment(self):
+        with mock.patch.dict(os.environ, {PROFILE_ENV_VAR: "1"}):
+            self.assertIs(Driver().profiler, default_profiler())
+            self.assertIsNone(Driver(profile=False).profiler)
+        with mock.patch.dict(os.environ, {PROFILE_ENV_VAR: "0"}):
+            self.assertIsNone(Driver().profiler)
+
+    def testProfileBlock(self):
+        dev = LoopDevice()
+        fdll = dev.fdll
+        with profile(dev) as prof:
+            dev.write(b"abc")
+            dev.read(3)
+            dev.ftdi_fn.ftdi_setflowctrl(0)
+        self.assertIs(dev.fdll, fdll)
+        self.assertEqual(
+            {name: func.calls for name, func in prof.functions.items()},
+            {"ftdi_write_data": 1, "ftdi_read_data": 1, "ftdi_setflowctrl": 1},
+        )
+        self.assertGreater(prof.elapsed_ns, 0)
+        self.assertIn("in libftdi", prof.report())
+        # calls after the block aren't profiled
+        dev.write(b"abc")
+        self.assertEqual(prof.functions["ftdi_write_data"].calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+pylibftdi - python wrapper for libftdi
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+This module contains tests for the hotplug-driven DeviceRegistry.
+"""
+
+import queue
+import unittest
+
+from pylibftdi.registry import DEVICE_ARRIVED, DEVICE_LEFT, DeviceRegistry
+from tests.fake_usb import FakeBus, FakeDriver
+
+
+class RegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.bus = FakeBus()
+        self.events = queue.Queue()
+
+    def subscriber(self, event, info):
+        self.events.put((event, info.port_path))
+
+    def registry(self, hotplug=False, **kwargs):
+        registry = DeviceRegistry(FakeDriver(self.bus, hotplug), **kwargs)
+        self.addCleanup(registry.close)
+        registry.subscribe(self.subscriber)
+        return registry
+
+    def testCachedListDevices(self):
+        registry = self.registry(rescan_interval=60)
+        self.assertEqual(
+            [d[2] for d in registry.list_devices()],
+            ["FT000001", "FT000002", "FT000003"],
+        )
+        registry.list_devices()
+        self.assertEqual(self.bus.scans, 1)
+        self.assertEqual(self.bus.calls.count("get_strings"), 3)
+
+    def testRateLimitedRescan(self):
+        registry = self.registry(rescan_interval=0)
+        registry.devices()
+        registry.devices()
+        self.assertEqual(self.bus.scans, 2)
+        # strings are retained for devices still present
+        registry.list_devices()
+        registry.list_devices()
+        self.assertEqual(self.bus.calls.count("get_strings"), 3)
+
+    def testEvents(self):
+        registry = self.registry()
+        registry.rescan()
+        self.assertEqual(self.events.qsize(), 3)
+        while not self.events.empty():
+            self.assertEqual(self.events.get()[0], DEVICE_ARRIVED)
+        self.bus.detach(2)
+        self.bus.attach(5, (1, 9, [3]), "FT000005")
+        self.assertEqual(len(registry.rescan()), 3)
+        self.assertEqual(self.events.get_nowait(), (DEVICE_LEFT, "1-2.3"))
+        self.assertEqual(self.events.get_nowait(), (DEVICE_ARRIVED, "1-3"))
+        # unsubscribed callbacks aren't called
+        registry.unsubscribe(self.subscriber)
+        self.bus.detach(5)
+        registry.rescan()
+        self.assertTrue(self.events.empty())
+        self.assertEqual(self.bus.refs[5], 0)
+
+    def testHotplug(self):
+        registry = self.registry(hotplug=True).start()
+        self.assertTrue(registry.hotplug)
+        for _ in range(3):
+            self.events.get(timeout=1)
+        scans = self.bus.scans
+        # without hotplug events, the cached device list is used
+        registry.devices()
+        self.assertEqual(self.bus.scans, scans)
+        self.bus.attach(5, (1, 9, [3]), "FT000005")
+        self.assertEqual(self.events.get(timeout=1), (DEVICE_ARRIVED, "1-3"))
+        self.assertEqual(len(registry.devices()), 4)
+        registry.stop()
+        self.assertFalse(registry.hotplug)
+
+    def testPolling(self):
+        registry = self.registry(hotplug=True, use_hotplug=False, rescan_interval=0.01)
+        registry.start()
+        self.assertFalse(registry.hotplug)
+        for _ in range(3):
+            self.events.get(timeout=1)
+        self.bus.detach(1)
+        self.assertEqual(self.events.get(timeout=1), (DEVICE_LEFT, "1-2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+"""
+pylibftdi - python wrapper for libftdi
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+This module contains tests for recording and replaying libftdi calls.
+"""
+
+import io
+import itertools
+import time
+import unittest
+from ctypes import POINTER, byref, memmove, string_at
+
+from pylibftdi import FtdiError
+from pylibftdi.bitbang import BitBangDevice
+from pylibftdi.device import Device
+from pylibftdi.driver import ftdi_device_list, libftdi_version
+from pylibftdi.replay import (
+    TAG_BYTES,
+    TAG_OUT,
+    TAG_PTR_OUT,
+    RecordingDriver,
+    ReplayDriver,
+    read_recording,
+)
+from tests.test_common import StubDriver, StubFdll
+
+
+class LoopFdll(StubFdll):
+    """
+    fdll looping written data back to be read, with pins reading 0xA5 and
+    reads taking `read_delay` seconds.
+    """
+
+    def __init__(self, read_delay=0):
+        self.rx = bytearray()
+        self.read_delay = read_delay
+        self.transfers = {}
+        self.handles = itertools.count(0x1000)
+
+    def ftdi_write_data(self, ctx, buf, size):
+        self.rx += string_at(buf, size)
+        return size
+
+    def ftdi_read_data(self, ctx, buf, size):
+        time.sleep(self.read_delay)
+        data = bytes(self.rx[:size])
+        del self.rx[:size]
+        memmove(buf, data, len(data))
+        return len(data)
+
+    def ftdi_read_pins(self, ctx, pins_ref):
+        pins_ref._obj.value = 0xA5
+        return 0
+
+    def ftdi_read_data_submit(self, ctx, buf, size):
+        handle = next(self.handles)
+        self.transfers[handle] = (buf, size)
+        return handle
+
+    def ftdi_transfer_data_done(self, handle):
+        buf, size = self.transfers.pop(handle)
+        return self.ftdi_read_data(None, buf, size)
+
+    def ftdi_get_error_string(self, ctx):
+        return b"fake error"
+
+    def ftdi_usb_find_all(self, ctx, dev_list_ref, vid, pid):
+        self.dev_list = ftdi_device_list()
+        dev_list_ref._obj.contents = self.dev_list
+        return 1
+
+
+class LoopDriver(StubDriver):
+    version = libftdi_version(1, 5, 0, "1.5", "snap")
+
+    def __init__(self, read_delay=0):
+        super().__init__(LoopFdll(read_delay))
+
+    def list_devices(self):
+        return [("FTDI", "UM232R", "FT000001"), ("FTDI", "UM245R", "FT000002")]
+
+
+def session(driver):
+    """
+    the application under test; returns what it read
+    """
+    results = []
+    with Device(driver=driver) as dev:
+        dev.write(b"hello")
+        results.append(dev.read(10))
+        results.append(dev.read(10))
+        dev.write(b"abcd")
+        buf = bytearray(4)
+        dev.submit_read(buf).wait()
+        results.append(bytes(buf))
+    with BitBangDevice(driver=driver) as bb:
+        results.append(bb.port)
+    return results
+
+
+class ReplayTest(unittest.TestCase):
+    def record(self, read_delay=0):
+        log = io.BytesIO()
+        with RecordingDriver(log, driver=LoopDriver(read_delay)) as driver:
+            results = session(driver)
+        log.seek(0)
+        return log, results
+
+    def testRecording(self):
+        log, results = self.record()
+        self.assertEqual(results, [b"hello", b"", b"abcd", 0xA5])
+        recording = read_recording(log)
+        self.assertEqual(recording.libftdi_version.snapshot_str, "snap")
+        self.assertIn("ftdi_read_pins", recording.functions)
+        calls = recording.calls
+        self.assertEqual(calls[0].name, "ftdi_new")
+        write = next(call for call in calls if call.name == "ftdi_write_data")
+        self.assertEqual(write.args[1], (TAG_BYTES, b"hello"))
+        # only the bytes actually read are recorded
+        read = next(call for call in calls if call.name == "ftdi_read_data")
+        self.assertEqual(read.args[1], (TAG_OUT, b"hello"))
+        done = next(c for c in calls if c.name == "ftdi_transfer_data_done")
+        self.assertEqual(done.args[-1], (TAG_OUT, b"abcd"))
+        self.assertTrue(all(call.duration_ns >= 0 for call in calls))
+
+    def testReplay(self):
+        log, results = self.record()
+        driver = ReplayDriver(log)
+        self.assertEqual(driver.libftdi_version().major, 1)
+        self.assertEqual(session(driver), results)
+        self.assertEqual(driver.fdll.remaining, 0)
+        self.assertRaises(FtdiError, driver.fdll.ftdi_new)
+
+    def testDiverged(self):
+        log, _results = self.record()
+        fdll = ReplayDriver(log).fdll
+        fdll.ftdi_new()
+        self.assertRaises(FtdiError, fdll.ftdi_read_data, None, None, 10)
+        # the expected call can still be made
+        self.assertEqual(fdll.ftdi_usb_open_desc_index(None, 0, 0, 0, 0, 0), 0)
+
+    def testRealtime(self):
+        log, _results = self.record(read_delay=0.02)
+        recording = read_recording(log)
+        start = time.monotonic()
+        session(ReplayDriver(recording))
+        fast = time.monotonic() - start
+        start = time.monotonic()
+        session(ReplayDriver(recording, realtime=True))
+        realtime = time.monotonic() - start
+        # three reads each took 20ms when recorded
+        self.assertLess(fast, 0.03)
+        self.assertGreaterEqual(realtime, 0.06)
+
+    def testListDevices(self):
+        log = io.BytesIO()
+        with RecordingDriver(log, driver=LoopDriver()) as driver:
+            devices = driver.list_devices()
+            with Device(index=1, driver=driver) as dev:
+                self.assertEqual(dev.device_id, "FT000002")
+        log.seek(0)
+        driver = ReplayDriver(log)
+        self.assertEqual(driver.list_devices(), devices)
+        with Device(index=1, driver=driver) as dev:
+            self.assertEqual(dev.device_id, "FT000002")
+        self.assertEqual(driver.fdll.remaining, 0)
+
+    def testPointerOutput(self):
+        log = io.BytesIO()
+        with RecordingDriver(log, driver=LoopDriver()) as driver:
+            dev_list = POINTER(ftdi_device_list)()
+            self.assertEqual(
+                driver.fdll.ftdi_usb_find_all(None, byref(dev_list), 0, 0), 1
+            )
+            self.assertTrue(dev_list)
+        log.seek(0)
+        recording = read_recording(log)
+        # the address isn't recorded, and replaying the call fails cleanly
+        self.assertEqual(recording.calls[0].args[1], (TAG_PTR_OUT, None))
+        dev_list = POINTER(ftdi_device_list)()
+        fdll = ReplayDriver(recording).fdll
+        self.assertRaises(
+            FtdiError, fdll.ftdi_usb_find_all, None, byref(dev_list), 0, 0
+        )
+        self.assertFalse(dev_list)
+
+    def testInvalid(self):
+        self.assertRaises(FtdiError, read_recording, io.BytesIO(b"garbage"))
+        log, _results = self.record()
+        truncated = io.BytesIO(log.getvalue()[:-3])
+        self.assertRaises(FtdiError, read_recording, truncated)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+"""
+pylibftdi - python wrapper for libftdi
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+This module contains tests for the simulated FTDI backend.
+"""
+
+import unittest
+
+from pylibftdi import FtdiError
+from pylibftdi.bitbang import BitBangDevice
+from pylibftdi.device import Device
+from pylibftdi.driver import BITMODE_SYNCBB, TYPE_232H
+from pylibftdi.serial_device import SerialDevice
+from pylibftdi.sim import SimClock, SimDriver
+
+
+class SimTestBase(unittest.TestCase):
+    def setUp(self):
+        self.clock = SimClock()
+        self.driver = SimDriver(self.clock)
+
+    def elapsed(self, fn, *args):
+        start = self.clock.now()
+        result = fn(*args)
+        return result, self.clock.now() - start
+
+
+class SimSerialTest(SimTestBase):
+    def transfer_rate(self, dev):
+        start = self.clock.now()
+        for _ in range(100):
+            dev.write(b"x" * 62)
+            self.assertEqual(dev.read(62), b"x" * 62)
+        return 6200 / (self.clock.now() - start)
+
+    def testThroughput(self):
+        self.driver.add_chip("SIM1", loopback=True)
+        with Device("SIM1", driver=self.driver) as dev:
+            dev.baudrate = 115200
+            # a full packet doesn't complete a 4096 byte transfer, which
+            # waits for the latency timer to send a short packet.
+            rate = self.transfer_rate(dev)
+            self.assertAlmostEqual(rate, 62 / (62 / 11520 + 0.016), delta=50)
+            # a single packet transfer completes as soon as it is full; 10
+            # bits per byte, less a little USB transfer time
+            dev.read_chunksize = 64
+            rate = self.transfer_rate(dev)
+            self.assertAlmostEqual(rate, 11520, delta=11520 * 0.02)
+            self.assertLess(rate, 11520)
+
+    def testLatencyTimer(self):
+        self.driver.add_chip("SIM1", loopback=True)
+        with Device("SIM1", driver=self.driver) as dev:
+            for latency in (16, 2):
+                dev.latency_timer = latency
+                self.clock.sleep(1)
+                dev.write(b"?")
+                # the latency timer has long expired; status only
+                self.assertEqual(dev.read(10), b"")
+                # a partial packet waits for the latency timer, then (as
+                # fewer bytes than requested were read) libftdi waits for
+                # another packet, which is empty.
+                data, elapsed = self.elapsed(dev.read, 10)
+                self.assertEqual(data, b"?")
+                self.assertAlmostEqual(elapsed, 2 * latency / 1000, delta=0.0002)
+
+    def testOverrun(self):
+        chip = self.driver.add_chip("SIM1", loopback=True)
+        with SerialDevice("SIM1", driver=self.driver) as dev:
+            # at 960 bytes/s, writes block once the 128-byte FIFO is full
+            count, elapsed = self.elapsed(dev.write, b"x" * 1000)
+            self.assertEqual(count, 1000)
+            self.assertAlmostEqual(elapsed, 872 / 960, delta=0.002)
+            self.clock.sleep(1)
+            self.driver.update()
+            # only the 256-byte rx FIFO is retained
+            self.assertEqual(chip.overruns, 744)
+            self.assertTrue(dev.modem_status & 0x0200)
+            self.assertFalse(dev.modem_status & 0x0200)
+            self.assertEqual(len(dev.read(1000)), 256)
+
+    def testPair(self):
+        chip_a = self.driver.add_chip("A")
+        chip_b = self.driver.add_chip("B", TYPE_232H, description="Sim 232H")
+        self.driver.connect(chip_a, chip_b)
+        self.assertEqual(
+            self.driver.list_devices(),
+            [("FTDI", "FT232R USB UART", "A"), ("FTDI", "Sim 232H", "B")],
+        )
+        with SerialDevice("A", driver=self.driver) as dev_a, SerialDevice(
+            "Sim 232H", driver=self.driver
+        ) as dev_b:
+            self.assertEqual(dev_b.chip_type, TYPE_232H)
+            dev_a.write(b"ping")
+            self.clock.sleep(0.1)
+            self.assertEqual(dev_b.read(10), b"ping")
+            self.assertEqual(dev_a.read(10), b"")
+            dev_a.rts = 1
+            self.assertEqual((dev_b.cts, dev_b.dsr), (1, 0))
+            dev_b.dtr = 1
+            self.assertEqual((dev_a.cts, dev_a.dsr), (0, 1))
+
+    def testOpenErrors(self):
+        self.driver.add_chip("SIM1")
+        self.assertRaises(FtdiError, Device, "missing", driver=self.driver)
+        with Device("SIM1", driver=self.driver) as dev:
+            self.assertRaises(FtdiError, Device, "SIM1", driver=self.driver)
+            self.assertFalse(dev.closed)
+        # re-opening once closed is fine
+        Device("SIM1", driver=self.driver).close()
+
+
+class SimBitBangTest(SimTestBase):
+    def testPins(self):
+        chip = self.driver.add_chip("SIM1")
+        chip.input_pins = 0xA0
+        with BitBangDevice("SIM1", direction=0x0F, driver=self.driver) as bb:
+            bb.baudrate = 1000
+            bb.port = 0x55
+            self.clock.sleep(0.001)
+            self.driver.update()
+            self.assertEqual(chip.latch, 0x55)
+            self.assertEqual(chip.pins, 0xA5)
+            self.assertEqual(bb.read_pins(), 0xA5)
+            # bytes are clocked out at 16 times the baudrate
+            _, elapsed = self.elapsed(bb.write, bytes(range(256)) * 6)
+            self.assertAlmostEqual(elapsed, (1536 - 128) / 16000, delta=0.001)
+
+    def testSynchronous(self):
+        chip = self.driver.add_chip("SIM1")
+        chip.input_pins = 0xF0
+        with BitBangDevice(
+            "SIM1", direction=0x0F, bitbang_mode=BITMODE_SYNCBB, driver=self.driver
+        ) as bb:
+            bb.write(b"\x01\x02\x03")
+            self.clock.sleep(0.1)
+            # the pins are sampled before each byte is output
+            self.assertEqual(bb.read(3), b"\xf0\xf1\xf2")
+            self.assertEqual(chip.pins, 0xF3)
+
+
+if __name__ == "__main__":
+    unittest.main()
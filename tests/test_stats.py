@@ -0,0 +1,156 @@
+"""
+pylibftdi - python wrapper for libftdi
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+This module contains tests for device I/O statistics.
+"""
+
+import unittest
+
+from pylibftdi import FtdiError
+from pylibftdi.stats import (
+    HISTOGRAM_BUCKETS,
+    PROMETHEUS_BOUNDS,
+    DeviceStats,
+    LatencyHistogram,
+    bucket_index,
+    bucket_lower_bound,
+    prometheus_text,
+)
+from tests.test_common import LoopDevice
+
+
+class ShortWriteDevice(LoopDevice):
+    """
+    accepts at most 4 bytes per write, and fails writes of 'error'
+    """
+
+    def _write(self, data):
+        if bytes(data) == b"error":
+            raise FtdiError("write failed")
+        return super()._write(data[:4])
+
+
+class HistogramTest(unittest.TestCase):
+    def testBuckets(self):
+        previous = -1
+        for value in range(100000):
+            index = bucket_index(value)
+            self.assertIn(index - previous, (0, 1))
+            self.assertLessEqual(bucket_lower_bound(index), value)
+            self.assertGreater(bucket_lower_bound(index + 1), value)
+            # each bucket spans at most 25% of its values
+            self.assertLessEqual(
+                bucket_lower_bound(index + 1) - bucket_lower_bound(index),
+                max(1, value // 4),
+            )
+            previous = index
+        self.assertEqual(bucket_index(1 << 40), HISTOGRAM_BUCKETS - 1)
+
+    def testPercentile(self):
+        hist = LatencyHistogram()
+        self.assertEqual(hist.percentile(50), 0)
+        for value in range(1, 1001):
+            hist.record(value)
+        self.assertEqual(hist.count, 1000)
+        self.assertEqual(hist.max, 1000)
+        self.assertEqual(hist.mean, 500.5)
+        self.assertTrue(500 <= hist.percentile(50) < 500 * 1.25)
+        self.assertEqual(hist.percentile(100), 1000)
+        self.assertEqual(hist.cumulative([4, 1024]), [(4, 4), (1279, 1000)])
+
+    def testCumulativeBounds(self):
+        hist = LatencyHistogram()
+        # values exactly on the bounds are counted as less than or equal
+        for value in PROMETHEUS_BOUNDS:
+            hist.record(value)
+        cumulative = hist.cumulative(PROMETHEUS_BOUNDS)
+        self.assertEqual(
+            [count for _, count in cumulative],
+            list(range(1, len(PROMETHEUS_BOUNDS) + 1)),
+        )
+        self.assertEqual([upper for upper, _ in cumulative][:4], [1, 4, 19, 79])
+        for idx, (upper, _) in enumerate(cumulative):
+            self.assertTrue(
+                PROMETHEUS_BOUNDS[idx] <= upper < PROMETHEUS_BOUNDS[idx] * 1.25
+            )
+        # ...but values above the reported bound are not
+        hist = LatencyHistogram()
+        hist.record(20)
+        hist.record(1280)
+        self.assertEqual(hist.cumulative([16, 1024]), [(19, 0), (1279, 1)])
+        self.assertEqual(hist.cumulative([15, 16, 17, 1 << 40]), [(15, 0), (19, 0)])
+        stats = DeviceStats()
+        stats.record_write(1, 1, 1000)
+        stats.record_write(1, 1, 19000)
+        lines = prometheus_text({"FT1": stats}).splitlines()
+        self.assertIn(
+            'pylibftdi_write_latency_seconds_bucket{device="FT1",le="1e-06"} 1',
+            lines,
+        )
+        self.assertIn(
+            'pylibftdi_write_latency_seconds_bucket{device="FT1",le="1.9e-05"} 2',
+            lines,
+        )
+
+
+class DeviceStatsTest(unittest.TestCase):
+    def testDisabled(self):
+        dev = LoopDevice()
+        self.assertNotIn("_read", vars(dev))
+        self.assertRaises(FtdiError, dev.stats)
+
+    def testCounts(self):
+        dev = ShortWriteDevice(collect_stats=True)
+        dev.write(b"hello")
+        self.assertRaises(FtdiError, dev.write, b"error")
+        self.assertEqual(dev.read(10), b"hell")
+        dev.read(10)
+        stats = dev.stats()
+        self.assertEqual(stats.write_calls, 1)
+        self.assertEqual(stats.write_bytes, 4)
+        self.assertEqual(stats.short_writes, 1)
+        self.assertEqual(stats.write_errors, 1)
+        self.assertEqual(stats.read_calls, 2)
+        self.assertEqual(stats.read_bytes, 4)
+        self.assertEqual(stats.empty_reads, 1)
+        self.assertEqual(stats.read_latency.count, 2)
+        self.assertEqual(
+            stats.as_dict()["write_latency"]["max"], stats.write_latency.max
+        )
+
+    def testSnapshotReset(self):
+        dev = LoopDevice()
+        live = dev.enable_stats()
+        dev.write(b"abc")
+        snapshot = dev.stats(reset=True)
+        dev.write(b"abc")
+        self.assertEqual(snapshot.write_bytes, 3)
+        self.assertEqual(live.write_bytes, 3)
+        self.assertEqual(dev.stats().write_calls, 1)
+        dev.disable_stats()
+        self.assertNotIn("_write", vars(dev))
+        self.assertEqual(dev.write(b"abc"), 3)
+        self.assertRaises(FtdiError, dev.stats)
+
+    def testPrometheus(self):
+        dev = LoopDevice(collect_stats=True)
+        dev.write(b"hello")
+        text = prometheus_text({'FT"1': dev.stats()})
+        lines = text.splitlines()
+        self.assertIn("# TYPE pylibftdi_write_bytes_total counter", lines)
+        self.assertIn('pylibftdi_write_bytes_total{device="FT\\"1"} 5', lines)
+        self.assertIn("# TYPE pylibftdi_read_latency_seconds histogram", lines)
+        self.assertIn(
+            'pylibftdi_write_latency_seconds_bucket{device="FT\\"1",le="+Inf"} 1',
+            lines,
+        )
+        self.assertIn('pylibftdi_write_latency_seconds_count{device="FT\\"1"} 1', lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+pylibftdi - python wrapper for libftdi
+
+Copyright (c) 2010-2024 Ben Bass <benbass@codedstructure.net>
+See LICENSE file for details and (absence of) warranty
+
+pylibftdi: https://github.com/codedstructure/pylibftdi
+
+This module contains tests for submitted (pipelined) transfers.
+"""
+
+import unittest
+from ctypes import memmove, string_at
+
+from pylibftdi import FtdiError
+from pylibftdi.device import Device
+from tests.test_common import StubDriver, StubFdll
+
+
+class TransferFdll(StubFdll):
+    """
+    fdll supporting just enough of the transfer API for testing: writes
+    are appended to `written`, reads are served from `rx`.
+    """
+
+    def __init__(self):
+        self.written = bytearray()
+        self.rx = bytearray()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cancelled = 0
+
+    def _submit(self, kind, buf, size):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return [kind, buf, size]
+
+    def ftdi_write_data_submit(self, ctx, buf, size):
+        return self._submit("w", buf, size)
+
+    def ftdi_read_data_submit(self, ctx, buf, size):
+        return self._submit("r", buf, size)
+
+    def ftdi_transfer_data_done(self, handle):
+        kind, buf, size = handle
+        self.in_flight -= 1
+        if kind == "w":
+            self.written += string_at(buf, size)
+        else:
+            if len(self.rx) < size:
+                return -1
+            memmove(buf, bytes(self.rx[:size]), size)
+            del self.rx[:size]
+        return size
+
+    def ftdi_transfer_data_cancel(self, handle, timeout):
+        self.in_flight -= 1
+        self.cancelled += 1
+
+
+class TransferTest(unittest.TestCase):
+    def setUp(self):
+        self.dev = Device(driver=StubDriver(TransferFdll()))
+        self.fdll = self.dev.fdll
+
+    def testSubmitWrite(self):
+        transfer = self.dev.submit_write(bytearray(b"Hello"))
+        self.assertFalse(transfer.done)
+        self.assertEqual(self.fdll.written, b"")
+        self.assertEqual(transfer.wait(), 5)
+        self.assertTrue(transfer.done)
+        self.assertEqual(transfer.wait(), 5)
+        self.assertEqual(self.fdll.written, b"Hello")
+
+    def testSubmitRead(self):
+        self.fdll.rx += b"abcdef"
+        buf = bytearray(4)
+        transfer = self.dev.submit_read(buf)
+        self.assertEqual(transfer.wait(), 4)
+        self.assertEqual(buf, b"abcd")
+        transfer = self.dev.submit_read(bytearray(4))
+        # only one read transfer may be in progress
+        self.assertRaises(FtdiError, self.dev.submit_read, bytearray(4))
+        self.assertRaises(FtdiError, transfer.wait)
+        self.dev.submit_read(bytearray(2)).wait()
+
+    def testStreamWrite(self):
+        blocks = [bytes([n]) * 10 for n in range(20)]
+        self.assertEqual(self.dev.stream_write(iter(blocks), depth=3), 200)
+        self.assertEqual(self.fdll.written, b"".join(blocks))
+        self.assertEqual(self.fdll.max_in_flight, 3)
+        self.assertEqual(self.fdll.in_flight, 0)
+
+    def testStreamRead(self):
+        self.fdll.rx += bytes(range(100))
+        blocks = list(self.dev.stream_read(10, count=10))
+        self.assertEqual(b"".join(blocks), bytes(range(100)))
+        self.assertEqual(self.fdll.max_in_flight, 1)
+        self.assertEqual(self.fdll.in_flight, 0)
+
+    def testStreamReadClose(self):
+        self.fdll.rx += bytes(100)
+        stream = self.dev.stream_read(10)
+        next(stream)
+        stream.close()
+        # the next transfer is cancelled
+        self.assertEqual(self.fdll.cancelled, 1)
+        self.assertEqual(self.fdll.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()